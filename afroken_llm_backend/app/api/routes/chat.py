@@ -2,222 +2,140 @@
 Chat endpoints for interacting with the AfroKen LLM using RAG.
 """
 
-import os
+import asyncio
 import json
-from pathlib import Path
+import os
 
-import numpy as np
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 
-from app.schemas import ChatRequest, ChatResponse
+from app.schemas import ChatBatchRequest, ChatBatchResponse, ChatRequest, ChatResponse
 from app.config import settings
-from app.utils.embeddings_fallback import get_embedding as get_embedding_fallback
-
-import httpx
-
-# FAISS imports with fallback
-try:
-    import faiss
-    FAISS_AVAILABLE = True
-except ImportError:
-    FAISS_AVAILABLE = False
+from app.services.chunk_store import category_key
+from app.services.rag_index import RagIndex
+from app.services.reranker import rerank_enabled
+from app.services.retrieval_pipeline import NO_RESULTS_REPLY, retrieval_pipeline
+from app.utils.admission import Overloaded
+from app.utils.cache import TTLCache, normalize_query
+from app.utils.semantic_cache import SemanticCache
 
 
 # Router to be mounted under `/api/v1/chat`.
 router = APIRouter()
 
-# Cache for doc_map and index (loaded once at startup)
-DOC_MAP_CACHE = None
-FAISS_INDEX_CACHE = None
-EMBEDDINGS_CACHE = None
+# Full responses of the retrieval-only path, keyed on
+# (normalized message, language, category, top_k, index version). Until the index is
+# rebuilt the same question always produces the same reply, so a hit skips
+# embedding, search and excerpt building entirely.
+_response_cache = TTLCache(
+    "chat_response",
+    max_entries=settings.RESPONSE_CACHE_SIZE,
+    max_bytes=settings.RESPONSE_CACHE_MAX_BYTES,
+    sizeof=lambda entry: len(entry[0].encode('utf-8')) + sum(len(c.encode('utf-8')) for c in entry[1]),
+)
+# Answers of past queries keyed on their embedding: paraphrases of a cached
+# question ("KRA PIN steps" / "how to register KRA PIN") reuse its reply
+# without retrieval or an LLM call. Context = everything else the reply
+# depends on (index version / LLM path, language, category, top_k).
+_semantic_cache = SemanticCache(
+    "chat_semantic",
+    max_entries=settings.SEMANTIC_CACHE_SIZE,
+    threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+    ttl_seconds=settings.SEMANTIC_CACHE_TTL_SECONDS,
+)
+SEMANTIC_CACHE_ENABLED = settings.SEMANTIC_CACHE_SIZE > 0
+# Index version the response caches were filled against
+_response_cache_version = None
 
-def _load_rag_resources():
-    """Load RAG resources once and cache them."""
-    global DOC_MAP_CACHE, FAISS_INDEX_CACHE, EMBEDDINGS_CACHE
-    
-    if DOC_MAP_CACHE is not None:
-        return  # Already loaded
-    
-    # Calculate backend root directory (go up from app/api/routes/chat.py to backend root)
-    # chat.py is at: backend/app/api/routes/chat.py
-    # So we need: backend/app/api/routes -> backend/app/api -> backend/app -> backend
-    backend_dir = Path(__file__).parent.parent.parent.parent
-    doc_map_file = backend_dir / 'doc_map.json'
-    index_file = backend_dir / 'faiss_index.idx'
-    embeddings_file = backend_dir / 'faiss_index.npy'
-    
-    # Debug: print paths (remove in production)
-    import sys
-    if sys.stdout.isatty():  # Only print if running in terminal
-        print(f"Loading RAG resources from: {backend_dir}")
-        print(f"  doc_map.json: {doc_map_file.exists()}")
-        print(f"  faiss_index.idx: {index_file.exists()}")
-        print(f"  faiss_index.npy: {embeddings_file.exists()}")
-    
-    # Load doc_map
-    if doc_map_file.exists():
-        with open(doc_map_file, 'r', encoding='utf-8') as f:
-            DOC_MAP_CACHE = json.load(f)
-        print(f"✓ Loaded doc_map with {len(DOC_MAP_CACHE)} documents")
-    else:
-        print(f"⚠ doc_map.json not found at: {doc_map_file}")
+def _response_cache_key(req: ChatRequest, index: RagIndex):
+    """
+    Build the response cache key for `req` against the version of `index`.
     
-    # Load FAISS index or embeddings
-    if FAISS_AVAILABLE and index_file.exists():
-        FAISS_INDEX_CACHE = faiss.read_index(str(index_file))
-        print(f"✓ Loaded FAISS index")
-    elif embeddings_file.exists():
-        EMBEDDINGS_CACHE = np.load(str(embeddings_file))
-        print(f"✓ Loaded embeddings numpy array")
-    else:
-        print(f"⚠ No FAISS index or embeddings file found")
+    The exact and semantic caches are flushed whenever a new index version
+    goes live, so replies built from a previous index are never served (or
+    kept in memory) afterwards.
+    """
+    global _response_cache_version
+    if index.version != _response_cache_version:
+        _response_cache.clear()
+        _semantic_cache.clear()
+        _response_cache_version = index.version
+    return (normalize_query(req.message), req.language, category_key(req.category), retrieval_pipeline.top_k, index.version)
 
-def py_cosine_search(embeddings: np.ndarray, query_emb: np.ndarray, topk: int = 3):
-    """Pure Python cosine similarity search (fallback if FAISS unavailable)."""
-    query_norm = query_emb / (np.linalg.norm(query_emb) + 1e-8)
-    emb_norms = embeddings / (np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-8)
-    similarities = np.dot(emb_norms, query_norm)
-    top_indices = np.argsort(-similarities)[:topk]
-    top_distances = 1 - similarities[top_indices]
-    return top_distances, top_indices
+def _retrieval_only_mode() -> bool:
+    """True when no LLM is configured: replies are built from retrieved excerpts."""
+    return not settings.LLM_ENDPOINT and not os.getenv('OPENAI_API_KEY')
 
 
-@router.post("/messages", response_model=ChatResponse)
+@router.post("/messages", response_model=ChatResponse, response_model_exclude_none=True)
 async def post_message(req: ChatRequest, debug: bool = Query(False, description="Include debug information in response")):
     """
     Accept a user message, retrieve relevant documents, and generate an answer.
     
     If LLM_ENDPOINT and OPENAI_API_KEY are not set, returns top-k retrieved
-    documents with excerpts instead of LLM-generated response.
+    documents with excerpts instead of LLM-generated response. The same
+    excerpt answer is returned when the LLM is overloaded (no free slot
+    within LLM_MAX_QUEUE_WAIT_MS), so replies degrade instead of timing out.
     """
+    pipeline = retrieval_pipeline
     
-    # Check if we should use FAISS fallback
-    use_faiss_fallback = not settings.LLM_ENDPOINT and not os.getenv('OPENAI_API_KEY')
-    
-    if use_faiss_fallback:
+    if _retrieval_only_mode():
         # FAISS fallback: return top-k documents
         try:
-            # Load resources (cached after first call)
-            _load_rag_resources()
-            
-            if DOC_MAP_CACHE is None:
+            index = await pipeline.load_index()
+            if index is None:
                 return {
                     "reply": "RAG index not found. Please run the indexing pipeline first. See README_RAG_SETUP.md",
                     "citations": []
                 }
             
-            # Get query embedding (use fallback helper)
-            query_emb = get_embedding_fallback(req.message)
+            # Popular questions are answered straight from the response cache.
+            # Debug requests always go through retrieval so they can report scores.
+            cache_key = _response_cache_key(req, index)
+            if not debug:
+                cached = _response_cache.get(cache_key)
+                if cached is not None:
+                    reply, citations = cached
+                    return {"reply": reply, "citations": list(citations)}
+            
+            query_emb = await pipeline.embed(req.message)
             
-            # Search using cached index
-            if FAISS_INDEX_CACHE is not None:
-                query_emb_32 = query_emb.astype('float32').reshape(1, -1)
-                distances, indices = FAISS_INDEX_CACHE.search(query_emb_32, k=3)
-                top_indices = indices[0]
-                top_distances = distances[0]
-            elif EMBEDDINGS_CACHE is not None:
-                top_distances, top_indices = py_cosine_search(EMBEDDINGS_CACHE, query_emb, topk=3)
-            else:
+            # Paraphrase of a question answered earlier against this index
+            semantic_context = cache_key[1:]
+            if SEMANTIC_CACHE_ENABLED and not debug:
+                cached = _semantic_cache.get(query_emb, semantic_context)
+                if cached is not None:
+                    _response_cache.set(cache_key, cached)
+                    reply, citations = cached
+                    return {"reply": reply, "citations": list(citations)}
+            
+            # search -> rerank -> filter on the snapshot (off the event loop)
+            search_result = await pipeline.retrieve(index, query_emb, req.message, req.category)
+            if search_result is None:
                 return {
                     "reply": "RAG index not found. Please run the indexing pipeline first.",
                     "citations": []
                 }
+            top_distances, top_indices, complete = search_result
             
-            # Build answer from top-k documents
-            answer_parts = []
-            citations = []
-            debug_info = [] if debug else None
-            
-            for i, idx in enumerate(top_indices):
-                doc_key = str(int(idx))
-                if doc_key not in DOC_MAP_CACHE:
-                    continue
-                    
-                doc = DOC_MAP_CACHE[doc_key]
-                title = doc.get('title', 'Untitled')
-                text = doc.get('text', '')
-                source = doc.get('source', '')
-                filename = doc.get('filename', '')
-                category = doc.get('category', 'unknown')
-                chunk_index = doc.get('chunk_index', '')
-                
-                # Clean markdown formatting from text
-                import re
-                cleaned_text = text
-                # Remove markdown headers (# ## ###) - match at start of line
-                cleaned_text = re.sub(r'^#{1,6}\s+', '', cleaned_text, flags=re.MULTILINE)
-                # Remove markdown bold (**text**)
-                cleaned_text = re.sub(r'\*\*(.+?)\*\*', r'\1', cleaned_text)
-                # Remove markdown italic (*text*)
-                cleaned_text = re.sub(r'\*(.+?)\*', r'\1', cleaned_text)
-                # Remove markdown bullet lists (- item or * item)
-                cleaned_text = re.sub(r'^\s*[-*]\s+', '', cleaned_text, flags=re.MULTILINE)
-                # Remove numbered lists (1. 2. 3.)
-                cleaned_text = re.sub(r'^\s*\d+\.\s+', '', cleaned_text, flags=re.MULTILINE)
-                # Remove indentation from list items (   - item)
-                cleaned_text = re.sub(r'^\s{2,}', '', cleaned_text, flags=re.MULTILINE)
-                # Remove extra blank lines (more than 2 consecutive)
-                cleaned_text = re.sub(r'\n{3,}', '\n\n', cleaned_text)
-                # Strip leading/trailing whitespace
-                cleaned_text = cleaned_text.strip()
-                
-                # Add excerpt (first 300 chars for better context)
-                excerpt = cleaned_text[:300].strip()
-                if len(cleaned_text) > 300:
-                    # Try to cut at sentence boundary
-                    last_period = excerpt.rfind('.')
-                    if last_period > 150:
-                        excerpt = excerpt[:last_period + 1]
-                    else:
-                        excerpt = excerpt + '...'
-                
-                # Only add if excerpt has meaningful content (more than just whitespace)
-                if excerpt.strip() and len(excerpt.strip()) > 10:
-                    answer_parts.append(f"{title}\n\n{excerpt}")
-                
-                # Format citation as string (schema expects List[str])
-                # Use source URL if available, otherwise use title, fallback to filename
-                if source and source.strip():
-                    citation_str = source.strip()
-                elif title and title.strip():
-                    citation_str = title.strip()
-                else:
-                    citation_str = filename if filename else "Untitled"
-                
-                # Only add unique citations
-                if citation_str not in citations:
-                    citations.append(citation_str)
-                
-                # Add debug info if requested
-                if debug:
-                    debug_info.append({
-                        "rank": i + 1,
-                        "title": title,
-                        "filename": filename,
-                        "source": source,
-                        "distance": float(top_distances[i]) if i < len(top_distances) else None,
-                        "category": category,
-                        "chunk_index": chunk_index
-                    })
-            
-            # Combine answer (limit to 6000 chars)
-            # Only include parts with meaningful content
-            meaningful_parts = [p for p in answer_parts if p.strip() and len(p.strip()) > 20]
-            
-            if meaningful_parts:
-                answer = "\n\n---\n\n".join(meaningful_parts)
-                if len(answer) > 6000:
-                    answer = answer[:6000] + "..."
-            else:
-                answer = "No relevant documents found. Please try rephrasing your question."
+            # Build answer from the precomputed excerpts/citations
+            answer, citations, debug_info = pipeline.format(index, top_distances, top_indices, debug)
             
             response = {
                 "reply": answer,
                 "citations": citations
             }
+            # Replies built without the re-ranking step (budget exceeded) are not cached
+            if complete:
+                _response_cache.set(cache_key, (answer, tuple(citations)))
+                if SEMANTIC_CACHE_ENABLED:
+                    _semantic_cache.set(query_emb, semantic_context, (answer, tuple(citations)))
             
             if debug and debug_info:
                 response["debug"] = {
+                    "index_version": index.version,
+                    "category": req.category,
+                    "reranked": complete and rerank_enabled(),
                     "query_embedding_shape": list(query_emb.shape),
                     "top_k_results": debug_info
                 }
@@ -225,161 +143,278 @@ async def post_message(req: ChatRequest, debug: bool = Query(False, description=
             return response
             
         except Exception as e:
-            import traceback
             return {
                 "reply": f"Error retrieving documents: {str(e)}",
                 "citations": []
             }
     
-    # Original LLM flow (existing code) - only if not using FAISS fallback
-    # Try to use database-based RAG, but fall back to FAISS if database unavailable
+    # LLM flow: database-based RAG, falling back to the RAG index if the database is unavailable
+    reply, prepared = await _llm_retrieval(req)
+    if reply is not None:
+        return reply
+    cache_emb, llm_context, context_documents, citations = prepared
+    
+    # Let the LLM answer from the retrieved documents
     try:
-        from app.utils.embeddings import get_embedding
-        from app.services.rag_service import vector_search
-        
-        emb = await get_embedding(req.message)
-        docs = vector_search(emb, top_k=5)
+        answer = await pipeline.generate(req.message, req.language, context_documents)
+    except Overloaded:
+        # Load shedding: excerpts instead of a generated answer (not cached)
+        return await _shed_reply(req, context_documents, citations)
+    
+    if cache_emb is not None:
+        _semantic_cache.set(cache_emb, llm_context, (answer, tuple(citations)))
+    
+    # Return ChatResponse
+    return {"reply": answer, "citations": citations}
+
+
+async def _llm_retrieval(req: ChatRequest):
+    """
+    Retrieval half of the LLM flow: database documents for `req`, or the RAG
+    index if the database is unavailable.
+    
+    Returns (reply, None) when no generation is needed (semantic cache hit,
+    answer built from the index) and otherwise
+    (None, (semantic cache key, semantic cache context, context documents, citations));
+    the key is None when the semantic cache cannot be used.
+    """
+    pipeline = retrieval_pipeline
+    # Paraphrase of a question the LLM answered recently (bounded by the TTL,
+    # since DB documents are not versioned): skip retrieval and generation
+    llm_context = ("llm", req.language, category_key(req.category))
+    cache_emb = await _semantic_cache_key(req.message)
+    if cache_emb is not None:
+        cached = _semantic_cache.get(cache_emb, llm_context)
+        if cached is not None:
+            reply, citations = cached
+            return {"reply": reply, "citations": list(citations)}, None
+    
+    try:
+        emb = await pipeline.embed_for_documents(req.message)
+        docs = await pipeline.search_documents(emb)
     except Exception as db_error:
-        # Database unavailable - use FAISS fallback instead
-        _load_rag_resources()
-        
-        if DOC_MAP_CACHE is None:
+        # Database unavailable - answer from the RAG index instead
+        reply = await _index_reply(req)
+        if reply is None:
             return {
                 "reply": "RAG index not found. Please run the indexing pipeline first.",
                 "citations": []
-            }
-        
-        # Get query embedding
-        query_emb = get_embedding_fallback(req.message)
-        
-        # Search using cached index
-        if FAISS_INDEX_CACHE is not None:
-            query_emb_32 = query_emb.astype('float32').reshape(1, -1)
-            distances, indices = FAISS_INDEX_CACHE.search(query_emb_32, k=3)
-            top_indices = indices[0]
-        elif EMBEDDINGS_CACHE is not None:
-            _, top_indices = py_cosine_search(EMBEDDINGS_CACHE, query_emb, topk=3)
+            }, None
+        return reply, None
+    
+    # Prepare context from retrieved documents
+    context_documents, citations = pipeline.format_documents(docs)
+    return None, (cache_emb, llm_context, context_documents, citations)
+
+
+async def _semantic_cache_key(message: str):
+    """
+    Embedding that keys the LLM-path semantic cache, or None to bypass it.
+    
+    Always the sentence-transformer query embedding, never the `documents`
+    embedding: without EMBEDDING_ENDPOINT the latter is a character-code
+    pseudo-embedding under which unrelated questions ("NHIF ..." / "NSSF ...")
+    score above any sensible cosine threshold and would share answers.
+    """
+    if not SEMANTIC_CACHE_ENABLED:
+        return None
+    try:
+        return await retrieval_pipeline.embed(message)
+    except Exception as e:
+        print(f"⚠ Semantic cache skipped, query embedding failed: {e}")
+        return None
+
+
+async def _index_reply(req: ChatRequest):
+    """Excerpt answer from the RAG index (as in retrieval-only mode), or None without an index."""
+    pipeline = retrieval_pipeline
+    index = await pipeline.load_index()
+    if index is None:
+        return None
+    
+    query_emb = await pipeline.embed(req.message)
+    search_result = await pipeline.retrieve(index, query_emb, req.message, req.category)
+    if search_result is None:
+        return None
+    top_distances, top_indices, _ = search_result
+    
+    # Build answer from the precomputed excerpts/citations
+    answer, citations, _ = pipeline.format(index, top_distances, top_indices)
+    return {
+        "reply": answer,
+        "citations": citations
+    }
+
+
+async def _shed_reply(req: ChatRequest, context_documents, citations):
+    """
+    Reply for a request the LLM could not admit: RAG index excerpts, else the
+    documents themselves. Never raises - shedding must stay cheap and safe.
+    """
+    try:
+        reply = await _index_reply(req)
+    except Exception as e:
+        # Embedding model or index unavailable: the retrieved documents still answer
+        print(f"⚠ Index answer for shed request failed, using document excerpts: {e}")
+        reply = None
+    if reply is None:
+        context = "\n\n".join(context_documents)
+        reply = {"reply": context[:6000] if context else NO_RESULTS_REPLY, "citations": citations}
+    return reply
+
+
+def _sse(event: str, data) -> str:
+    """One Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/messages:stream")
+async def post_message_stream(req: ChatRequest):
+    """
+    `post_message` as Server-Sent Events, sending the reply while the LLM generates it.
+    
+    Events, in order:
+    
+        event: token      data: {"text": "..."}          one per streamed piece
+        event: citations  data: {"citations": [...]}     always the last event
+    
+    If the reply fails after streaming has started, an `error` event
+    (data: {"message": "..."}) ends the stream instead of `citations`.
+    Replies that need no generation (retrieval-only mode, cache hits) and
+    excerpt answers of shed requests (LLM overloaded) arrive as a single
+    token event.
+    """
+    return StreamingResponse(
+        _stream_reply(req),
+        media_type="text/event-stream",
+        # Proxies (nginx) must pass events through as they are written
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _stream_reply(req: ChatRequest):
+    """Event stream of `post_message_stream`."""
+    try:
+        if _retrieval_only_mode():
+            reply, prepared = await post_message(req, debug=False), None
         else:
-            return {
-                "reply": "RAG index not found. Please run the indexing pipeline first.",
-                "citations": []
-            }
-        
-        # Build answer from top-k documents
-        answer_parts = []
-        citations = []
-        
-        for i, idx in enumerate(top_indices):
-            doc_key = str(int(idx))
-            if doc_key not in DOC_MAP_CACHE:
-                continue
-                
-            doc = DOC_MAP_CACHE[doc_key]
-            title = doc.get('title', 'Untitled')
-            text = doc.get('text', '')
-            source = doc.get('source', '')
-            filename = doc.get('filename', '')
-            
-            # Clean markdown from text (same as main FAISS fallback)
-            import re
-            cleaned_text = text
-            cleaned_text = re.sub(r'^#{1,6}\s+', '', cleaned_text, flags=re.MULTILINE)
-            cleaned_text = re.sub(r'\*\*(.+?)\*\*', r'\1', cleaned_text)
-            cleaned_text = re.sub(r'^\s*[-*]\s+', '', cleaned_text, flags=re.MULTILINE)
-            cleaned_text = re.sub(r'^\s*\d+\.\s+', '', cleaned_text, flags=re.MULTILINE)
-            cleaned_text = re.sub(r'\n{3,}', '\n\n', cleaned_text).strip()
-            
-            excerpt = cleaned_text[:300].strip()
-            if len(cleaned_text) > 300:
-                last_period = excerpt.rfind('.')
-                if last_period > 150:
-                    excerpt = excerpt[:last_period + 1]
-                else:
-                    excerpt = excerpt + '...'
-            
-            if excerpt.strip() and len(excerpt.strip()) > 10:
-                answer_parts.append(f"{title}\n\n{excerpt}")
-            
-            # Format citation as string (schema expects List[str])
-            if source and source.strip():
-                citation_str = source.strip()
-            elif title and title.strip():
-                citation_str = title.strip()
-            else:
-                citation_str = filename if filename else "Untitled"
-            
-            # Only add unique citations
-            if citation_str not in citations:
-                citations.append(citation_str)
-        
-        answer = "\n\n---\n\n".join(answer_parts)
-        if len(answer) > 6000:
-            answer = answer[:6000] + "..."
+            reply, prepared = await _llm_retrieval(req)
+    except Exception as e:
+        reply, prepared = {"reply": f"Error retrieving documents: {str(e)}", "citations": []}, None
+    if reply is not None:
+        yield _sse("token", {"text": reply["reply"]})
+        yield _sse("citations", {"citations": reply["citations"]})
+        return
+    
+    cache_emb, llm_context, context_documents, citations = prepared
+    parts = []
+    try:
+        async for token in retrieval_pipeline.generate_stream(req.message, req.language, context_documents):
+            parts.append(token)
+            yield _sse("token", {"text": token})
+    except Overloaded:
+        # Raised before the first token: shed to the excerpt answer
+        reply = await _shed_reply(req, context_documents, citations)
+        yield _sse("token", {"text": reply["reply"]})
+        yield _sse("citations", {"citations": reply["citations"]})
+        return
+    except Exception as e:
+        yield _sse("error", {"message": f"Error generating reply: {str(e)}"})
+        return
+    
+    if cache_emb is not None:
+        _semantic_cache.set(cache_emb, llm_context, ("".join(parts), tuple(citations)))
+    yield _sse("citations", {"citations": citations})
+
+
+@router.post("/messages:batch", response_model=ChatBatchResponse, response_model_exclude_none=True)
+async def post_messages_batch(batch: ChatBatchRequest):
+    """
+    Answer many messages in one call (evaluations, bulk SMS); results keep the input order.
+    
+    In retrieval-only mode the uncached messages are embedded together and
+    searched with one batched index call over the query matrix. With an LLM
+    configured each message takes the normal `post_message` path, a few at
+    a time (CHAT_BATCH_LLM_CONCURRENCY).
+    """
+    reqs = batch.messages
+    if len(reqs) > settings.CHAT_BATCH_MAX_MESSAGES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.CHAT_BATCH_MAX_MESSAGES} messages per batch",
+        )
+    if not reqs:
+        return {"results": []}
+    
+    if not _retrieval_only_mode():
+        semaphore = asyncio.Semaphore(max(1, settings.CHAT_BATCH_LLM_CONCURRENCY))
         
-        if not answer:
-            answer = "No relevant documents found. Please try rephrasing your question."
+        async def answer(req: ChatRequest):
+            async with semaphore:
+                return await post_message(req, debug=False)
         
-        return {
-            "reply": answer,
-            "citations": citations
-        }
-    
-    # Prepare context from retrieved documents
-    context_documents = [f"{d['title']}\n{d['content'][:1500]}" for d in docs]
-    context = "\n\n".join(context_documents)
+        return {"results": await asyncio.gather(*(answer(req) for req in reqs))}
     
-    # Try to use fine-tuned LLM service
+    pipeline = retrieval_pipeline
     try:
-        from app.services.llm_service import generate_response
+        index = await pipeline.load_index()
+        if index is None:
+            reply = {
+                "reply": "RAG index not found. Please run the indexing pipeline first. See README_RAG_SETUP.md",
+                "citations": []
+            }
+            return {"results": [reply] * len(reqs)}
         
-        # Build messages for LLM
-        messages = [{"role": "user", "content": req.message}]
+        results = [None] * len(reqs)
+        cache_keys = [_response_cache_key(req, index) for req in reqs]
+        for q, cache_key in enumerate(cache_keys):
+            cached = _response_cache.get(cache_key)
+            if cached is not None:
+                results[q] = {"reply": cached[0], "citations": list(cached[1])}
         
-        # System prompt based on language
-        system_prompt = (
-            "You are AfroKen LLM, a helpful assistant for Kenyan government services. "
-            "Answer in simple Swahili unless requested otherwise. "
-            "Ground your answers in the provided documents and always cite sources. "
-            "If you don't know the answer, say so clearly."
-        )
+        # One embedding call for every message not answered from the exact cache
+        pending = [q for q in range(len(reqs)) if results[q] is None]
+        query_embs = await pipeline.embed_batch([reqs[q].message for q in pending]) if pending else None
         
-        # Generate response using fine-tuned LLM
-        llm_result = await generate_response(
-            messages=messages,
-            system_prompt=system_prompt,
-            temperature=0.7,
-            max_tokens=1000,
-            context_documents=context_documents
-        )
+        search_rows = []
+        for row, q in enumerate(pending):
+            if SEMANTIC_CACHE_ENABLED:
+                cached = _semantic_cache.get(query_embs[row], cache_keys[q][1:])
+                if cached is not None:
+                    _response_cache.set(cache_keys[q], cached)
+                    results[q] = {"reply": cached[0], "citations": list(cached[1])}
+                    continue
+            search_rows.append(row)
         
-        answer = llm_result["text"]
-        tokens_used = llm_result.get("tokens_used", 0)
+        if search_rows:
+            # One batched index search over the query matrix
+            search_qs = [pending[row] for row in search_rows]
+            retrieved = await pipeline.retrieve_batch(
+                index,
+                query_embs[search_rows],
+                [reqs[q].message for q in search_qs],
+                [reqs[q].category for q in search_qs],
+            )
+            for row, q, result in zip(search_rows, search_qs, retrieved):
+                if result is None:
+                    results[q] = {
+                        "reply": "RAG index not found. Please run the indexing pipeline first.",
+                        "citations": []
+                    }
+                    continue
+                top_distances, top_indices, complete = result
+                answer, citations, _ = pipeline.format(index, top_distances, top_indices)
+                results[q] = {"reply": answer, "citations": citations}
+                if complete:
+                    _response_cache.set(cache_keys[q], (answer, tuple(citations)))
+                    if SEMANTIC_CACHE_ENABLED:
+                        _semantic_cache.set(query_embs[row], cache_keys[q][1:], (answer, tuple(citations)))
         
-    except (ImportError, ValueError, Exception) as llm_error:
-        # Fallback to generic LLM endpoint or document excerpts
-        if settings.LLM_ENDPOINT:
-            # Use generic LLM endpoint
-            payload = {
-                "system": "You are AfroKen LLM. Answer in simple Swahili unless requested otherwise. Ground answers in provided documents and add citations.",
-                "documents": context,
-                "user_message": req.message,
-                "language": req.language,
-            }
-            async with httpx.AsyncClient(timeout=20) as client:
-                res = await client.post(settings.LLM_ENDPOINT, json=payload)
-                res.raise_for_status()
-                data = res.json()
-                answer = data.get("answer", "Samahani, sijaelewa. Tafadhali fafanua.")
-        else:
-            # Final fallback: return document excerpts
-            answer = context[:6000] if context else "No relevant documents found. Please try rephrasing your question."
-    
-    # Build citations from documents
-    citations = []
-    for d in docs:
-        citation = d.get("source_url") or d.get("title", "Untitled")
-        if citation and citation not in citations:
-            citations.append(citation)
+        return {"results": results}
     
-    # Return ChatResponse
-    return {"reply": answer, "citations": citations}
+    except Exception as e:
+        reply = {
+            "reply": f"Error retrieving documents: {str(e)}",
+            "citations": []
+        }
+        return {"results": [reply] * len(reqs)}
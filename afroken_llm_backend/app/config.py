@@ -57,8 +57,121 @@ class Settings(BaseSettings):
     FINE_TUNED_LLM_ENDPOINT: Optional[str] = Field(None, env="FINE_TUNED_LLM_ENDPOINT")
     # Optional HTTP endpoint providing embeddings (if not set, we fall back to a demo embedding).
     EMBEDDING_ENDPOINT: Optional[str] = Field(None, env="EMBEDDING_ENDPOINT")
+    # Timeout in seconds of calls to the LLM endpoints (shared pooled client).
+    LLM_HTTP_TIMEOUT: float = Field(60.0, env="LLM_HTTP_TIMEOUT")
+    # Concurrent identical LLM requests (same prompt, endpoint, temperature) share one upstream call.
+    LLM_SINGLE_FLIGHT: bool = Field(True, env="LLM_SINGLE_FLIGHT")
+    # Upstream LLM requests allowed to run at once (0 = unlimited).
+    LLM_MAX_CONCURRENCY: int = Field(8, env="LLM_MAX_CONCURRENCY")
+    # LLM requests allowed to wait for a free slot; beyond this, replies fall back to excerpts at once.
+    LLM_MAX_QUEUE: int = Field(32, env="LLM_MAX_QUEUE")
+    # Longest wait for a free LLM slot before the reply falls back to retrieved excerpts.
+    LLM_MAX_QUEUE_WAIT_MS: float = Field(2000.0, env="LLM_MAX_QUEUE_WAIT_MS")
+    # Hugging Face tokenizer of the LLM (e.g. "mistralai/Mistral-7B-Instruct-v0.2") used to count
+    # prompt tokens; None estimates ~4 characters per token.
+    LLM_TOKENIZER: Optional[str] = Field(None, env="LLM_TOKENIZER")
+    # Prompt tokens of retrieved documents packed into the LLM context, most relevant first.
+    LLM_CONTEXT_TOKEN_BUDGET: int = Field(1500, env="LLM_CONTEXT_TOKEN_BUDGET")
+    # Most context tokens taken from any single document (0 = no per-document cap).
+    LLM_DOCUMENT_TOKEN_LIMIT: int = Field(600, env="LLM_DOCUMENT_TOKEN_LIMIT")
+    # Timeout in seconds of calls to the embedding endpoint (shared pooled client).
+    EMBEDDING_HTTP_TIMEOUT: float = Field(30.0, env="EMBEDDING_HTTP_TIMEOUT")
+    # Connect timeout in seconds for every outbound HTTP client.
+    HTTP_CONNECT_TIMEOUT: float = Field(5.0, env="HTTP_CONNECT_TIMEOUT")
+    # Most open connections per shared HTTP client.
+    HTTP_MAX_CONNECTIONS: int = Field(100, env="HTTP_MAX_CONNECTIONS")
+    # Idle keep-alive connections kept open per shared HTTP client.
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = Field(20, env="HTTP_MAX_KEEPALIVE_CONNECTIONS")
+    # Seconds an idle keep-alive connection stays open.
+    HTTP_KEEPALIVE_EXPIRY: float = Field(30.0, env="HTTP_KEEPALIVE_EXPIRY")
+    # Negotiate HTTP/2 with the endpoints when the `h2` package is installed.
+    HTTP2_ENABLED: bool = Field(True, env="HTTP2_ENABLED")
     # Dimensionality of embedding vectors expected by the database / vector index.
     EMBEDDING_DIM: int = Field(384, env="EMBEDDING_DIM")
+    # Maximum number of concurrent chat queries encoded together in one `model.encode` call.
+    EMBEDDING_BATCH_SIZE: int = Field(32, env="EMBEDDING_BATCH_SIZE")
+    # How long (milliseconds) the query micro-batcher waits for more queries before encoding.
+    EMBEDDING_BATCH_WAIT_MS: float = Field(5.0, env="EMBEDDING_BATCH_WAIT_MS")
+    # Number of normalized query embeddings kept in the in-process LRU cache.
+    EMBEDDING_CACHE_SIZE: int = Field(4096, env="EMBEDDING_CACHE_SIZE")
+    # Seconds before a cached query embedding expires.
+    EMBEDDING_CACHE_TTL_SECONDS: float = Field(3600.0, env="EMBEDDING_CACHE_TTL_SECONDS")
+    # Number of full chat responses (retrieval-only mode) kept in the in-process LRU cache.
+    RESPONSE_CACHE_SIZE: int = Field(2048, env="RESPONSE_CACHE_SIZE")
+    # Upper bound (bytes of reply + citation text) on the chat response cache.
+    RESPONSE_CACHE_MAX_BYTES: int = Field(16 * 1024 * 1024, env="RESPONSE_CACHE_MAX_BYTES")
+    # Past answers kept in the semantic (embedding-similarity) answer cache; 0 disables it.
+    SEMANTIC_CACHE_SIZE: int = Field(2048, env="SEMANTIC_CACHE_SIZE")
+    # Minimum cosine similarity between a new query and a cached one to reuse its answer.
+    SEMANTIC_CACHE_THRESHOLD: float = Field(0.92, env="SEMANTIC_CACHE_THRESHOLD")
+    # Seconds before a semantically cached answer expires.
+    SEMANTIC_CACHE_TTL_SECONDS: float = Field(3600.0, env="SEMANTIC_CACHE_TTL_SECONDS")
+    # Seconds between checks of index_manifest.json for a rebuilt RAG index (hot reload).
+    RAG_INDEX_POLL_SECONDS: float = Field(10.0, env="RAG_INDEX_POLL_SECONDS")
+    # Memory-map faiss_index.idx/.npy so all worker processes share one page-cache copy.
+    RAG_INDEX_MMAP: bool = Field(False, env="RAG_INDEX_MMAP")
+    # FAISS index type built by scripts/rag/index_faiss.py: "flat" (exact), "hnsw", "ivf",
+    # or the product-quantized "ivfpq" / "opq" for memory-constrained nodes.
+    RAG_INDEX_TYPE: str = Field("flat", env="RAG_INDEX_TYPE")
+    # HNSW build: neighbours per graph node (M).
+    RAG_HNSW_M: int = Field(32, env="RAG_HNSW_M")
+    # HNSW build: candidate list size while inserting (efConstruction).
+    RAG_HNSW_EF_CONSTRUCTION: int = Field(200, env="RAG_HNSW_EF_CONSTRUCTION")
+    # HNSW search: candidate list size per query (efSearch); None = value stored in the index manifest.
+    RAG_HNSW_EF_SEARCH: Optional[int] = Field(None, env="RAG_HNSW_EF_SEARCH")
+    # IVF build: number of k-means clusters (nlist).
+    RAG_IVF_NLIST: int = Field(1024, env="RAG_IVF_NLIST")
+    # IVF search: clusters visited per query (nprobe); None = value stored in the index manifest.
+    RAG_IVF_NPROBE: Optional[int] = Field(None, env="RAG_IVF_NPROBE")
+    # IVF-PQ/OPQ build: sub-quantizers per vector (= code bytes per chunk at 8 bits).
+    RAG_PQ_M: int = Field(48, env="RAG_PQ_M")
+    # IVF-PQ/OPQ build: bits per sub-quantizer code.
+    RAG_PQ_NBITS: int = Field(8, env="RAG_PQ_NBITS")
+    # Candidates fetched from a quantized index and re-ranked exactly against faiss_index.npy.
+    RAG_RERANK_CANDIDATES: int = Field(100, env="RAG_RERANK_CANDIDATES")
+    # Search over faiss_index.npy when FAISS is not used: "exact" (full cosine scan) or
+    # "binary" (1-bit Hamming prefilter, then exact re-rank of the candidates).
+    RAG_NUMPY_SEARCH: str = Field("exact", env="RAG_NUMPY_SEARCH")
+    # Candidates kept by the binary prefilter and re-scored against the float vectors.
+    RAG_BINARY_CANDIDATES: int = Field(256, env="RAG_BINARY_CANDIDATES")
+    # Chunks / documents used per chat reply, on the retrieval-only and the LLM path alike
+    # (the most kept when RAG_ADAPTIVE_TOP_K is on).
+    RAG_TOP_K: int = Field(3, env="RAG_TOP_K")
+    # Keep only as many chunks as the relevance scores justify, between RAG_MIN_K and RAG_TOP_K.
+    RAG_ADAPTIVE_TOP_K: bool = Field(True, env="RAG_ADAPTIVE_TOP_K")
+    # Fewest chunks / documents kept per reply by adaptive top-k.
+    RAG_MIN_K: int = Field(1, env="RAG_MIN_K")
+    # Cosine similarity (or squashed cross-encoder score) below which chunks beyond RAG_MIN_K are dropped.
+    RAG_MIN_SIMILARITY: float = Field(0.3, env="RAG_MIN_SIMILARITY")
+    # Smallest drop between consecutive scores at which adaptive top-k cuts the list.
+    RAG_SCORE_GAP: float = Field(0.08, env="RAG_SCORE_GAP")
+    # Maximum messages accepted by one /api/v1/chat/messages:batch request.
+    CHAT_BATCH_MAX_MESSAGES: int = Field(1000, env="CHAT_BATCH_MAX_MESSAGES")
+    # Messages of a batch answered concurrently when replies come from the LLM.
+    CHAT_BATCH_LLM_CONCURRENCY: int = Field(4, env="CHAT_BATCH_LLM_CONCURRENCY")
+    # Dense and BM25 hits merged by reciprocal rank fusion per query (0 = dense-only search).
+    RAG_HYBRID_CANDIDATES: int = Field(20, env="RAG_HYBRID_CANDIDATES")
+    # Reciprocal rank fusion constant k in 1 / (k + rank).
+    RAG_RRF_K: int = Field(60, env="RAG_RRF_K")
+    # Optional cross-encoder (sentence-transformers name, e.g. "cross-encoder/ms-marco-MiniLM-L-6-v2")
+    # that re-ranks retrieved chunks before the top-k are kept; None disables re-ranking.
+    RAG_CROSS_ENCODER_MODEL: Optional[str] = Field(None, env="RAG_CROSS_ENCODER_MODEL")
+    # Chunks retrieved and scored by the cross-encoder per query (one batched forward pass).
+    RAG_CROSS_ENCODER_CANDIDATES: int = Field(30, env="RAG_CROSS_ENCODER_CANDIDATES")
+    # Hard latency budget for re-ranking; past it the retrieval order is used as-is.
+    RAG_CROSS_ENCODER_BUDGET_MS: float = Field(150.0, env="RAG_CROSS_ENCODER_BUDGET_MS")
+    # Maximum tokens of (query + chunk) fed to the cross-encoder.
+    RAG_CROSS_ENCODER_MAX_LENGTH: int = Field(256, env="RAG_CROSS_ENCODER_MAX_LENGTH")
+    # Dedicated threads for cross-encoder forward passes; when all are busy, re-ranking is skipped.
+    RAG_CROSS_ENCODER_WORKERS: int = Field(1, env="RAG_CROSS_ENCODER_WORKERS")
+    # Candidates diversified with Maximal Marginal Relevance before the top-k are kept (0 = no MMR).
+    RAG_MMR_CANDIDATES: int = Field(15, env="RAG_MMR_CANDIDATES")
+    # MMR trade-off: 1.0 = pure relevance, 0.0 = pure diversity.
+    RAG_MMR_LAMBDA: float = Field(0.7, env="RAG_MMR_LAMBDA")
+    # Maximum chunks from one source page in a reply's context (0 = no cap).
+    RAG_MAX_CHUNKS_PER_SOURCE: int = Field(2, env="RAG_MAX_CHUNKS_PER_SOURCE")
+    # Worker threads for embedding/vector search (off the event loop); defaults to the CPU count.
+    RETRIEVAL_WORKERS: Optional[int] = Field(None, env="RETRIEVAL_WORKERS")
 
     # Environment name, used to toggle behaviours like CORS (e.g. "development", "production").
     ENV: str = Field("development", env="ENV")
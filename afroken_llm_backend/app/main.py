@@ -6,12 +6,10 @@ This module:
 - Sets up CORS.
 - Registers API routers.
 - Exposes health/readiness/metrics endpoints.
-- Initializes the database and a global async lock on startup.
+- Initializes the database and the shared HTTP clients on startup.
 - Preloads RAG resources for faster first query.
 """
 
-import asyncio
-
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse, Response
 from starlette.middleware.cors import CORSMiddleware
@@ -21,10 +19,13 @@ from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_
 from app.config import settings
 from app.db import init_db
 from app.api.routes import auth, chat, admin, ussd, audio
+from app.services import context_packer, reranker
+from app.services.rag_index import index_manager
+from app.utils.http_clients import close_http_clients, start_http_clients
+from app.utils.retrieval_pool import shutdown_retrieval_pool
 
 # Preload RAG resources on startup
 try:
-    from app.api.routes.chat import _load_rag_resources
     from app.utils.embeddings_fallback import get_embedding as preload_embedding
     # Preload embedding model
     _ = preload_embedding("preload")
@@ -85,31 +86,60 @@ async def on_startup() -> None:
     FastAPI startup hook.
 
     - Initializes the database schema (creates tables if missing).
-    - Creates and stores a global asyncio lock in `app.state` that can be shared
-      by other parts of the application to serialize access to a single LLM,
-      if required.
-    - Preloads RAG resources for faster first query.
+    - Preloads RAG resources for faster first query and starts watching the
+      index manifest so re-indexed builds are picked up without a restart.
+    - Opens the pooled HTTP clients of the configured LLM / embedding endpoints.
     """
 
     # Run table creation against the configured database.
     # This will gracefully handle missing database connections for local RAG-only mode
     init_db()
     
-    # Store a global async lock that can be used to guard model access.
-    app.state.model_lock = asyncio.Lock()
+    # Keep-alive clients for the remote endpoints, reused by every request
+    start_http_clients()
     
     # Preload RAG resources (critical for chat functionality)
     try:
-        _load_rag_resources()
-        print("✓ RAG resources preloaded")
+        if index_manager.ensure_loaded() is not None:
+            print("✓ RAG resources preloaded")
+        else:
+            print("⚠ RAG resources not available")
+            print("  Chat functionality may be limited")
     except Exception as e:
         print(f"⚠ RAG resources not available: {e}")
         print("  Chat functionality may be limited")
+    index_manager.start_watching()
+    
+    # Load the optional cross-encoder now rather than inside the first request's budget
+    try:
+        reranker.warm_up()
+    except Exception as e:
+        print(f"⚠ Cross-encoder not available: {e}")
+    
+    # Same for the LLM tokenizer used to pack the prompt context
+    context_packer.warm_up()
     
     # Log a simple startup message for debugging/observability.
     print("AfroKen backend startup complete")
 
 
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    """
+    FastAPI shutdown hook.
+
+    - Stops the RAG index watcher.
+    - Stops the retrieval thread pool used for embedding/vector search.
+    - Stops the cross-encoder re-ranking thread pool.
+    - Closes the pooled HTTP clients and their connections.
+    """
+
+    await index_manager.stop_watching()
+    shutdown_retrieval_pool()
+    reranker.shutdown_rerank_pool()
+    await close_http_clients()
+
+
 @app.get("/health")
 async def health():
     """
@@ -132,7 +162,8 @@ async def ready():
 
     try:
         # Here you could ping DB/Redis/MinIO if desired; for now we assume ready.
-        return {"status": "ready"}
+        # Report which RAG index build is being served (None until one is loaded).
+        return {"status": "ready", "index_version": index_manager.active_version}
     except Exception as exc:  # pragma: no cover - defensive
         # In case of unexpected errors, expose a 503 with error details for debugging.
         return JSONResponse(
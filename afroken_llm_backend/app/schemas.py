@@ -6,7 +6,7 @@ FastAPI endpoints. FastAPI uses them for validation and OpenAPI docs.
 """
 
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 
 
 class TokenRequest(BaseModel):
@@ -43,6 +43,9 @@ class ChatRequest(BaseModel):
     device: Optional[str] = "web"
     # Preferred reply language code; defaults to Swahili ("sw").
     language: Optional[str] = "sw"
+    # Optional service category (e.g. "kra", "nhif"); when set, retrieval only
+    # searches chunks of that category.
+    category: Optional[str] = None
 
 
 class ChatResponse(BaseModel):
@@ -54,6 +57,27 @@ class ChatResponse(BaseModel):
     reply: str
     # List of citation identifiers/URLs/titles that support the answer.
     citations: Optional[List[str]] = []
+    # Retrieval details (index version, category, per-chunk scores); only with ?debug=true.
+    debug: Optional[Dict[str, Any]] = None
+
+
+class ChatBatchRequest(BaseModel):
+    """
+    Request payload for answering many chat messages in one call
+    (nightly evaluations, bulk SMS answer generation).
+    """
+
+    # Messages to answer; each keeps its own language / category.
+    messages: List[ChatRequest]
+
+
+class ChatBatchResponse(BaseModel):
+    """
+    Response payload of the batch chat endpoint.
+    """
+
+    # One response per input message, in the same order.
+    results: List[ChatResponse]
 
 
 class DocumentIn(BaseModel):
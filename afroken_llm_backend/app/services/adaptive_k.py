@@ -0,0 +1,59 @@
+"""
+Adaptive top-k: how many retrieved chunks a reply actually needs.
+
+A fixed top-k sends the same number of chunks for "KRA PIN registration"
+(one chunk answers it) as for a vague multi-part question. Instead, the
+relevance scores of the candidates (best first) are cut
+
+    - below `min_score` (chunks that are not similar enough to matter), and
+    - at the largest drop between two consecutive scores, if that drop is at
+      least `min_gap` (the clearly relevant head vs. the long tail),
+
+while always keeping between `min_k` and `max_k` chunks. Easy queries end up
+with one or two chunks, hard ones with up to `max_k`, so the LLM context
+(prompt tokens, generation latency) shrinks on most traffic.
+"""
+
+from typing import Optional, Sequence
+
+import numpy as np
+
+
+def adaptive_k(
+    scores: Sequence[Optional[float]],
+    min_k: int = 1,
+    max_k: int = 3,
+    min_score: float = 0.0,
+    min_gap: float = 0.0,
+) -> int:
+    """
+    Number of candidates to keep given their relevance scores (higher = better).
+
+    Args:
+        scores: Scores of the candidates in any order; None entries (e.g.
+            lexical-only hits without a dense similarity) are ignored.
+        min_k: Fewest candidates kept (if that many exist).
+        max_k: Most candidates kept.
+        min_score: Candidates below this score are dropped beyond `min_k`.
+        min_gap: Smallest score drop that counts as a cut point (0 = cut at
+            the largest drop whatever its size).
+
+    Without any score, `max_k` is returned.
+    """
+    max_k = max(1, int(max_k))
+    min_k = min(max(1, int(min_k)), max_k)
+    known = np.asarray([s for s in scores if s is not None], dtype=np.float32)
+    if not len(known):
+        return max_k
+    window = -np.sort(-known)[:max_k]
+    if len(window) <= min_k:
+        return min_k
+
+    keep = max(min_k, int((window >= min_score).sum()))
+    if keep > min_k:
+        # gaps[j] = drop between candidate j and j + 1; cutting after j keeps j + 1
+        gaps = window[min_k - 1:keep - 1] - window[min_k:keep]
+        largest = int(np.argmax(gaps))
+        if gaps[largest] > 0 and gaps[largest] >= min_gap:
+            keep = min_k + largest
+    return keep
@@ -0,0 +1,116 @@
+"""
+BM25 lexical index and reciprocal rank fusion with the dense (FAISS) results.
+
+Dense MiniLM retrieval blurs exact tokens such as "KRA PIN", "NSSF" or form
+numbers. `scripts/rag/index_faiss.py` therefore also writes a BM25 inverted
+index over the same chunk texts into `bm25/`:
+
+    bm25/meta.json     {"count": N, "k1": ..., "b": ..., "tokenizer": "nfkc-casefold-word"}
+    bm25/terms.json    sorted vocabulary; term i owns postings offsets[i]:offsets[i + 1]
+    bm25/offsets.npy   int64 (V + 1)
+    bm25/doc_ids.npy   int32 posting doc ids
+    bm25/weights.npy   float32 precomputed BM25 term weight of each posting
+
+Because each posting already stores its full BM25 contribution
+(idf * saturated tf), scoring a query is a gather + grouped sum over the
+postings of its terms: no per-query work proportional to the corpus size.
+"""
+
+import json
+import re
+import unicodedata
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+BM25_DIR = 'bm25'
+
+# Same tokenizer as index_faiss.tokenize: NFKC, case folded, word characters
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into BM25 terms (keeps numbers, so form numbers match)."""
+    return _TOKEN_RE.findall(unicodedata.normalize('NFKC', text or '').casefold())
+
+
+class BM25Index:
+    """
+    Read-only BM25 index loaded from the `bm25/` directory.
+
+    Args:
+        directory: Directory written by index_faiss.write_bm25_index.
+        mmap: Memory-map the postings arrays instead of reading them.
+    """
+
+    def __init__(self, directory: Path, mmap: bool = False) -> None:
+        directory = Path(directory)
+        with open(directory / 'meta.json', 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        with open(directory / 'terms.json', 'r', encoding='utf-8') as f:
+            terms = json.load(f)
+
+        self.count = int(meta['count'])
+        self._term_ids: Dict[str, int] = {term: i for i, term in enumerate(terms)}
+        mmap_mode = 'r' if mmap else None
+        self._offsets = np.load(str(directory / 'offsets.npy'), mmap_mode=mmap_mode)
+        self._doc_ids = np.load(str(directory / 'doc_ids.npy'), mmap_mode=mmap_mode)
+        self._weights = np.load(str(directory / 'weights.npy'), mmap_mode=mmap_mode)
+
+    def search(
+        self, text: str, k: int = 10, allowed: Optional[Callable[[np.ndarray], np.ndarray]] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return (scores, doc_ids) of the k best BM25 matches, best first.
+
+        `allowed` maps an array of doc ids to a boolean keep-mask (a category
+        partition); postings of other documents are dropped before scoring.
+        Both arrays are empty if no query term occurs in the searched documents.
+        """
+        doc_parts = []
+        weight_parts = []
+        for term in set(tokenize(text)):
+            term_id = self._term_ids.get(term)
+            if term_id is None:
+                continue
+            start, end = self._offsets[term_id], self._offsets[term_id + 1]
+            doc_parts.append(self._doc_ids[start:end])
+            weight_parts.append(self._weights[start:end])
+        if not doc_parts:
+            return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64)
+        doc_ids = np.concatenate(doc_parts)
+        weights = np.concatenate(weight_parts)
+        if allowed is not None:
+            keep = allowed(doc_ids)
+            doc_ids, weights = doc_ids[keep], weights[keep]
+            if not len(doc_ids):
+                return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64)
+
+        # Sum the weights of each document over the query terms
+        docs, inverse = np.unique(doc_ids, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights)
+
+        k = min(int(k), len(docs))
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(docs) else np.arange(len(docs))
+        top = top[np.argsort(-scores[top])]
+        return scores[top].astype(np.float32), docs[top].astype(np.int64)
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], k: int = 60) -> List[Tuple[int, float]]:
+    """
+    Merge ranked id lists with reciprocal rank fusion.
+
+    Each id scores sum(1 / (k + rank)) over the lists it appears in (rank
+    starting at 1). Returns (id, score) pairs, best first. Ids < 0 (FAISS
+    padding) are ignored.
+    """
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            doc_id = int(doc_id)
+            if doc_id < 0:
+                continue
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,137 @@
+"""
+Read-only columnar store for chunk metadata (titles, excerpts, citations, ...).
+
+Written by `scripts/rag/index_faiss.py` into `chunk_store/`:
+
+    chunk_store/meta.json     {"count": N, "str_fields": [...], "int_fields": [...]}
+    chunk_store/offsets.npy   int64 (len(str_fields), N + 1) byte offsets into strings.bin
+    chunk_store/strings.bin   UTF-8 text of every string field, one column after another
+    chunk_store/ints.npy      int64 (len(int_fields), N)
+    chunk_store/category_offsets.npy  int64 (C + 1); category c owns ids offsets[c]:offsets[c + 1]
+    chunk_store/category_ids.npy      int64 (N) chunk ids grouped by category, sorted within each
+
+Both the blob and the offset arrays are memory-mapped, so opening a store costs
+a few page faults regardless of corpus size, and looking up chunk `i` only
+decodes the fields of that one chunk. `doc_map.json` is still written as a
+debugging export and is read (via `DocMapChunks`) only when no store exists.
+
+The category partition (meta `categories` + the two category arrays) lets
+filtered searches restrict themselves to one category's chunk ids.
+"""
+
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+
+CHUNK_STORE_DIR = 'chunk_store'
+
+
+def category_key(category: Optional[str]) -> str:
+    """Normalized category name used to look up partitions ("KRA " -> "kra")."""
+    return (category or '').strip().casefold()
+
+
+def _group_by_category(items: Iterable[Tuple[int, Any]]) -> Dict[str, np.ndarray]:
+    """Sorted int64 chunk ids per normalized category from (chunk id, category) pairs."""
+    groups: Dict[str, list] = {}
+    for idx, category in sorted(items):
+        groups.setdefault(category_key(category), []).append(idx)
+    return {name: np.array(ids, dtype=np.int64) for name, ids in groups.items()}
+
+
+class ChunkStore:
+    """
+    O(1) access to chunk metadata by integer id, decoded lazily.
+
+    Args:
+        directory: The `chunk_store/` directory written by index_faiss.py.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        directory = Path(directory)
+        with open(directory / 'meta.json', 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+
+        self.count = int(meta['count'])
+        self.str_fields = list(meta['str_fields'])
+        self.int_fields = list(meta.get('int_fields', []))
+
+        self._offsets = np.load(str(directory / 'offsets.npy'), mmap_mode='r')
+        self._ints = np.load(str(directory / 'ints.npy'), mmap_mode='r') if self.int_fields else None
+        self.categories = list(meta.get('categories', []))
+        if self.categories:
+            self._category_offsets = np.load(str(directory / 'category_offsets.npy'), mmap_mode='r')
+            self._category_ids = np.load(str(directory / 'category_ids.npy'), mmap_mode='r')
+        blob_file = directory / 'strings.bin'
+        # np.memmap cannot map an empty file
+        if blob_file.stat().st_size:
+            self._blob = np.memmap(str(blob_file), dtype=np.uint8, mode='r')
+        else:
+            self._blob = np.zeros(0, dtype=np.uint8)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def field(self, idx: int, name: str) -> Any:
+        """Return a single field of chunk `idx` (no other field is decoded)."""
+        if name in self.int_fields:
+            return int(self._ints[self.int_fields.index(name), idx])
+        f = self.str_fields.index(name)
+        start, end = self._offsets[f, idx], self._offsets[f, idx + 1]
+        return self._blob[start:end].tobytes().decode('utf-8')
+
+    def get(self, idx: int) -> Optional[Dict[str, Any]]:
+        """Return all fields of chunk `idx` as a dict, or None if out of range."""
+        if not 0 <= idx < self.count:
+            return None
+        doc = {}
+        for f, name in enumerate(self.str_fields):
+            start, end = self._offsets[f, idx], self._offsets[f, idx + 1]
+            doc[name] = self._blob[start:end].tobytes().decode('utf-8')
+        for f, name in enumerate(self.int_fields):
+            doc[name] = int(self._ints[f, idx])
+        return doc
+
+    def category_ids(self) -> Dict[str, np.ndarray]:
+        """Sorted chunk ids of every category, keyed by `category_key`."""
+        if self.categories:
+            offsets = self._category_offsets
+            return {
+                category_key(name): np.asarray(self._category_ids[offsets[c]:offsets[c + 1]])
+                for c, name in enumerate(self.categories)
+            }
+        # Store written before the partition arrays existed: group the column once
+        if 'category' not in self.str_fields:
+            return {}
+        return _group_by_category((idx, self.field(idx, 'category')) for idx in range(self.count))
+
+
+class DocMapChunks:
+    """
+    `ChunkStore`-compatible view over a parsed doc_map.json (legacy indexes).
+
+    Args:
+        doc_map: Chunk id (stringified int) -> metadata dict.
+    """
+
+    def __init__(self, doc_map: Dict[str, Dict[str, Any]]) -> None:
+        self._docs = {int(key): doc for key, doc in doc_map.items()}
+        self.count = len(self._docs)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def field(self, idx: int, name: str) -> Any:
+        """Return a single field of chunk `idx`."""
+        return self._docs[idx].get(name)
+
+    def get(self, idx: int) -> Optional[Dict[str, Any]]:
+        """Return the metadata dict of chunk `idx`, or None if unknown."""
+        return self._docs.get(idx)
+
+    def category_ids(self) -> Dict[str, np.ndarray]:
+        """Sorted chunk ids of every category, keyed by `category_key`."""
+        return _group_by_category((idx, doc.get('category')) for idx, doc in self._docs.items())
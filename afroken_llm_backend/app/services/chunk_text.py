@@ -0,0 +1,69 @@
+"""
+Display text of indexed chunks: Markdown cleaning, excerpts and citations.
+
+Shared by `scripts/rag/index_faiss.py`, which precomputes the `excerpt` and
+`citation` of every chunk at build time, and by `rag_index`, which fills
+them in once at load time for doc_map.json files written by older builds.
+Keeping one copy guarantees both produce identical answers.
+"""
+
+import re
+
+
+def clean_markdown(text: str) -> str:
+    """
+    Strip Markdown formatting from chunk text for plain-text display.
+
+    Removes headers, bold/italic markers, bullet and numbered list prefixes,
+    list indentation and runs of blank lines. Done once at index-build (or
+    index-load) time so the chat endpoint never runs these regexes per request.
+    """
+    cleaned_text = text or ''
+    # Remove markdown headers (# ## ###) - match at start of line
+    cleaned_text = re.sub(r'^#{1,6}\s+', '', cleaned_text, flags=re.MULTILINE)
+    # Remove markdown bold (**text**)
+    cleaned_text = re.sub(r'\*\*(.+?)\*\*', r'\1', cleaned_text)
+    # Remove markdown italic (*text*)
+    cleaned_text = re.sub(r'\*(.+?)\*', r'\1', cleaned_text)
+    # Remove markdown bullet lists (- item or * item)
+    cleaned_text = re.sub(r'^\s*[-*]\s+', '', cleaned_text, flags=re.MULTILINE)
+    # Remove numbered lists (1. 2. 3.)
+    cleaned_text = re.sub(r'^\s*\d+\.\s+', '', cleaned_text, flags=re.MULTILINE)
+    # Remove indentation from list items (   - item)
+    cleaned_text = re.sub(r'^\s{2,}', '', cleaned_text, flags=re.MULTILINE)
+    # Remove extra blank lines (more than 2 consecutive)
+    cleaned_text = re.sub(r'\n{3,}', '\n\n', cleaned_text)
+    return cleaned_text.strip()
+
+
+def make_excerpt(cleaned_text: str, max_chars: int = 300) -> str:
+    """
+    Cut cleaned text to a short excerpt for chat answers.
+
+    Takes the first `max_chars` characters and, if the text was longer,
+    cuts back to the last sentence boundary (or appends '...' when no
+    period falls in the second half of the excerpt).
+    """
+    excerpt = cleaned_text[:max_chars].strip()
+    if len(cleaned_text) > max_chars:
+        # Try to cut at sentence boundary
+        last_period = excerpt.rfind('.')
+        if last_period > max_chars // 2:
+            excerpt = excerpt[:last_period + 1]
+        else:
+            excerpt = excerpt + '...'
+    return excerpt
+
+
+def make_citation(title: str, source: str, filename: str) -> str:
+    """
+    Choose the citation string shown for a chunk.
+
+    Uses the source URL if available, otherwise the title, falling back to
+    the filename (or "Untitled").
+    """
+    if source and source.strip():
+        return source.strip()
+    if title and title.strip():
+        return title.strip()
+    return filename if filename else "Untitled"
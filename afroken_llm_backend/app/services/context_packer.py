@@ -0,0 +1,159 @@
+"""
+Token-budgeted packing of retrieved documents into the LLM context.
+
+Cutting every document to a fixed number of characters and sending all of
+them wastes prompt tokens (and prefill time on the self-hosted model) on
+repeated boilerplate and on the least relevant documents. `pack_context`
+instead fills a token budget in relevance order:
+
+- documents are taken best first and split into sentences;
+- sentences already used by a previous document are dropped;
+- a document is trimmed at the last sentence that still fits the budget;
+  if not even its first sentence fits, that sentence is cut to the tokens
+  left, so a relevant document (and its citation) is never dropped just
+  because it opens with a long sentence.
+
+Tokens are counted with the model's own tokenizer when LLM_TOKENIZER names
+one (loaded through `transformers`), otherwise estimated at ~4 characters
+per token.
+"""
+
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
+
+from app.config import settings
+from app.utils.cache import normalize_query
+
+
+# Sentence ends: ., ! or ? followed by whitespace, or a line break.
+_SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s+|\n+')
+
+
+@lru_cache(maxsize=1)
+def _load_tokenizer(name: str):
+    """
+    Load the tokenizer once (transformers is only imported when configured).
+
+    Returns None if it cannot be loaded; tokens are then estimated.
+    """
+    try:
+        from transformers import AutoTokenizer
+
+        return AutoTokenizer.from_pretrained(name)
+    except Exception as e:
+        print(f"⚠ Tokenizer {name} not available, estimating prompt tokens: {e}")
+        return None
+
+
+def warm_up() -> None:
+    """Load the configured tokenizer ahead of the first request (blocking)."""
+    if settings.LLM_TOKENIZER:
+        _load_tokenizer(settings.LLM_TOKENIZER)
+
+
+def count_tokens(text: str) -> int:
+    """Prompt tokens of `text` for the configured LLM (estimated without LLM_TOKENIZER)."""
+    if not text:
+        return 0
+    tokenizer = _load_tokenizer(settings.LLM_TOKENIZER) if settings.LLM_TOKENIZER else None
+    if tokenizer is not None:
+        return len(tokenizer.encode(text, add_special_tokens=False))
+    return max(1, (len(text) + 3) // 4)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Longest prefix of `text` within `max_tokens` tokens, cut at a word
+    boundary when one falls in the second half of the prefix.
+    """
+    if max_tokens <= 0 or not text:
+        return ''
+    if count_tokens(text) <= max_tokens:
+        return text
+    tokenizer = _load_tokenizer(settings.LLM_TOKENIZER) if settings.LLM_TOKENIZER else None
+    if tokenizer is not None:
+        cut = tokenizer.decode(tokenizer.encode(text, add_special_tokens=False)[:max_tokens])
+    else:
+        cut = text[:max_tokens * 4]
+    # Drop a partial last word, unless the prefix already ends at a word end
+    if not text[len(cut):len(cut) + 1].isspace():
+        space = cut.rfind(' ')
+        if space > len(cut) // 2:
+            cut = cut[:space]
+    # Re-encoding a decoded prefix can merge differently: shrink until it fits
+    while cut and count_tokens(cut) > max_tokens:
+        cut = cut[:-1]
+    return cut.strip()
+
+
+def split_sentences(text: str) -> List[str]:
+    """Non-empty sentences of `text`, in order."""
+    return [s.strip() for s in _SENTENCE_END_RE.split(text or '') if s.strip()]
+
+
+@dataclass
+class PackedContext:
+    """
+    Result of `pack_context`.
+
+    Attributes:
+        documents: Packed passages, best first.
+        kept: Position (in the input) of the document behind each passage.
+        tokens: Prompt tokens of all passages together.
+    """
+
+    documents: List[str] = field(default_factory=list)
+    kept: List[int] = field(default_factory=list)
+    tokens: int = 0
+
+
+def pack_context(
+    documents: Sequence[Tuple[str, str]],
+    budget_tokens: int,
+    max_tokens_per_document: Optional[int] = None,
+) -> PackedContext:
+    """
+    Pack (title, content) documents, best first, into `budget_tokens` prompt tokens.
+
+    Each passage is the title on its own line followed by the sentences of
+    the content that fit (the first one hard-truncated if even it does not
+    fit). `max_tokens_per_document` additionally caps a single passage, so
+    one long page cannot use up the whole budget.
+    """
+    packed = PackedContext()
+    seen = set()
+    for position, (title, content) in enumerate(documents):
+        remaining = budget_tokens - packed.tokens
+        if max_tokens_per_document:
+            remaining = min(remaining, max_tokens_per_document)
+        title = (title or 'Untitled').strip()
+        used = count_tokens(title) + 1  # + line break
+        if used >= remaining:
+            continue
+
+        sentences = []
+        for sentence in split_sentences(content):
+            key = normalize_query(sentence)
+            if not key or key in seen:
+                continue
+            cost = count_tokens(sentence) + 1  # + separating space
+            if used + cost > remaining:
+                if not sentences:
+                    # No whole sentence fits: keep as much of the first one as does
+                    sentence = truncate_to_tokens(sentence, remaining - used - 1)
+                    if sentence:
+                        sentences.append(sentence)
+                        used += count_tokens(sentence) + 1
+                break
+            seen.add(key)
+            sentences.append(sentence)
+            used += cost
+        if not sentences:
+            continue
+
+        packed.documents.append(f"{title}\n{' '.join(sentences)}")
+        packed.kept.append(position)
+        packed.tokens += used
+    return packed
@@ -0,0 +1,131 @@
+"""
+Maximal Marginal Relevance (MMR) selection of retrieved chunks.
+
+`chunk_and_write_md.py` splits each scraped page into neighbouring chunks, so
+a plain top-k often returns several near-identical paragraphs of one URL.
+MMR picks chunks greedily by
+
+    lambda * relevance(chunk) - (1 - lambda) * max similarity to chunks already picked
+
+using one (n, n) similarity matrix over the n candidate vectors, and a
+per-source cap limits how many chunks of the same page are kept. Every
+selected chunk then adds new information to the answer context.
+"""
+
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def source_key(chunks, chunk_id: int) -> str:
+    """The page a chunk was cut from: its source URL, else its file name."""
+    return chunks.field(chunk_id, 'source') or chunks.field(chunk_id, 'filename') or str(chunk_id)
+
+
+def rank_relevance(n: int) -> np.ndarray:
+    """
+    (n,) relevance of candidates in an already ranked list, 1.0 for the first
+    falling linearly towards 0 for the last.
+
+    Hybrid (reciprocal rank fusion) candidates have no single similarity to
+    the query: chunks found only by BM25 ("KRA PIN", form numbers) can be far
+    from it in embedding space. MMR uses their fused rank instead, so it only
+    trades rank for diversity and never re-sorts them by cosine.
+    """
+    return 1.0 - np.arange(n, dtype=np.float32) / max(1, n)
+
+
+def mmr_order(
+    query: np.ndarray,
+    vectors: np.ndarray,
+    k: int,
+    lambda_: float = 0.7,
+    relevance: Optional[np.ndarray] = None,
+    groups: Optional[Sequence[str]] = None,
+    max_per_group: int = 0,
+) -> List[int]:
+    """
+    Positions (into `vectors`) of up to `k` candidates chosen by MMR, in pick order.
+
+    Args:
+        query: (d,) query embedding.
+        vectors: (n, d) candidate embeddings (normalized here).
+        k: Number of candidates to select.
+        lambda_: 1.0 = pure relevance, 0.0 = pure diversity.
+        relevance: (n,) relevance scores to use instead of cosine similarity
+            to the query (e.g. cross-encoder scores squashed to [0, 1]).
+        groups: Group label of every candidate (source page) for the cap.
+        max_per_group: Candidates kept per group (0 = no cap).
+    """
+    vectors = np.array(vectors, dtype=np.float32, ndmin=2)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-8
+    n = len(vectors)
+    if relevance is None:
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        relevance = vectors @ (query / (np.linalg.norm(query) + 1e-8))
+    relevance = np.asarray(relevance, dtype=np.float32)
+
+    group_ids = None
+    if groups is not None and max_per_group > 0:
+        _, group_ids = np.unique(np.asarray(groups, dtype=str), return_inverse=True)
+        group_counts = np.zeros(group_ids.max() + 1, dtype=np.int64)
+
+    similarity = vectors @ vectors.T  # (n, n)
+    # Highest similarity of each candidate to anything selected so far
+    redundancy = np.full(n, -np.inf, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+    selected: List[int] = []
+    while len(selected) < k and available.any():
+        penalty = np.where(np.isfinite(redundancy), redundancy, 0.0)
+        scores = lambda_ * relevance - (1.0 - lambda_) * penalty
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, similarity[best])
+        if group_ids is not None:
+            group = group_ids[best]
+            group_counts[group] += 1
+            if group_counts[group] >= max_per_group:
+                available &= group_ids != group
+    return selected
+
+
+def diversify(
+    index,
+    query_emb: np.ndarray,
+    distances: Sequence[Optional[float]],
+    indices: Sequence[int],
+    k: int,
+    lambda_: float = 0.7,
+    max_per_source: int = 0,
+    relevance: Optional[Sequence[float]] = None,
+) -> Tuple[List[Optional[float]], List[int]]:
+    """
+    Select `k` of the retrieved chunks with MMR and the per-source cap.
+
+    `distances` / `indices` are the retrieval results, best first. Without
+    stored vectors for the candidates only the per-source cap is applied,
+    in retrieval order. Blocking - call it via `run_in_retrieval_pool`.
+    """
+    hits = [(d, int(i)) for d, i in zip(distances, indices) if int(i) >= 0]
+    if relevance is not None:
+        relevance = np.asarray(relevance, dtype=np.float32)[:len(hits)]
+    chunk_ids = [i for _, i in hits]
+    groups = [source_key(index.chunks, i) for i in chunk_ids] if max_per_source > 0 else None
+
+    vectors = index.vectors_for(chunk_ids) if chunk_ids else None
+    if vectors is not None:
+        order = mmr_order(query_emb, vectors, k, lambda_, relevance, groups, max_per_source)
+    else:
+        order = []
+        counts = {}
+        for position in range(len(hits)):
+            if len(order) == k:
+                break
+            if groups is not None:
+                if counts.get(groups[position], 0) >= max_per_source:
+                    continue
+                counts[groups[position]] = counts.get(groups[position], 0) + 1
+            order.append(position)
+    return [hits[o][0] for o in order], [hits[o][1] for o in order]
@@ -2,13 +2,35 @@
 LLM service for fine-tuned Mistral/LLaMA-3 models.
 
 This module provides a unified interface for calling fine-tuned language models.
-Supports both local fine-tuned models and remote endpoints.
+Supports both local fine-tuned models and remote endpoints, either waiting for
+the full completion (`generate_response`) or yielding tokens as the model
+produces them (`stream_response`).
+
+Identical concurrent `generate_response` calls (same prompt, endpoint and
+temperature) share one upstream request (see app.utils.single_flight), and
+at most LLM_MAX_CONCURRENCY requests run upstream at once; callers that find
+no free slot within LLM_MAX_QUEUE_WAIT_MS get `Overloaded` (app.utils.admission).
 """
 
+import hashlib
+import json
 import os
-import httpx
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, AsyncIterator
 from app.config import settings
+from app.utils.admission import AdmissionController
+from app.utils.http_clients import get_async_client
+from app.utils.single_flight import SingleFlight
+
+
+# In-flight generations keyed on (prompt hash, endpoint, temperature)
+_generations = SingleFlight("llm")
+# Limits concurrent upstream LLM requests (blocking and streamed alike)
+llm_admission = AdmissionController(
+    "llm",
+    max_concurrent=settings.LLM_MAX_CONCURRENCY,
+    max_queue=settings.LLM_MAX_QUEUE,
+    max_wait_ms=settings.LLM_MAX_QUEUE_WAIT_MS,
+)
 
 
 async def generate_response(
@@ -33,6 +55,9 @@ async def generate_response(
             - text: Generated response text
             - tokens_used: Number of tokens consumed
             - model: Model identifier used
+    
+    Raises:
+        Overloaded: If the request is not admitted upstream (too many in flight).
     """
     
     # Check for fine-tuned model endpoint
@@ -40,39 +65,103 @@ async def generate_response(
     
     if fine_tuned_endpoint:
         # Use fine-tuned model endpoint (Mistral/LLaMA-3)
-        return await _call_fine_tuned_endpoint(
-            fine_tuned_endpoint,
-            messages,
-            system_prompt,
-            temperature,
-            max_tokens,
-            context_documents
-        )
+        endpoint, call = fine_tuned_endpoint, _call_fine_tuned_endpoint
     elif settings.LLM_ENDPOINT:
         # Fallback to generic LLM endpoint
-        return await _call_generic_endpoint(
-            settings.LLM_ENDPOINT,
-            messages,
-            system_prompt,
-            temperature,
-            max_tokens,
-            context_documents
-        )
+        endpoint, call = settings.LLM_ENDPOINT, _call_generic_endpoint
     else:
         raise ValueError(
             "No LLM endpoint configured. Set FINE_TUNED_LLM_ENDPOINT or LLM_ENDPOINT."
         )
+    
+    args = (endpoint, messages, system_prompt, temperature, max_tokens, context_documents)
+    if not settings.LLM_SINGLE_FLIGHT:
+        return await _admitted(call, *args)
+    
+    # Concurrent identical requests await one shared upstream call (and one admission slot)
+    key = (_prompt_hash(messages, system_prompt, max_tokens, context_documents), endpoint, temperature)
+    result = await _generations.run(key, _admitted, call, *args)
+    # Every caller gets its own dict
+    return dict(result)
 
 
-async def _call_fine_tuned_endpoint(
-    endpoint: str,
+async def _admitted(call, *args) -> Dict[str, Any]:
+    """Run an upstream call once it holds an admission slot."""
+    async with llm_admission.slot():
+        return await call(*args)
+
+
+def _prompt_hash(
     messages: List[Dict[str, str]],
     system_prompt: Optional[str],
-    temperature: float,
     max_tokens: int,
     context_documents: Optional[List[str]]
+) -> str:
+    """SHA-256 of everything that shapes the prompt."""
+    prompt = json.dumps(
+        [messages, system_prompt, max_tokens, context_documents or []],
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+async def stream_response(
+    messages: List[Dict[str, str]],
+    system_prompt: Optional[str] = None,
+    temperature: float = 0.7,
+    max_tokens: int = 1000,
+    context_documents: Optional[List[str]] = None
+) -> AsyncIterator[str]:
+    """
+    Streaming variant of `generate_response`: yield the reply text piece by piece.
+    
+    The fine-tuned (OpenAI-style) endpoint is called with `"stream": true` and
+    each content delta is yielded as soon as it arrives. The generic endpoint
+    has no streaming API, so its whole answer is yielded once. The admission
+    slot is held until the stream ends; `Overloaded` is raised before the
+    first token if none is free.
+    """
+    
+    fine_tuned_endpoint = os.getenv("FINE_TUNED_LLM_ENDPOINT")
+    
+    if not fine_tuned_endpoint and not settings.LLM_ENDPOINT:
+        raise ValueError(
+            "No LLM endpoint configured. Set FINE_TUNED_LLM_ENDPOINT or LLM_ENDPOINT."
+        )
+    
+    async with llm_admission.slot():
+        if fine_tuned_endpoint:
+            async for token in _stream_fine_tuned_endpoint(
+                fine_tuned_endpoint,
+                messages,
+                system_prompt,
+                temperature,
+                max_tokens,
+                context_documents
+            ):
+                yield token
+        else:
+            result = await _call_generic_endpoint(
+                settings.LLM_ENDPOINT,
+                messages,
+                system_prompt,
+                temperature,
+                max_tokens,
+                context_documents
+            )
+            yield result["text"]
+
+
+def _fine_tuned_payload(
+    messages: List[Dict[str, str]],
+    system_prompt: Optional[str],
+    temperature: float,
+    max_tokens: int,
+    context_documents: Optional[List[str]],
+    stream: bool
 ) -> Dict[str, Any]:
-    """Call fine-tuned Mistral/LLaMA-3 endpoint."""
+    """Chat-completions payload for the fine-tuned endpoint."""
     
     # Build context from retrieved documents
     context = ""
@@ -106,19 +195,68 @@ async def _call_fine_tuned_endpoint(
         "messages": formatted_messages,
         "temperature": temperature,
         "max_tokens": max_tokens,
-        "stream": False
+        "stream": stream
+    }
+    return payload
+
+
+async def _call_fine_tuned_endpoint(
+    endpoint: str,
+    messages: List[Dict[str, str]],
+    system_prompt: Optional[str],
+    temperature: float,
+    max_tokens: int,
+    context_documents: Optional[List[str]]
+) -> Dict[str, Any]:
+    """Call fine-tuned Mistral/LLaMA-3 endpoint."""
+    
+    payload = _fine_tuned_payload(
+        messages, system_prompt, temperature, max_tokens, context_documents, stream=False
+    )
+    
+    # Shared keep-alive client: no new connection per call
+    response = await get_async_client("llm").post(endpoint, json=payload)
+    response.raise_for_status()
+    data = response.json()
+    
+    return {
+        "text": data.get("choices", [{}])[0].get("message", {}).get("content", ""),
+        "tokens_used": data.get("usage", {}).get("total_tokens", 0),
+        "model": data.get("model", "fine-tuned-model")
     }
+
+
+async def _stream_fine_tuned_endpoint(
+    endpoint: str,
+    messages: List[Dict[str, str]],
+    system_prompt: Optional[str],
+    temperature: float,
+    max_tokens: int,
+    context_documents: Optional[List[str]]
+) -> AsyncIterator[str]:
+    """Call fine-tuned endpoint with streaming and yield each content delta."""
     
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        response = await client.post(endpoint, json=payload)
+    payload = _fine_tuned_payload(
+        messages, system_prompt, temperature, max_tokens, context_documents, stream=True
+    )
+    
+    # OpenAI-style server-sent events: "data: {chunk}" lines, ending with "data: [DONE]"
+    async with get_async_client("llm").stream("POST", endpoint, json=payload) as response:
         response.raise_for_status()
-        data = response.json()
-        
-        return {
-            "text": data.get("choices", [{}])[0].get("message", {}).get("content", ""),
-            "tokens_used": data.get("usage", {}).get("total_tokens", 0),
-            "model": data.get("model", "fine-tuned-model")
-        }
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            try:
+                chunk = json.loads(data)
+            except ValueError:
+                continue
+            choices = chunk.get("choices") or [{}]
+            token = (choices[0].get("delta") or {}).get("content")
+            if token:
+                yield token
 
 
 async def _call_generic_endpoint(
@@ -143,14 +281,13 @@ async def _call_generic_endpoint(
         "max_tokens": max_tokens
     }
     
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        response = await client.post(endpoint, json=payload)
-        response.raise_for_status()
-        data = response.json()
-        
-        return {
-            "text": data.get("answer", data.get("text", "")),
-            "tokens_used": data.get("tokens_used", 0),
-            "model": data.get("model", "generic-llm")
-        }
+    response = await get_async_client("llm").post(endpoint, json=payload)
+    response.raise_for_status()
+    data = response.json()
+    
+    return {
+        "text": data.get("answer", data.get("text", "")),
+        "tokens_used": data.get("tokens_used", 0),
+        "model": data.get("model", "generic-llm")
+    }
 
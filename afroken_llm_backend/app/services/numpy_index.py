@@ -0,0 +1,168 @@
+"""
+Exact cosine-similarity search in NumPy, for deployments without FAISS.
+
+The corpus is normalized once when the index is built (or loaded), so a query
+costs one matrix product plus an `argpartition` for the top-k: no per-request
+copy of the corpus and no full O(N log N) sort.
+
+`BinaryNumpyIndex` adds a 1-bit prefilter: the sign of every dimension is
+packed into uint64 words (384 dims -> 48 bytes per chunk, 32x smaller than
+float32). A query scans those codes with XOR + popcount (Hamming distance),
+keeps a few hundred candidates and re-scores only their float rows exactly.
+The scan is still linear in N but touches 1/32 of the memory, which is what
+bounds the float scan on large corpora.
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Scale each row of a float32 matrix to unit length, in place."""
+    # einsum avoids the (N, d) temporary that np.linalg.norm(axis=1) allocates
+    norms = np.sqrt(np.einsum('ij,ij->i', matrix, matrix))
+    norms += 1e-8
+    matrix /= norms[:, None]
+    return matrix
+
+
+# Popcount of every byte value, for NumPy builds without np.bitwise_count (< 2.0)
+_POPCOUNT8 = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def pack_sign_bits(vectors: np.ndarray, block: int = 65536) -> np.ndarray:
+    """
+    Pack the sign bit of every dimension into uint64 words.
+
+    Returns an (N, ceil(d / 64)) uint64 array; bit set = component > 0.
+    Works block by block so no (N, d) boolean temporary is allocated at once.
+    """
+    n, d = vectors.shape
+    words = (d + 63) // 64
+    codes = np.zeros((n, words * 8), dtype=np.uint8)
+    for start in range(0, n, block):
+        packed = np.packbits(vectors[start:start + block] > 0, axis=1)
+        codes[start:start + len(packed), :packed.shape[1]] = packed
+    return codes.view(np.uint64)
+
+
+def hamming_distances(codes: np.ndarray, query_code: np.ndarray) -> np.ndarray:
+    """Hamming distance between each row of `codes` and `query_code` (uint64 words)."""
+    diff = codes ^ query_code
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(diff).sum(axis=1, dtype=np.uint32)
+    return _POPCOUNT8[diff.view(np.uint8)].sum(axis=1, dtype=np.uint32)
+
+
+class NumpyIndex:
+    """
+    Brute-force inner-product index over unit-length float32 vectors.
+
+    Mirrors the FAISS `search(queries, k)` interface and returns cosine
+    distances (1 - similarity), smaller = more similar.
+
+    Args:
+        embeddings: (N, d) corpus matrix (may be a read-only np.memmap).
+        normalized: Rows are already float32 and unit length (written that way
+            by index_faiss.py); otherwise a normalized copy is made once.
+    """
+
+    def __init__(self, embeddings: np.ndarray, normalized: bool = False) -> None:
+        if normalized and embeddings.dtype == np.float32 and embeddings.flags.c_contiguous:
+            # Use as-is: with mmap this stays a shared page-cache mapping
+            self.vectors = embeddings
+        else:
+            vectors = np.array(embeddings, dtype=np.float32, order='C', copy=True)
+            self.vectors = vectors if normalized else normalize_rows(vectors)
+        self.ntotal, self.d = self.vectors.shape
+
+    def search(
+        self, queries: np.ndarray, k: int = 3, ids: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return (distances, indices), each of shape (Q, k), for a (Q, d) or (d,) query.
+
+        Rows are ordered best first. k is capped at the number of rows searched:
+        the whole corpus, or only the chunk ids in `ids` (a category partition).
+        """
+        queries = np.array(queries, dtype=np.float32, ndmin=2, copy=True)
+        normalize_rows(queries)
+        vectors = self.vectors if ids is None else self.vectors[ids]
+        n = len(vectors)
+        k = min(int(k), n)
+        if k == 0:
+            return np.zeros((len(queries), 0), dtype=np.float32), np.zeros((len(queries), 0), dtype=np.int64)
+
+        similarities = queries @ vectors.T  # (Q, n)
+        if k < n:
+            # O(n) selection of the k best, then sort just those k
+            top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(n), (len(queries), n))
+        top_similarities = np.take_along_axis(similarities, top, axis=1)
+        order = np.argsort(-top_similarities, axis=1)
+
+        indices = np.take_along_axis(top, order, axis=1)
+        if ids is not None:
+            indices = ids[indices]
+        distances = 1 - np.take_along_axis(top_similarities, order, axis=1)
+        return distances, indices
+
+
+class BinaryNumpyIndex(NumpyIndex):
+    """
+    `NumpyIndex` with a sign-bit Hamming prefilter and exact float re-ranking.
+
+    Args:
+        embeddings: (N, d) corpus matrix (may be a read-only np.memmap).
+        normalized: See `NumpyIndex`.
+        codes: Precomputed `pack_sign_bits` output (faiss_index_codes.npy);
+            computed once here when not given.
+        candidates: Rows kept after the Hamming scan and re-scored exactly.
+    """
+
+    def __init__(
+        self,
+        embeddings: np.ndarray,
+        normalized: bool = False,
+        codes: np.ndarray = None,
+        candidates: int = 256,
+    ) -> None:
+        super().__init__(embeddings, normalized=normalized)
+        if codes is None or codes.shape[0] != self.ntotal:
+            codes = pack_sign_bits(self.vectors)
+        self.codes = codes
+        self.candidates = max(1, int(candidates))
+
+    def search(
+        self, queries: np.ndarray, k: int = 3, ids: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Same contract as `NumpyIndex.search`; results are approximate."""
+        queries = np.array(queries, dtype=np.float32, ndmin=2, copy=True)
+        normalize_rows(queries)
+        codes = self.codes if ids is None else self.codes[ids]
+        n = len(codes)
+        k = min(int(k), n)
+        n_candidates = min(max(self.candidates, k), n)
+
+        distances = np.empty((len(queries), k), dtype=np.float32)
+        indices = np.empty((len(queries), k), dtype=np.int64)
+        if k == 0:
+            return distances, indices
+        query_codes = pack_sign_bits(queries)
+        for q, (query, query_code) in enumerate(zip(queries, query_codes)):
+            hamming = hamming_distances(codes, query_code)
+            if n_candidates < n:
+                candidates = np.argpartition(hamming, n_candidates - 1)[:n_candidates]
+            else:
+                candidates = np.arange(n)
+            if ids is not None:
+                candidates = ids[candidates]
+            # Exact cosine on the few surviving float rows only
+            similarities = self.vectors[candidates] @ query
+            top = np.argpartition(-similarities, k - 1)[:k] if k < len(candidates) else np.arange(len(candidates))
+            top = top[np.argsort(-similarities[top])]
+            indices[q] = candidates[top]
+            distances[q] = 1 - similarities[top]
+        return distances, indices
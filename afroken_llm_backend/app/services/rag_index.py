@@ -0,0 +1,593 @@
+"""
+Versioned, hot-reloadable RAG index for the retrieval-only chat path.
+
+`scripts/rag/index_faiss.py` writes the chunk store (see chunk_store.py),
+`faiss_index.idx` (or `faiss_index.npy`) and finally `index_manifest.json`, whose `version` field
+identifies the build. `IndexManager` polls that manifest; when the version
+changes it loads the new files in a background thread and then swaps a single
+immutable `RagIndex` reference. Requests take one snapshot of
+`index_manager.current` and use it throughout, so in-flight requests finish on
+the index they started with and no worker restart is needed after a re-index.
+
+With `RAG_INDEX_MMAP` enabled the vectors are memory-mapped instead of read
+into private memory (FAISS `IO_FLAG_MMAP`, NumPy `mmap_mode='r'`), so every
+worker process on a host shares one page-cache copy of the corpus. Because the
+builder replaces files with os.replace(), an old mapping keeps pointing at the
+old (unlinked) file until the swap drops the last reference to it.
+
+Chunks are also partitioned by category at index time. A search with a
+`category` only scores that partition's chunks (FAISS `IDSelectorBitmap`,
+a NumPy row subset, filtered BM25 postings), so scoped queries are cheaper
+and never return chunks from other categories.
+"""
+
+import asyncio
+import json
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.services.bm25_index import BM25_DIR, BM25Index, reciprocal_rank_fusion
+from app.services.chunk_text import clean_markdown, make_citation, make_excerpt
+from app.services.chunk_store import CHUNK_STORE_DIR, ChunkStore, DocMapChunks, category_key
+from app.services.numpy_index import BinaryNumpyIndex, NumpyIndex
+
+# FAISS imports with fallback
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
+
+# Backend root (app/services/rag_index.py -> app/services -> app -> backend)
+BACKEND_DIR = Path(__file__).parent.parent.parent
+
+# Written last by index_faiss.py once every other index file is in place.
+MANIFEST_NAME = 'index_manifest.json'
+DOC_MAP_NAME = 'doc_map.json'
+FAISS_INDEX_NAME = 'faiss_index.idx'
+EMBEDDINGS_NAME = 'faiss_index.npy'
+# Packed sign bits of faiss_index.npy for the binary prefilter (optional)
+CODES_NAME = 'faiss_index_codes.npy'
+
+
+def _fill_display_fields(doc_map: dict) -> None:
+    """
+    Add `excerpt`/`citation` to doc_map entries built by an older index_faiss.py.
+
+    Current indexes store both fields precomputed; this only runs the cleaning
+    once at load time for legacy doc_map.json files, never per request.
+    """
+    for doc in doc_map.values():
+        if 'excerpt' not in doc:
+            doc['excerpt'] = make_excerpt(clean_markdown(doc.get('text', '')))
+        if 'citation' not in doc:
+            doc['citation'] = make_citation(doc.get('title', 'Untitled'), doc.get('source', ''), doc.get('filename'))
+
+
+def _configure_faiss_search(index, ef_search: Optional[int] = None, nprobe: Optional[int] = None) -> None:
+    """Apply query-time parameters to HNSW (efSearch) and IVF (nprobe) indexes."""
+    if ef_search and hasattr(index, 'hnsw'):
+        index.hnsw.efSearch = int(ef_search)
+    if nprobe:
+        try:
+            faiss.extract_index_ivf(index).nprobe = int(nprobe)
+        except RuntimeError:
+            pass  # Not an IVF index
+
+
+def _read_faiss_index(index_file: Path, mmap: bool = False):
+    """
+    Read a FAISS index, memory-mapped if requested and supported.
+
+    Not every index type can be mapped by every faiss build; in that case the
+    index is read into memory as before.
+    """
+    if mmap:
+        try:
+            return faiss.read_index(str(index_file), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except (AttributeError, RuntimeError) as e:
+            print(f"⚠ FAISS index cannot be memory-mapped ({e}); loading into memory")
+    return faiss.read_index(str(index_file))
+
+
+def _faiss_filter_params(index, selector):
+    """
+    FAISS search parameters restricting a search to `selector`.
+
+    Passing parameters replaces the index-level efSearch / nprobe, so the
+    values configured on the index are copied in.
+    """
+    if hasattr(index, 'hnsw'):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+    try:
+        return faiss.SearchParametersIVF(sel=selector, nprobe=faiss.extract_index_ivf(index).nprobe)
+    except RuntimeError:
+        return faiss.SearchParameters(sel=selector)  # Not an IVF index
+
+
+@dataclass(frozen=True)
+class CategoryPartition:
+    """
+    Chunk ids of one category, in the forms each search engine needs.
+
+    Attributes:
+        ids: Sorted int64 chunk ids (NumPy row subset).
+        bitmap: Little-endian membership bitmap over all chunk ids (N / 8 bytes).
+        selector: faiss.IDSelectorBitmap over `bitmap` (None without FAISS).
+    """
+
+    ids: np.ndarray
+    bitmap: np.ndarray
+    selector: Any = None
+
+    @classmethod
+    def build(cls, ids: np.ndarray, count: int, with_selector: bool = False) -> 'CategoryPartition':
+        """Partition over sorted chunk `ids` of a corpus with `count` chunks."""
+        if len(ids):
+            count = max(count, int(ids[-1]) + 1)
+        mask = np.zeros(count, dtype=bool)
+        mask[ids] = True
+        bitmap = np.packbits(mask, bitorder='little')
+        selector = None
+        if with_selector:
+            # The selector holds a raw pointer: `bitmap` lives as long as this partition
+            selector = faiss.IDSelectorBitmap(len(bitmap), faiss.swig_ptr(bitmap))
+        return cls(ids=ids, bitmap=bitmap, selector=selector)
+
+    def contains(self, doc_ids: np.ndarray) -> np.ndarray:
+        """Boolean mask: which of `doc_ids` belong to this category."""
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        return ((self.bitmap[doc_ids >> 3] >> (doc_ids & 7)) & 1).astype(bool)
+
+
+@dataclass(frozen=True)
+class RagIndex:
+    """
+    One loaded index build. Never mutated after construction.
+
+    Attributes:
+        version: Build identifier from index_manifest.json (or file mtimes).
+        chunks: ChunkStore (or DocMapChunks for legacy builds); `chunks.get(i)`
+            returns the metadata of chunk i, with precomputed excerpt/citation.
+        faiss_index: Loaded FAISS index, if faiss is installed and the file exists.
+        numpy_index: NumpyIndex (or BinaryNumpyIndex) over faiss_index.npy when
+            FAISS is not used.
+        metric: 'ip' for inner-product FAISS indexes over unit-length vectors
+            (scores are turned into cosine distances), 'l2' for older builds.
+        rerank_vectors: Memory-mapped unit-length float32 vectors (faiss_index.npy)
+            used to re-score the candidates of a product-quantized index exactly.
+        rerank_candidates: How many candidates to fetch for re-ranking.
+        bm25: Lexical BM25 index over the same chunks (None for older builds).
+        hybrid_candidates: Dense and BM25 results fused per query (0 = dense only).
+        rrf_k: Reciprocal rank fusion constant.
+        partitions: `category_key` -> CategoryPartition for filtered search.
+    """
+
+    version: str
+    chunks: Any
+    faiss_index: Any = None
+    numpy_index: Optional[NumpyIndex] = None
+    metric: str = 'l2'
+    rerank_vectors: Optional[np.ndarray] = None
+    rerank_candidates: int = 100
+    bm25: Optional[BM25Index] = None
+    hybrid_candidates: int = 0
+    rrf_k: int = 60
+    partitions: Dict[str, CategoryPartition] = field(default_factory=dict)
+
+    def search(
+        self,
+        query_emb: np.ndarray,
+        k: int = 3,
+        query_text: Optional[str] = None,
+        category: Optional[str] = None,
+    ):
+        """
+        Return (distances, indices) of the top-k chunks, or None without vectors.
+
+        With a BM25 index and `query_text`, the dense and lexical top
+        `hybrid_candidates` are merged by reciprocal rank fusion; chunks found
+        only lexically then have a distance of None. With `category`, only
+        that category's chunks are searched (an unknown category matches nothing).
+        Blocking call - run it through `run_in_retrieval_pool` from async routes.
+        """
+        partition = None
+        if category:
+            partition = self.partitions.get(category_key(category))
+            if partition is None:
+                return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64)
+
+        if not self.is_hybrid(query_text):
+            return self._dense_search(query_emb, k, partition)
+        dense = self._dense_search(query_emb, max(k, self.hybrid_candidates), partition)
+        return self._fuse(dense, query_text, k, partition)
+
+    def search_batch(
+        self,
+        query_embs: np.ndarray,
+        k: int = 3,
+        query_texts: Optional[Sequence[Optional[str]]] = None,
+        categories: Optional[Sequence[Optional[str]]] = None,
+    ) -> List[Optional[Tuple[Any, np.ndarray]]]:
+        """
+        `search` for every row of a (Q, d) query matrix, results in query order.
+
+        Unfiltered queries share one vectorized index search (one FAISS call /
+        one matrix product); category-filtered queries are searched one by one
+        on their partition. A query's result is None exactly where `search`
+        would return None: without vectors, hybrid queries still get BM25 hits.
+        """
+        query_embs = np.asarray(query_embs, dtype=np.float32).reshape(len(query_embs), -1)
+        n = len(query_embs)
+        query_texts = list(query_texts) if query_texts is not None else [None] * n
+        categories = list(categories) if categories is not None else [None] * n
+
+        results: List[Any] = [None] * n
+        unfiltered = [q for q in range(n) if not categories[q]]
+        if unfiltered:
+            n_dense = k
+            if any(self.is_hybrid(query_texts[q]) for q in unfiltered):
+                n_dense = max(k, self.hybrid_candidates)
+            dense = self._dense_search_batch(query_embs[unfiltered], n_dense)
+            for row, q in enumerate(unfiltered):
+                hits = dense[row] if dense is not None else None
+                if self.is_hybrid(query_texts[q]):
+                    results[q] = self._fuse(hits, query_texts[q], k)
+                elif hits is not None:
+                    results[q] = (hits[0][:k], hits[1][:k])
+        for q in range(n):
+            if categories[q]:
+                results[q] = self.search(query_embs[q], k, query_texts[q], categories[q])
+        return results
+
+    def is_hybrid(self, query_text: Optional[str]) -> bool:
+        """Whether a query with this text is fused with BM25."""
+        return self.bm25 is not None and bool(query_text) and self.hybrid_candidates > 0
+
+    def _fuse(
+        self,
+        dense: Optional[Tuple[np.ndarray, np.ndarray]],
+        query_text: str,
+        k: int,
+        partition: Optional[CategoryPartition] = None,
+    ) -> Tuple[List[Optional[float]], np.ndarray]:
+        """Reciprocal rank fusion of dense hits with the BM25 top `hybrid_candidates`."""
+        n_candidates = max(k, self.hybrid_candidates)
+        dense_ids = dense[1] if dense is not None else []
+        _, lexical_ids = self.bm25.search(
+            query_text, n_candidates, allowed=partition.contains if partition is not None else None
+        )
+        fused = reciprocal_rank_fusion([dense_ids, lexical_ids], k=self.rrf_k)[:k]
+
+        dense_distances = {}
+        if dense is not None:
+            dense_distances = {int(i): float(d) for d, i in zip(dense[0], dense[1]) if i >= 0}
+        indices = np.array([doc_id for doc_id, _ in fused], dtype=np.int64)
+        distances = [dense_distances.get(doc_id) for doc_id, _ in fused]
+        return distances, indices
+
+    def _dense_search(
+        self, query_emb: np.ndarray, k: int, partition: Optional[CategoryPartition] = None
+    ) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Vector-only top-k of one query: (distances, indices), or None without vectors."""
+        results = self._dense_search_batch(np.asarray(query_emb).reshape(1, -1), k, partition)
+        return results[0] if results is not None else None
+
+    def _dense_search_batch(
+        self, queries: np.ndarray, k: int, partition: Optional[CategoryPartition] = None
+    ) -> Optional[List[Tuple[np.ndarray, np.ndarray]]]:
+        """Vector-only top-k of every row of `queries` in one index call, or None without vectors."""
+        if self.faiss_index is not None:
+            queries_32 = np.array(queries, dtype='float32', ndmin=2)
+            if self.metric == 'ip':
+                # Cosine similarity: the corpus is unit length, so normalize the queries
+                queries_32 /= np.linalg.norm(queries_32, axis=1, keepdims=True) + 1e-8
+            if self.rerank_vectors is not None:
+                return self._search_reranked(queries_32, k, partition)
+            distances, indices = self._faiss_search(queries_32, k, partition)
+            if self.metric == 'ip':
+                # Similarities -> cosine distances (smaller = closer), as elsewhere
+                distances = 1 - distances
+            # -1 = fewer hits than asked (small partitions)
+            return [(d[i >= 0], i[i >= 0]) for d, i in zip(distances, indices)]
+        if self.numpy_index is not None:
+            ids = partition.ids if partition is not None else None
+            distances, indices = self.numpy_index.search(queries, k, ids=ids)
+            return list(zip(distances, indices))
+        return None
+
+    def vectors_for(self, chunk_ids) -> Optional[np.ndarray]:
+        """
+        Stored (unit-length) vectors of `chunk_ids`, or None if unavailable.
+
+        Read from the float matrix when one is loaded; otherwise reconstructed
+        from FAISS, which works for flat and HNSW indexes but not for IVF
+        without a direct map.
+        """
+        ids = np.asarray(chunk_ids, dtype=np.int64)
+        if self.numpy_index is not None:
+            return np.asarray(self.numpy_index.vectors[ids])
+        if self.rerank_vectors is not None:
+            return np.asarray(self.rerank_vectors[ids])
+        if self.faiss_index is not None:
+            try:
+                return self.faiss_index.reconstruct_batch(ids)
+            except RuntimeError:
+                return None
+        return None
+
+    def similarities(self, distances: Sequence[Optional[float]]) -> List[Optional[float]]:
+        """
+        Cosine similarities of search distances (None stays None).
+
+        Distances are cosine distances except for plain FAISS 'l2' builds,
+        whose squared L2 distance between unit vectors is 2 * (1 - cosine).
+        """
+        l2 = self.faiss_index is not None and self.rerank_vectors is None and self.metric != 'ip'
+        scale = 0.5 if l2 else 1.0
+        return [None if d is None else 1.0 - scale * float(d) for d in distances]
+
+    def _faiss_search(self, queries: np.ndarray, k: int, partition: Optional[CategoryPartition] = None):
+        """FAISS search over the whole index or, with `partition`, over its chunk ids only."""
+        if partition is None:
+            return self.faiss_index.search(queries, k=k)
+        return self.faiss_index.search(
+            queries, k=k, params=_faiss_filter_params(self.faiss_index, partition.selector)
+        )
+
+    def _search_reranked(
+        self, queries: np.ndarray, k: int, partition: Optional[CategoryPartition] = None
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Fetch `rerank_candidates` approximate hits per query, then re-score them exactly.
+
+        Only the candidate rows of the memory-mapped float matrix are read.
+        """
+        _, candidates = self._faiss_search(queries, max(k, self.rerank_candidates), partition)
+        results = []
+        for query, row in zip(queries, candidates):
+            row = row[row >= 0]  # -1 = fewer hits than asked
+            similarities = self.rerank_vectors[row] @ query
+            order = np.argsort(-similarities)[:k]
+            results.append((1 - similarities[order], row[order]))
+        return results
+
+
+class IndexManager:
+    """
+    Owns the active `RagIndex` and replaces it when a new build appears.
+
+    Args:
+        index_dir: Directory holding chunk_store/, faiss_index.* and the manifest.
+        poll_seconds: How often the background watcher checks the manifest.
+        mmap: Memory-map the vector files so worker processes share them.
+        ef_search: HNSW efSearch override (None = manifest value / FAISS default).
+        nprobe: IVF nprobe override (None = manifest value / FAISS default).
+        rerank_candidates: Candidates re-ranked exactly for quantized indexes.
+        numpy_search: "exact" or "binary" search over faiss_index.npy without FAISS.
+        binary_candidates: Candidates kept by the binary prefilter.
+        hybrid_candidates: Dense/BM25 results fused per query (0 = dense only).
+        rrf_k: Reciprocal rank fusion constant.
+    """
+
+    def __init__(
+        self,
+        index_dir: Path,
+        poll_seconds: float = 10.0,
+        mmap: bool = False,
+        ef_search: Optional[int] = None,
+        nprobe: Optional[int] = None,
+        rerank_candidates: int = 100,
+        numpy_search: str = 'exact',
+        binary_candidates: int = 256,
+        hybrid_candidates: int = 20,
+        rrf_k: int = 60,
+    ) -> None:
+        self.index_dir = Path(index_dir)
+        self.poll_seconds = max(0.5, float(poll_seconds))
+        self.mmap = mmap
+        self.ef_search = ef_search
+        self.nprobe = nprobe
+        self.rerank_candidates = max(1, int(rerank_candidates))
+        self.numpy_search = numpy_search
+        self.binary_candidates = binary_candidates
+        self.hybrid_candidates = hybrid_candidates
+        self.rrf_k = rrf_k
+
+        self._current: Optional[RagIndex] = None
+        # Serializes loads (startup, first request and watcher may race).
+        self._load_lock = threading.Lock()
+        self._watcher: Optional[asyncio.Task] = None
+
+    @property
+    def current(self) -> Optional[RagIndex]:
+        """The active index (a single reference read, safe from any thread)."""
+        return self._current
+
+    @property
+    def active_version(self) -> Optional[str]:
+        """Version of the index currently being served, or None if none is loaded."""
+        index = self._current
+        return index.version if index is not None else None
+
+    def disk_version(self) -> Optional[str]:
+        """
+        Version of the index on disk.
+
+        Read from index_manifest.json; indexes built before the manifest existed
+        are identified by the modification times of their files instead.
+        """
+        try:
+            return str(self._read_manifest()['version'])
+        except (KeyError, TypeError):
+            pass
+
+        stamps = []
+        for name in (CHUNK_STORE_DIR + '/meta.json', DOC_MAP_NAME, FAISS_INDEX_NAME, EMBEDDINGS_NAME):
+            try:
+                stamps.append(str((self.index_dir / name).stat().st_mtime_ns))
+            except OSError:
+                stamps.append('-')
+        if stamps[0] == '-' and stamps[1] == '-':
+            return None  # No chunk metadata: nothing to serve
+        return 'mtime-' + '-'.join(stamps)
+
+    def _read_manifest(self) -> dict:
+        """Parsed index_manifest.json, or {} if it is missing or unreadable."""
+        try:
+            with open(self.index_dir / MANIFEST_NAME, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def ensure_loaded(self) -> Optional[RagIndex]:
+        """Return the active index, loading it synchronously if none is loaded yet."""
+        index = self._current
+        if index is None:
+            self.reload_if_changed()
+            index = self._current
+        return index
+
+    def reload_if_changed(self) -> bool:
+        """
+        Load the on-disk index if its version differs from the active one.
+
+        Blocking (reads and parses the index files). The old index keeps serving
+        until the new one is fully loaded; on any failure it stays active.
+        Returns True if a new index was swapped in.
+        """
+        with self._load_lock:
+            version = self.disk_version()
+            if version is None or version == self.active_version:
+                return False
+            try:
+                index = self._load(version)
+            except Exception as e:
+                print(f"⚠ Failed to load RAG index {version}: {e}")
+                return False
+            # A rebuild finished while we were reading: retry on the next poll.
+            if index is None or self.disk_version() != version:
+                return False
+            self._current = index  # atomic swap
+            print(f"✓ RAG index {version} active ({len(index.chunks)} documents)")
+            return True
+
+    def _load(self, version: str) -> Optional[RagIndex]:
+        """Open the chunk store and read vectors from `index_dir` into a new RagIndex."""
+        store_dir = self.index_dir / CHUNK_STORE_DIR
+        doc_map_file = self.index_dir / DOC_MAP_NAME
+        index_file = self.index_dir / FAISS_INDEX_NAME
+        embeddings_file = self.index_dir / EMBEDDINGS_NAME
+
+        if (store_dir / 'meta.json').exists():
+            # Memory-mapped; metadata is decoded lazily, only for top-k hits
+            chunks = ChunkStore(store_dir)
+        elif doc_map_file.exists():
+            # Index built before the chunk store existed
+            with open(doc_map_file, 'r', encoding='utf-8') as f:
+                doc_map = json.load(f)
+            _fill_display_fields(doc_map)
+            chunks = DocMapChunks(doc_map)
+        else:
+            print(f"⚠ No chunk store or doc_map.json found in: {self.index_dir}")
+            return None
+
+        manifest = self._read_manifest()
+        faiss_index = None
+        numpy_index = None
+        rerank_vectors = None
+        if FAISS_AVAILABLE and index_file.exists():
+            faiss_index = _read_faiss_index(index_file, mmap=self.mmap)
+            search_params = manifest.get('search_params') or {}
+            _configure_faiss_search(
+                faiss_index,
+                ef_search=self.ef_search or search_params.get('ef_search'),
+                nprobe=self.nprobe or search_params.get('nprobe'),
+            )
+            if manifest.get('rerank') and embeddings_file.exists():
+                # Always mapped: the point of a quantized index is to keep floats off-heap
+                rerank_vectors = np.load(str(embeddings_file), mmap_mode='r')
+        elif embeddings_file.exists():
+            embeddings = np.load(str(embeddings_file), mmap_mode='r' if self.mmap else None)
+            # Current builds store unit-length rows; older ones are normalized once here
+            normalized = bool(manifest.get('normalized'))
+            if self.numpy_search == 'binary':
+                codes_file = self.index_dir / CODES_NAME
+                codes = np.load(str(codes_file), mmap_mode='r' if self.mmap else None) if codes_file.exists() else None
+                numpy_index = BinaryNumpyIndex(
+                    embeddings, normalized=normalized, codes=codes, candidates=self.binary_candidates
+                )
+            else:
+                numpy_index = NumpyIndex(embeddings, normalized=normalized)
+        else:
+            print("⚠ No FAISS index or embeddings file found")
+
+        bm25 = None
+        bm25_dir = self.index_dir / BM25_DIR
+        if (bm25_dir / 'meta.json').exists():
+            bm25 = BM25Index(bm25_dir, mmap=self.mmap)
+
+        # Per-category chunk ids (written by index_faiss.py into the chunk store)
+        partitions = {
+            name: CategoryPartition.build(ids, len(chunks), with_selector=faiss_index is not None)
+            for name, ids in chunks.category_ids().items()
+        }
+
+        return RagIndex(
+            version=version,
+            chunks=chunks,
+            faiss_index=faiss_index,
+            numpy_index=numpy_index,
+            metric=manifest.get('metric', 'l2'),
+            rerank_vectors=rerank_vectors,
+            rerank_candidates=self.rerank_candidates,
+            bm25=bm25,
+            hybrid_candidates=self.hybrid_candidates,
+            rrf_k=self.rrf_k,
+            partitions=partitions,
+        )
+
+    async def _watch(self) -> None:
+        """Poll the manifest and load new builds off the event loop."""
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            try:
+                await asyncio.to_thread(self.reload_if_changed)
+            except Exception as e:
+                print(f"⚠ RAG index watcher error: {e}")
+
+    def start_watching(self) -> None:
+        """Start the background watcher on the running event loop (idempotent)."""
+        if self._watcher is None or self._watcher.done():
+            self._watcher = asyncio.get_running_loop().create_task(self._watch())
+
+    async def stop_watching(self) -> None:
+        """Cancel the background watcher (called on app shutdown)."""
+        if self._watcher is not None:
+            self._watcher.cancel()
+            try:
+                await self._watcher
+            except asyncio.CancelledError:
+                pass
+            self._watcher = None
+
+
+# Shared manager used by the chat routes and the app lifecycle hooks.
+index_manager = IndexManager(
+    BACKEND_DIR,
+    poll_seconds=settings.RAG_INDEX_POLL_SECONDS,
+    mmap=settings.RAG_INDEX_MMAP,
+    ef_search=settings.RAG_HNSW_EF_SEARCH,
+    nprobe=settings.RAG_IVF_NPROBE,
+    rerank_candidates=settings.RAG_RERANK_CANDIDATES,
+    numpy_search=settings.RAG_NUMPY_SEARCH,
+    binary_candidates=settings.RAG_BINARY_CANDIDATES,
+    hybrid_candidates=settings.RAG_HYBRID_CANDIDATES,
+    rrf_k=settings.RAG_RRF_K,
+)
@@ -24,7 +24,8 @@ def vector_search(embedding: List[float], top_k: int = 5) -> List[Dict[str, Any]
 
     Returns:
         A list of dictionaries, each representing a matching document with
-        basic fields (id, title, content, source_url).
+        basic fields (id, title, content, source_url) and its similarity
+        `score` to the query (higher = more similar), best first.
     """
     import json
     import numpy as np
@@ -38,7 +39,7 @@ def vector_search(embedding: List[float], top_k: int = 5) -> List[Dict[str, Any]
         try:
             query = text(
                 """
-                SELECT id, title, content, source_url
+                SELECT id, title, content, source_url, -(embedding <#> :q) AS score
                 FROM documents
                 WHERE embedding IS NOT NULL
                 ORDER BY embedding <#> :q
@@ -46,7 +47,8 @@ def vector_search(embedding: List[float], top_k: int = 5) -> List[Dict[str, Any]
                 """
             )
             result = conn.execute(query, {"q": embedding, "k": top_k})
-            rows = result.fetchall()
+            # <#> is the negative inner product, so score = similarity
+            rows = [(r[4], r) for r in result.fetchall()]
         except Exception:
             # Fallback to TEXT-based cosine similarity (JSON strings)
             # Get all documents with embeddings
@@ -79,16 +81,17 @@ def vector_search(embedding: List[float], top_k: int = 5) -> List[Dict[str, Any]
             
             # Sort by similarity (descending) and take top_k
             similarities.sort(key=lambda x: x[0], reverse=True)
-            rows = [r for _, r in similarities[:top_k]]
+            rows = similarities[:top_k]
 
     # Convert each row tuple into a dict with friendly keys.
-    for r in rows:
+    for score, r in rows:
         docs.append(
             {
                 "id": str(r[0]),  # Convert UUID to string
                 "title": r[1],
                 "content": r[2],
                 "source_url": r[3],
+                "score": float(score) if score is not None else None,
             }
         )
 
@@ -0,0 +1,158 @@
+"""
+Optional cross-encoder re-ranking of retrieved chunks.
+
+The bi-encoder search (FAISS / NumPy, optionally fused with BM25) is fast but
+scores the query and each chunk independently. A cross-encoder reads each
+(query, chunk) pair together and orders them much more reliably, so the route
+fetches `RAG_CROSS_ENCODER_CANDIDATES` chunks, scores all pairs in one batched
+forward pass and keeps only the best `k`: fewer, better chunks for the answer
+(and fewer prompt tokens for an LLM downstream).
+
+Re-ranking runs on its own small thread pool (`RAG_CROSS_ENCODER_WORKERS`)
+under a hard latency budget (`RAG_CROSS_ENCODER_BUDGET_MS`). A forward pass
+cannot be interrupted, so one that misses the budget keeps its thread until
+it finishes; keeping it off the shared retrieval pool means it never delays
+embedding or vector search for other requests. While every re-rank thread
+is busy, requests skip re-ranking instead of queueing behind it. If scoring
+is skipped, does not finish in time, or fails, the request continues with
+the original retrieval order. Disabled unless `RAG_CROSS_ENCODER_MODEL` is set.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from prometheus_client import Counter
+
+from app.config import settings
+
+
+# Re-ranking attempts by outcome: "reranked", "timeout", "busy" or "error".
+RERANK_OUTCOMES = Counter(
+    "afroken_rerank_total", "Cross-encoder re-ranking attempts", ["outcome"]
+)
+
+# Threads reserved for cross-encoder forward passes.
+RERANK_WORKERS = max(1, settings.RAG_CROSS_ENCODER_WORKERS)
+
+# Separate from the retrieval pool: a forward pass abandoned after the budget
+# still runs to completion and must not hold a retrieval worker meanwhile.
+RERANK_POOL = ThreadPoolExecutor(max_workers=RERANK_WORKERS, thread_name_prefix="rerank")
+
+# Forward passes submitted and not yet finished (including abandoned ones).
+_pending = 0
+_pending_lock = threading.Lock()
+
+
+def rerank_enabled() -> bool:
+    """True if a cross-encoder model is configured."""
+    return bool(settings.RAG_CROSS_ENCODER_MODEL)
+
+
+@lru_cache(maxsize=1)
+def _load_model(model_name: str, max_length: int):
+    """Load the cross-encoder once (sentence-transformers is only imported when enabled)."""
+    from sentence_transformers import CrossEncoder
+
+    return CrossEncoder(model_name, max_length=max_length)
+
+
+def warm_up() -> None:
+    """Load the configured model ahead of the first request (blocking)."""
+    if rerank_enabled():
+        _load_model(settings.RAG_CROSS_ENCODER_MODEL, settings.RAG_CROSS_ENCODER_MAX_LENGTH)
+
+
+def score_chunks(query: str, chunks, chunk_ids: Sequence[int]) -> np.ndarray:
+    """
+    Cross-encoder relevance of each chunk to `query`, higher = better.
+
+    All pairs go through the model as a single batch. Blocking - `rerank`
+    runs it on the re-rank pool.
+    """
+    model = _load_model(settings.RAG_CROSS_ENCODER_MODEL, settings.RAG_CROSS_ENCODER_MAX_LENGTH)
+    passages = [chunks.field(chunk_id, 'text') or '' for chunk_id in chunk_ids]
+    scores = model.predict(
+        [(query, passage) for passage in passages],
+        batch_size=max(1, len(passages)),
+        show_progress_bar=False,
+        convert_to_numpy=True,
+    )
+    return np.asarray(scores, dtype=np.float32).reshape(-1)
+
+
+def _try_submit(query: str, chunks, chunk_ids: Sequence[int]):
+    """
+    Start scoring on the re-rank pool, or return None if every thread is busy.
+
+    Never queues: a queued pass would only start after the budget of the
+    request that submitted it had (most likely) already run out.
+    """
+    global _pending
+    with _pending_lock:
+        if _pending >= RERANK_WORKERS:
+            return None
+        _pending += 1
+
+    def release(_future) -> None:
+        global _pending
+        with _pending_lock:
+            _pending -= 1
+
+    future = RERANK_POOL.submit(score_chunks, query, chunks, chunk_ids)
+    future.add_done_callback(release)
+    return future
+
+
+def shutdown_rerank_pool() -> None:
+    """Stop accepting new re-rank jobs (called on app shutdown)."""
+    RERANK_POOL.shutdown(wait=False, cancel_futures=True)
+
+
+async def rerank(
+    query: str,
+    chunks,
+    distances: Sequence[Optional[float]],
+    indices: Sequence[int],
+    k: int,
+    budget_ms: Optional[float] = None,
+) -> Tuple[List[Optional[float]], List[int], Optional[List[float]]]:
+    """
+    Re-order retrieved chunks with the cross-encoder and keep the best `k`.
+
+    `distances` / `indices` are the retrieval results, best first. Returns
+    (distances, indices, scores) with the cross-encoder scores of the kept
+    chunks; when the budget is exceeded or scoring fails, the first `k`
+    results in retrieval order are returned with scores=None.
+    """
+    hits = [(d, int(i)) for d, i in zip(distances, indices) if int(i) >= 0]
+    fallback = ([d for d, _ in hits[:k]], [i for _, i in hits[:k]], None)
+    if not hits:
+        return fallback
+
+    if budget_ms is None:
+        budget_ms = settings.RAG_CROSS_ENCODER_BUDGET_MS
+    chunk_ids = [i for _, i in hits]
+    future = _try_submit(query, chunks, chunk_ids)
+    if future is None:
+        RERANK_OUTCOMES.labels(outcome="busy").inc()
+        return fallback
+    try:
+        # On timeout a running forward pass finishes in the background (on
+        # the re-rank pool, which stays "busy" until then); its result is ignored
+        scores = await asyncio.wait_for(asyncio.wrap_future(future), timeout=budget_ms / 1000.0)
+    except asyncio.TimeoutError:
+        RERANK_OUTCOMES.labels(outcome="timeout").inc()
+        return fallback
+    except Exception as e:
+        print(f"⚠ Cross-encoder re-ranking failed: {e}")
+        RERANK_OUTCOMES.labels(outcome="error").inc()
+        return fallback
+
+    RERANK_OUTCOMES.labels(outcome="reranked").inc()
+    # Stable sort keeps the retrieval order among equal scores
+    order = np.argsort(-scores, kind='stable')[:k]
+    return [hits[o][0] for o in order], [hits[o][1] for o in order], [float(scores[o]) for o in order]
@@ -0,0 +1,461 @@
+"""
+The retrieval pipeline shared by every chat path.
+
+`post_message` answers either straight from the RAG index (retrieval-only
+mode, also used when the database is down) or by handing database documents
+to an LLM. Both go through one `RetrievalPipeline`, so they share the same
+top-k and the same formatting, and every step is timed:
+
+    embed    query embedding (micro-batched MiniLM, or the DB embedding)
+    search   RAG index search (dense / hybrid, category filter) or pgvector search
+    rerank   optional cross-encoder re-ranking
+    filter   adaptive top-k, MMR diversification and per-source cap
+    format   excerpt / citation building, token-budgeted LLM context packing
+    generate LLM call (whole reply, or streamed token by token)
+
+Each stage's duration is recorded in the `afroken_pipeline_stage_seconds`
+histogram, labelled by stage. `top_k` is the most chunks / documents a reply
+uses; with RAG_ADAPTIVE_TOP_K the relevance scores decide how many of them
+are actually kept (`afroken_pipeline_selected_k`). Streamed replies also
+record their time to first token (`afroken_llm_first_token_seconds`), and
+every LLM call its prompt size (`afroken_llm_prompt_tokens`).
+"""
+
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from prometheus_client import Histogram
+
+from app.config import settings
+from app.services.adaptive_k import adaptive_k
+from app.services.context_packer import count_tokens, pack_context
+from app.services.diversify import diversify, rank_relevance
+from app.services.rag_index import IndexManager, RagIndex, index_manager
+from app.services.reranker import rerank, rerank_enabled
+from app.utils.admission import Overloaded
+from app.utils.embedding_batcher import embed_query
+from app.utils.embeddings_fallback import embed_and_cache, get_cached_embedding
+from app.utils.http_clients import get_async_client
+from app.utils.retrieval_pool import run_in_retrieval_pool
+
+
+# Wall time of each pipeline stage, per request.
+STAGE_SECONDS = Histogram(
+    "afroken_pipeline_stage_seconds",
+    "Chat pipeline stage latency seconds",
+    ["stage"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+
+# Chunks / documents kept per reply after adaptive top-k, by path ("index" or "documents").
+SELECTED_K = Histogram(
+    "afroken_pipeline_selected_k",
+    "Chunks or documents kept per chat reply",
+    ["path"],
+    buckets=(1, 2, 3, 4, 5, 6, 8, 10, 15, 20),
+)
+
+# Time from the start of a streamed generation to its first token.
+FIRST_TOKEN_SECONDS = Histogram(
+    "afroken_llm_first_token_seconds",
+    "Time to first streamed LLM token seconds",
+    buckets=(0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0, 30.0),
+)
+
+# Prompt tokens (system prompt + message + packed context) per LLM call.
+PROMPT_TOKENS = Histogram(
+    "afroken_llm_prompt_tokens",
+    "Prompt tokens sent to the LLM per chat reply",
+    buckets=(64, 128, 256, 512, 768, 1024, 1536, 2048, 3072, 4096, 8192),
+)
+
+# Reply used when retrieval finds nothing worth showing.
+NO_RESULTS_REPLY = "No relevant documents found. Please try rephrasing your question."
+
+SYSTEM_PROMPT = (
+    "You are AfroKen LLM, a helpful assistant for Kenyan government services. "
+    "Answer in simple Swahili unless requested otherwise. "
+    "Ground your answers in the provided documents and always cite sources. "
+    "If you don't know the answer, say so clearly."
+)
+
+
+@contextmanager
+def timed_stage(stage: str):
+    """Record the duration of the enclosed block under `stage`."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(stage=stage).observe(time.perf_counter() - started)
+
+
+class RetrievalPipeline:
+    """
+    Embed, search, re-rank, filter, format and generate for one chat message.
+
+    Args:
+        manager: Owner of the active RAG index.
+        top_k: Most chunks / documents kept per query on every path.
+    """
+
+    def __init__(self, manager: IndexManager, top_k: int = 3) -> None:
+        self.manager = manager
+        self.top_k = max(1, int(top_k))
+
+    async def load_index(self) -> Optional[RagIndex]:
+        """
+        One snapshot of the active index for the whole request, so a hot
+        reload mid-request cannot mix chunks from two builds.
+        """
+        index = self.manager.current
+        if index is None:
+            index = await run_in_retrieval_pool(self.manager.ensure_loaded)
+        return index
+
+    # ===== STAGES =====
+
+    async def embed(self, text: str) -> np.ndarray:
+        """Query embedding for the RAG index (micro-batched with concurrent requests)."""
+        with timed_stage("embed"):
+            return await embed_query(text)
+
+    async def embed_batch(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        (Q, d) query embeddings of many texts.
+
+        Cached embeddings are reused; the rest are encoded on the retrieval
+        pool in chunks of EMBEDDING_BATCH_SIZE, all in a single pool job.
+        """
+        with timed_stage("embed"):
+            cached = [get_cached_embedding(text) for text in texts]
+            missing = [q for q, emb in enumerate(cached) if emb is None]
+            if missing:
+                step = max(1, settings.EMBEDDING_BATCH_SIZE)
+                missing_texts = [texts[q] for q in missing]
+                encoded = await run_in_retrieval_pool(
+                    lambda: np.concatenate([
+                        embed_and_cache(missing_texts[start:start + step])
+                        for start in range(0, len(missing_texts), step)
+                    ])
+                )
+                for q, emb in zip(missing, encoded):
+                    cached[q] = emb
+            return np.stack(cached) if cached else np.zeros((0, settings.EMBEDDING_DIM), dtype=np.float32)
+
+    def n_candidates(self) -> int:
+        """Hits fetched from the index so re-ranking / MMR have something to choose from."""
+        n = self.top_k
+        if settings.RAG_MMR_CANDIDATES > 0:
+            n = max(n, settings.RAG_MMR_CANDIDATES)
+        if rerank_enabled():
+            n = max(n, settings.RAG_CROSS_ENCODER_CANDIDATES)
+        return n
+
+    async def search(
+        self, index: RagIndex, query_emb: np.ndarray, text: str, category: Optional[str] = None
+    ) -> Optional[Tuple[Sequence[Optional[float]], Sequence[int]]]:
+        """Candidate (distances, indices) from the index, or None without vectors."""
+        with timed_stage("search"):
+            return await run_in_retrieval_pool(index.search, query_emb, self.n_candidates(), text, category)
+
+    async def rerank(
+        self, index: RagIndex, text: str, distances, indices
+    ) -> Tuple[List[Optional[float]], List[int], Optional[np.ndarray], bool]:
+        """
+        Cross-encoder order of all candidates.
+
+        Returns (distances, indices, relevance, complete); relevance is the
+        cross-encoder score squashed into [0, 1] (None if not re-ranked) and
+        complete=False means the latency budget was exceeded or scoring failed.
+        """
+        if not rerank_enabled():
+            return list(distances), list(indices), None, True
+        with timed_stage("rerank"):
+            distances, indices, scores = await rerank(text, index.chunks, distances, indices, len(indices))
+        if scores is None:
+            return distances, indices, None, False
+        # Squash cross-encoder logits into [0, 1], the range of cosine relevance
+        relevance = 1.0 / (1.0 + np.exp(-np.asarray(scores, dtype=np.float32)))
+        return distances, indices, relevance, True
+
+    def select_k(self, scores: Sequence[Optional[float]], path: str = "index") -> int:
+        """
+        How many results to keep given their relevance scores (higher = better):
+        `top_k`, or fewer with adaptive top-k when the scores drop off early.
+        """
+        k = self.top_k
+        if settings.RAG_ADAPTIVE_TOP_K:
+            k = adaptive_k(
+                scores,
+                min_k=settings.RAG_MIN_K,
+                max_k=self.top_k,
+                min_score=settings.RAG_MIN_SIMILARITY,
+                min_gap=settings.RAG_SCORE_GAP,
+            )
+        SELECTED_K.labels(path=path).observe(min(k, len(scores)))
+        return k
+
+    async def filter(
+        self, index: RagIndex, query_emb: np.ndarray, distances, indices, relevance=None, fused: bool = False
+    ) -> Tuple[List[Optional[float]], List[int]]:
+        """
+        Final top-k: adaptive k, then MMR diversification and the per-source
+        cap (or a plain cut).
+
+        The cross-encoder relevance, or else the cosine similarity of the
+        dense hits, decides how many chunks are kept; MMR decides which.
+        `fused` marks hybrid (BM25 + dense) candidates: without cross-encoder
+        scores MMR then follows their fused order, not cosine similarity.
+        """
+        k = self.select_k(relevance if relevance is not None else index.similarities(distances))
+        if relevance is None and fused:
+            relevance = rank_relevance(len(indices))
+        use_mmr = settings.RAG_MMR_CANDIDATES > 0
+        if not use_mmr and settings.RAG_MAX_CHUNKS_PER_SOURCE <= 0:
+            return list(distances[:k]), list(indices[:k])
+        with timed_stage("filter"):
+            return await run_in_retrieval_pool(
+                diversify, index, query_emb, distances, indices, k,
+                lambda_=settings.RAG_MMR_LAMBDA if use_mmr else 1.0,
+                max_per_source=settings.RAG_MAX_CHUNKS_PER_SOURCE,
+                relevance=relevance,
+            )
+
+    async def retrieve(
+        self, index: RagIndex, query_emb: np.ndarray, text: str, category: Optional[str] = None
+    ) -> Optional[Tuple[List[Optional[float]], List[int], bool]]:
+        """
+        search -> rerank -> filter.
+
+        Returns (distances, indices, complete) of the top-k chunks, or None
+        without vectors; complete=False means re-ranking was skipped.
+        """
+        search_result = await self.search(index, query_emb, text, category)
+        if search_result is None:
+            return None
+        distances, indices = search_result
+        distances, indices, relevance, complete = await self.rerank(index, text, distances, indices)
+        distances, indices = await self.filter(
+            index, query_emb, distances, indices, relevance, fused=index.is_hybrid(text)
+        )
+        return distances, indices, complete
+
+    async def retrieve_batch(
+        self,
+        index: RagIndex,
+        query_embs: np.ndarray,
+        texts: Sequence[str],
+        categories: Optional[Sequence[Optional[str]]] = None,
+    ) -> List[Optional[Tuple[List[Optional[float]], List[int], bool]]]:
+        """
+        `retrieve` for many queries: one batched index search for all of them,
+        then per-query re-ranking and filtering. Results are in query order;
+        a query's result is None where `retrieve` would return None.
+        """
+        with timed_stage("search"):
+            results = await run_in_retrieval_pool(
+                index.search_batch, query_embs, self.n_candidates(), list(texts), categories
+            )
+
+        async def finish(q: int):
+            if results[q] is None:
+                return None
+            distances, indices = results[q]
+            distances, indices, relevance, complete = await self.rerank(index, texts[q], distances, indices)
+            distances, indices = await self.filter(
+                index, query_embs[q], distances, indices, relevance, fused=index.is_hybrid(texts[q])
+            )
+            return distances, indices, complete
+
+        return list(await asyncio.gather(*(finish(q) for q in range(len(results)))))
+
+    def format(self, index: RagIndex, top_distances, top_indices, debug: bool = False):
+        """
+        Join the precomputed excerpts and citations of the retrieved chunks.
+
+        Returns (answer, citations, debug_info); debug_info is None unless `debug`.
+        """
+        with timed_stage("format"):
+            answer_parts = []
+            citations = []
+            debug_info = [] if debug else None
+
+            for i, idx in enumerate(top_indices):
+                doc = index.chunks.get(int(idx))
+                if doc is None:
+                    continue
+
+                title = doc.get('title', 'Untitled')
+                excerpt = doc.get('excerpt', '')
+
+                # Only add if excerpt has meaningful content (more than just whitespace)
+                if len(excerpt) > 10:
+                    answer_parts.append(f"{title}\n\n{excerpt}")
+
+                # Only add unique citations
+                citation_str = doc.get('citation', title)
+                if citation_str not in citations:
+                    citations.append(citation_str)
+
+                if debug:
+                    distance = top_distances[i] if i < len(top_distances) else None
+                    debug_info.append({
+                        "rank": i + 1,
+                        "title": title,
+                        "filename": doc.get('filename', ''),
+                        "source": doc.get('source', ''),
+                        "distance": float(distance) if distance is not None else None,
+                        "category": doc.get('category', 'unknown'),
+                        "chunk_index": doc.get('chunk_index', '')
+                    })
+
+            # Combine answer (limit to 6000 chars), only parts with meaningful content
+            meaningful_parts = [p for p in answer_parts if len(p.strip()) > 20]
+            if meaningful_parts:
+                answer = "\n\n---\n\n".join(meaningful_parts)
+                if len(answer) > 6000:
+                    answer = answer[:6000] + "..."
+            else:
+                answer = NO_RESULTS_REPLY
+
+            return answer, citations, debug_info
+
+    # ===== DATABASE + LLM PATH =====
+
+    async def embed_for_documents(self, text: str) -> List[float]:
+        """Query embedding for the `documents` table (EMBEDDING_ENDPOINT or local model)."""
+        from app.utils.embeddings import get_embedding
+
+        with timed_stage("embed"):
+            return await get_embedding(text)
+
+    async def search_documents(self, embedding) -> List[Dict[str, Any]]:
+        """
+        Top-k database documents (blocking DB query, run on the retrieval pool),
+        cut by adaptive top-k on their similarity scores.
+        """
+        from app.services.rag_service import vector_search
+
+        with timed_stage("search"):
+            docs = await run_in_retrieval_pool(vector_search, embedding, top_k=self.top_k)
+        return docs[:self.select_k([d.get("score") for d in docs], path="documents")]
+
+    def format_documents(self, docs: List[Dict[str, Any]]) -> Tuple[List[str], List[str]]:
+        """
+        LLM context passages and unique citations of database documents.
+
+        The documents (best first) are packed into LLM_CONTEXT_TOKEN_BUDGET
+        tokens, trimmed at sentence boundaries; only documents that made it
+        into the context are cited.
+        """
+        with timed_stage("format"):
+            packed = pack_context(
+                [(d.get("title"), d.get("content") or "") for d in docs],
+                budget_tokens=settings.LLM_CONTEXT_TOKEN_BUDGET,
+                max_tokens_per_document=settings.LLM_DOCUMENT_TOKEN_LIMIT,
+            )
+            context_documents = packed.documents
+            citations = []
+            for position in packed.kept:
+                d = docs[position]
+                citation = d.get("source_url") or d.get("title", "Untitled")
+                if citation and citation not in citations:
+                    citations.append(citation)
+            return context_documents, citations
+
+    async def generate(self, message: str, language: Optional[str], context_documents: List[str]) -> str:
+        """
+        Answer `message` from `context_documents` with the LLM.
+
+        Tries the fine-tuned LLM service, then the generic LLM_ENDPOINT, and
+        finally returns the joined documents themselves. Raises `Overloaded`
+        when the LLM has no free slot, so the caller can shed the request.
+        """
+        self._record_prompt_tokens(message, context_documents)
+        with timed_stage("generate"):
+            try:
+                from app.services.llm_service import generate_response
+
+                llm_result = await generate_response(
+                    messages=[{"role": "user", "content": message}],
+                    system_prompt=SYSTEM_PROMPT,
+                    temperature=0.7,
+                    max_tokens=1000,
+                    context_documents=context_documents
+                )
+                return llm_result["text"]
+            except Overloaded:
+                raise
+            except Exception:
+                return await self._fallback_answer(message, language, context_documents)
+
+    async def generate_stream(
+        self, message: str, language: Optional[str], context_documents: List[str]
+    ) -> AsyncIterator[str]:
+        """
+        `generate`, yielding the reply piece by piece as the LLM produces it.
+
+        If the LLM service fails before its first token, the `generate`
+        fallbacks answer instead (yielded as one piece); a failure mid-stream
+        is raised, since part of the reply has already been sent. `Overloaded`
+        is raised before the first token like in `generate`.
+        """
+        self._record_prompt_tokens(message, context_documents)
+        started = time.perf_counter()
+        streamed = False
+        with timed_stage("generate"):
+            try:
+                from app.services.llm_service import stream_response
+
+                async for token in stream_response(
+                    messages=[{"role": "user", "content": message}],
+                    system_prompt=SYSTEM_PROMPT,
+                    temperature=0.7,
+                    max_tokens=1000,
+                    context_documents=context_documents
+                ):
+                    if not streamed:
+                        FIRST_TOKEN_SECONDS.observe(time.perf_counter() - started)
+                        streamed = True
+                    yield token
+                return
+            except Overloaded:
+                raise
+            except Exception:
+                if streamed:
+                    raise
+            yield await self._fallback_answer(message, language, context_documents)
+
+    def _record_prompt_tokens(self, message: str, context_documents: List[str]) -> None:
+        """Observe the prompt size of an LLM call in `afroken_llm_prompt_tokens`."""
+        PROMPT_TOKENS.observe(
+            count_tokens(SYSTEM_PROMPT) + count_tokens(message) + sum(count_tokens(d) for d in context_documents)
+        )
+
+    async def _fallback_answer(self, message: str, language: Optional[str], context_documents: List[str]) -> str:
+        """Generic LLM_ENDPOINT answer when the LLM service fails, else the document excerpts."""
+        context = "\n\n".join(context_documents)
+        if settings.LLM_ENDPOINT:
+            payload = {
+                "system": "You are AfroKen LLM. Answer in simple Swahili unless requested otherwise. Ground answers in provided documents and add citations.",
+                "documents": context,
+                "user_message": message,
+                "language": language,
+            }
+            from app.services.llm_service import llm_admission
+
+            async with llm_admission.slot():
+                res = await get_async_client("llm").post(settings.LLM_ENDPOINT, json=payload, timeout=20)
+            res.raise_for_status()
+            data = res.json()
+            return data.get("answer", "Samahani, sijaelewa. Tafadhali fafanua.")
+        # Final fallback: return document excerpts
+        return context[:6000] if context else NO_RESULTS_REPLY
+
+
+# Shared pipeline used by the chat routes.
+retrieval_pipeline = RetrievalPipeline(index_manager, top_k=settings.RAG_TOP_K)
@@ -0,0 +1,107 @@
+"""
+Admission control for calls to a capacity-limited upstream (the LLM endpoint).
+
+Without a limit every concurrent chat sends its own generation upstream;
+under a spike they all queue inside the model server and every reply slows
+down until requests time out. `AdmissionController` lets at most
+`max_concurrent` calls run, holds up to `max_queue` more for at most
+`max_wait_ms`, and rejects the rest right away with `Overloaded`, so callers
+can degrade (e.g. answer from retrieved excerpts) instead of failing.
+
+Exported to Prometheus, labelled by controller name:
+
+    afroken_admission_queue_seconds    time spent waiting for a slot
+    afroken_admission_in_flight        calls holding a slot
+    afroken_admission_queued           calls waiting for a slot
+    afroken_admission_shed_total       rejected calls, by reason ("queue_full" / "timeout")
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from prometheus_client import Counter, Gauge, Histogram
+
+
+# Time from asking for a slot to getting one (or giving up).
+ADMISSION_QUEUE_SECONDS = Histogram(
+    "afroken_admission_queue_seconds",
+    "Time waiting for an admission slot seconds",
+    ["name"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0),
+)
+# Calls currently holding a slot.
+ADMISSION_IN_FLIGHT = Gauge("afroken_admission_in_flight", "Calls holding an admission slot", ["name"])
+# Calls currently waiting for a slot.
+ADMISSION_QUEUED = Gauge("afroken_admission_queued", "Calls waiting for an admission slot", ["name"])
+# Calls rejected without running, by reason.
+ADMISSION_SHED = Counter("afroken_admission_shed_total", "Calls shed by admission control", ["name", "reason"])
+
+
+class Overloaded(RuntimeError):
+    """Raised when a call is not admitted (wait queue full or maximum wait exceeded)."""
+
+
+class AdmissionController:
+    """
+    Concurrency limit with a bounded, time-limited wait queue.
+
+    Args:
+        name: Label used for the Prometheus metrics.
+        max_concurrent: Calls allowed to run at once (0 = unlimited).
+        max_queue: Calls allowed to wait for a slot; more are rejected at once.
+        max_wait_ms: Longest wait for a slot before the call is rejected.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int = 0, max_wait_ms: float = 1000.0) -> None:
+        self.name = name
+        self.max_concurrent = max(0, int(max_concurrent))
+        self.max_queue = max(0, int(max_queue))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._semaphore = asyncio.Semaphore(self.max_concurrent or 1)
+        self._waiting = 0
+        self._queue_seconds = ADMISSION_QUEUE_SECONDS.labels(name=name)
+        self._in_flight = ADMISSION_IN_FLIGHT.labels(name=name)
+        self._queued = ADMISSION_QUEUED.labels(name=name)
+        self._shed_queue_full = ADMISSION_SHED.labels(name=name, reason="queue_full")
+        self._shed_timeout = ADMISSION_SHED.labels(name=name, reason="timeout")
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        Hold a slot for the enclosed block.
+
+        Raises:
+            Overloaded: If no slot frees up within `max_wait_ms`, or the wait
+                queue is already full.
+        """
+        if not self.max_concurrent:
+            yield
+            return
+
+        started = time.perf_counter()
+        if self._semaphore.locked():
+            if self._waiting >= self.max_queue:
+                self._shed_queue_full.inc()
+                raise Overloaded(f"{self.name}: {self._waiting} calls already waiting")
+            self._waiting += 1
+            self._queued.inc()
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.max_wait)
+            except asyncio.TimeoutError:
+                self._queue_seconds.observe(time.perf_counter() - started)
+                self._shed_timeout.inc()
+                raise Overloaded(f"{self.name}: no slot within {self.max_wait * 1000:.0f} ms") from None
+            finally:
+                self._waiting -= 1
+                self._queued.dec()
+        else:
+            await self._semaphore.acquire()
+        self._queue_seconds.observe(time.perf_counter() - started)
+
+        self._in_flight.inc()
+        try:
+            yield
+        finally:
+            self._in_flight.dec()
+            self._semaphore.release()
@@ -0,0 +1,134 @@
+"""
+Small in-process caches used on the chat hot path.
+
+`TTLCache` is a thread-safe LRU cache with an optional time-to-live. Hits and
+misses are exported to Prometheus as `afroken_cache_hits_total` /
+`afroken_cache_misses_total`, labelled with the cache name.
+
+`normalize_query` turns user messages into cache keys so that trivially
+different spellings of the same question ("How do I get a KRA PIN?" vs
+"how do i get a kra pin") share one entry.
+"""
+
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+from prometheus_client import Counter
+
+
+# Cache lookups that returned a stored value, per cache.
+CACHE_HITS = Counter("afroken_cache_hits_total", "Cache hits", ["cache"])
+# Cache lookups that found nothing (or only an expired entry), per cache.
+CACHE_MISSES = Counter("afroken_cache_misses_total", "Cache misses", ["cache"])
+
+# Anything that is not a letter, digit, underscore or whitespace.
+_PUNCTUATION_RE = re.compile(r"[^\w\s]", re.UNICODE)
+
+
+def normalize_query(text: str) -> str:
+    """
+    Normalize a user query for use as a cache key.
+
+    - Unicode NFKC normalization (full-width characters, ligatures, ...)
+    - Case folding
+    - Punctuation replaced by spaces
+    - Runs of whitespace collapsed to a single space
+    """
+
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    text = _PUNCTUATION_RE.sub(" ", text)
+    return " ".join(text.split())
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with optional per-entry time-to-live.
+
+    Args:
+        name: Label used for the Prometheus hit/miss counters.
+        max_entries: Least recently used entries are evicted beyond this size.
+        ttl_seconds: Entries older than this are treated as missing (None = no expiry).
+        max_bytes: Optional bound on the summed `sizeof(value)` of all entries.
+        sizeof: Function estimating the size of a value in bytes (required with max_bytes).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = 1024,
+        ttl_seconds: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        sizeof: Optional[Callable[[Any], int]] = None,
+    ) -> None:
+        self.name = name
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda value: 0)
+
+        # key -> (stored_at, value, size); order is least -> most recently used.
+        self._data: "OrderedDict[Hashable, tuple[float, Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = CACHE_HITS.labels(cache=name)
+        self._misses = CACHE_MISSES.labels(cache=name)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for `key`, or `default` if missing/expired."""
+
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                stored_at, value, _ = entry
+                if self.ttl_seconds is None or time.monotonic() - stored_at < self.ttl_seconds:
+                    self._data.move_to_end(key)
+                    self._hits.inc()
+                    return value
+                # Expired: drop it so it does not count towards the size limits.
+                self._pop(key)
+            self._misses.inc()
+            return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store `value` under `key`, evicting least recently used entries if full."""
+
+        size = self.sizeof(value)
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+            # A single value larger than the whole byte budget is never stored.
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            self._data[key] = (time.monotonic(), value, size)
+            self._bytes += size
+            while len(self._data) > self.max_entries or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                oldest = next(iter(self._data))
+                self._pop(oldest)
+
+    def clear(self) -> None:
+        """Remove every entry."""
+
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    @property
+    def total_bytes(self) -> int:
+        """Summed `sizeof` of the stored values."""
+
+        return self._bytes
+
+    def _pop(self, key: Hashable) -> None:
+        """Remove `key` and release its size (caller holds the lock)."""
+
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,142 @@
+"""
+Async micro-batcher for query embeddings on the chat hot path.
+
+Every chat request needs exactly one query embedding. Encoding them one by one
+means each concurrent request runs its own `SentenceTransformer.encode` on a
+batch of one, which wastes most of the CPU's vector throughput.
+
+`EmbeddingBatcher` collects query texts from concurrent requests for a few
+milliseconds (or until `max_batch_size` texts are waiting), encodes them with a
+single `embed_and_cache([...])` call (which also fills the embedding cache) and
+hands each vector back to the request that asked for it.
+"""
+
+import asyncio
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.utils.embeddings_fallback import embed_and_cache, get_cached_embedding
+from app.utils.retrieval_pool import run_in_retrieval_pool
+
+
+class EmbeddingBatcher:
+    """
+    Gather concurrent `embed()` calls into batched encode calls.
+
+    The worker task and queue are created lazily on the first call, bound to
+    whichever event loop is running at that moment (uvicorn's loop in
+    production). If the loop changes (e.g. between test runs) they are recreated.
+    """
+
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], np.ndarray],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+    ) -> None:
+        # Synchronous function mapping a list of texts to an (N, dim) matrix.
+        self.encode_fn = encode_fn
+        # Never encode more than this many texts in one call.
+        self.max_batch_size = max(1, int(max_batch_size))
+        # How long to hold the first text of a batch while waiting for company.
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def embed(self, text: str) -> np.ndarray:
+        """
+        Return the embedding vector for `text`, encoded together with any other
+        queries that arrive within the batching window.
+        """
+
+        loop = asyncio.get_running_loop()
+        self._ensure_worker(loop)
+
+        future = loop.create_future()
+        self._queue.put_nowait((text, future))
+        return await future
+
+    def _ensure_worker(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Start (or restart) the background worker on the running loop."""
+
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            if self._loop is not loop:
+                self._queue = asyncio.Queue()
+            self._loop = loop
+            self._worker = loop.create_task(self._run())
+
+    async def _collect_batch(self) -> List[Tuple[str, asyncio.Future]]:
+        """Wait for the first item, then gather more until full or the window closes."""
+
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            # Take whatever is already queued without waiting.
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self) -> None:
+        """Worker loop: collect a batch, encode it off the event loop, resolve futures."""
+
+        while True:
+            batch = await self._collect_batch()
+
+            # Requests that were cancelled while queued (client disconnected) are skipped.
+            batch = [(text, fut) for text, fut in batch if not fut.cancelled()]
+            if not batch:
+                continue
+
+            texts = [text for text, _ in batch]
+            try:
+                # encode() is CPU-bound; run it on the retrieval pool so the loop keeps serving.
+                vectors = await run_in_retrieval_pool(self.encode_fn, texts)
+            except Exception as exc:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(exc)
+                continue
+
+            for (_, fut), vector in zip(batch, vectors):
+                if not fut.done():
+                    fut.set_result(vector)
+
+
+# Shared batcher used by the chat routes; encoded vectors go into the embedding cache.
+query_batcher = EmbeddingBatcher(
+    embed_and_cache,
+    max_batch_size=settings.EMBEDDING_BATCH_SIZE,
+    max_wait_ms=settings.EMBEDDING_BATCH_WAIT_MS,
+)
+
+
+async def embed_query(text: str) -> np.ndarray:
+    """
+    Embed a single chat query.
+
+    Repeated (normalized) queries are answered from the embedding cache without
+    waiting for a batch; everything else goes through the shared micro-batcher.
+    """
+
+    cached = get_cached_embedding(text)
+    if cached is not None:
+        return cached
+
+    return await query_batcher.embed(text)
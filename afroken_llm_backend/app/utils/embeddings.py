@@ -3,9 +3,8 @@ Utility for generating text embeddings either via an external service or a
 local deterministic fallback (for demos and offline use).
 """
 
-import httpx
-
 from app.config import settings
+from app.utils.http_clients import get_async_client
 
 
 async def get_embedding(text: str) -> list[float]:
@@ -27,13 +26,12 @@ async def get_embedding(text: str) -> list[float]:
         vec = (vec + [0.0] * settings.EMBEDDING_DIM)[: settings.EMBEDDING_DIM]
         return vec
 
-    # When an embedding endpoint is configured, call it over HTTP.
-    async with httpx.AsyncClient(timeout=30) as client:
-        # Send the text as JSON payload; adjust the key to match your service.
-        resp = await client.post(settings.EMBEDDING_ENDPOINT, json={"input": text})
-        # Raise an exception if we did not get a 2xx response code.
-        resp.raise_for_status()
-        # Parse the JSON body.
-        data = resp.json()
-        # Extract and return the "embedding" field (or None if missing).
-        return data.get("embedding")
+    # When an embedding endpoint is configured, call it over the shared keep-alive client.
+    # Send the text as JSON payload; adjust the key to match your service.
+    resp = await get_async_client("embedding").post(settings.EMBEDDING_ENDPOINT, json={"input": text})
+    # Raise an exception if we did not get a 2xx response code.
+    resp.raise_for_status()
+    # Parse the JSON body.
+    data = resp.json()
+    # Extract and return the "embedding" field (or None if missing).
+    return data.get("embedding")
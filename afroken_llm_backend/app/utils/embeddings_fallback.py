@@ -15,18 +15,40 @@ Otherwise uses local 'all-MiniLM-L6-v2' model.
 # Standard library imports
 import os  # For reading environment variables
 from functools import lru_cache  # For caching the model (avoid reloading)
-from typing import Optional  # For type hints
+from typing import TYPE_CHECKING, List, Optional, Tuple  # For type hints
 
 # Third-party imports
-import httpx  # HTTP client for calling embedding endpoint (sync version)
 import numpy as np  # For array operations and type hints
-from sentence_transformers import SentenceTransformer  # Local embedding model
+
+if TYPE_CHECKING:
+    # Local embedding model - imported in _load_model, only when first needed
+    from sentence_transformers import SentenceTransformer
+
+# Local imports
+from app.config import settings  # Cache size / TTL settings
+from app.utils.cache import TTLCache, normalize_query  # Query embedding cache
+from app.utils.http_clients import get_sync_client  # Pooled client for EMBEDDING_ENDPOINT
+
+# Name of the local sentence-transformers model (also part of the cache identity)
+LOCAL_MODEL_NAME = 'all-MiniLM-L6-v2'
 
 # ===== GLOBAL MODEL INSTANCE =====
 # Global variable to store the loaded SentenceTransformer model
 # Lazy loading: model is only loaded when first needed (not at import time)
 # Optional type hint: None initially, SentenceTransformer after first load
-_model: Optional[SentenceTransformer] = None
+_model: Optional["SentenceTransformer"] = None
+
+# ===== QUERY EMBEDDING CACHE =====
+# Citizens ask the same questions over and over ("how do I get a KRA PIN"),
+# so embeddings are cached under a normalized form of the query text.
+# LRU eviction + TTL keeps memory bounded; hits skip the MiniLM forward pass.
+_embedding_cache = TTLCache(
+    "embedding",
+    max_entries=settings.EMBEDDING_CACHE_SIZE,
+    ttl_seconds=settings.EMBEDDING_CACHE_TTL_SECONDS,
+)
+# Identity of the model that produced the cached vectors (see _current_model_id)
+_cache_model_id: Optional[str] = None
 
 @lru_cache(maxsize=1)
 def _load_model():
@@ -49,16 +71,71 @@ def _load_model():
     # Load the 'all-MiniLM-L6-v2' model
     # This is a lightweight, fast model that produces 384-dimensional embeddings
     # Good balance between quality and speed for RAG applications
-    return SentenceTransformer('all-MiniLM-L6-v2')
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(LOCAL_MODEL_NAME)
+    
+    # A (re)loaded model may produce different vectors: drop cached embeddings
+    clear_embedding_cache()
+    return model
+
+def _current_model_id() -> str:
+    """
+    Identify which model currently produces embeddings.
+    
+    The remote endpoint URL if EMBEDDING_ENDPOINT is set, otherwise the local
+    model name. Cached vectors are only valid for the model that produced them.
+    """
+    return os.getenv('EMBEDDING_ENDPOINT') or LOCAL_MODEL_NAME
+
+def clear_embedding_cache() -> None:
+    """Flush all cached query embeddings (call whenever the embedding model changes)."""
+    _embedding_cache.clear()
+
+def _sync_cache_model() -> str:
+    """Flush the cache if the embedding model changed since it was filled; return the current model id."""
+    global _cache_model_id
+    model_id = _current_model_id()
+    if model_id != _cache_model_id:
+        clear_embedding_cache()
+        _cache_model_id = model_id
+    return model_id
+
+def get_cached_embedding(text: str) -> Optional[np.ndarray]:
+    """
+    Look up a previously computed embedding for `text` (normalized).
+    
+    Returns None on a miss. If the embedding model changed since the cache
+    was filled (e.g. EMBEDDING_ENDPOINT was set or unset), the cache is
+    flushed first so vectors from different models are never mixed.
+    """
+    _sync_cache_model()
+    return _embedding_cache.get(normalize_query(text))
+
+def cache_embedding(text: str, embedding: np.ndarray, model_id: Optional[str] = None) -> None:
+    """
+    Store `embedding` for `text` (normalized); the array is made read-only.
+    
+    `model_id` is the model that produced the vector (default: the current one).
+    Vectors of any other model - the local fallback used while EMBEDDING_ENDPOINT
+    is failing - are not stored, so the cache only ever holds vectors of the
+    model it is keyed on (see get_cached_embedding).
+    """
+    current = _sync_cache_model()
+    if model_id is not None and model_id != current:
+        return
+    embedding.setflags(write=False)
+    _embedding_cache.set(normalize_query(text), embedding)
 
 def get_embedding(text: str) -> np.ndarray:
     """
     Get embedding vector for input text (synchronous version).
     
     This function provides a unified interface for embeddings:
-    1. Checks if EMBEDDING_ENDPOINT environment variable is set
-    2. If set: calls HTTP endpoint (for remote embedding services)
-    3. If not set: uses local sentence-transformers model (offline capable)
+    1. Returns the cached vector if this (normalized) query was seen recently
+    2. Checks if EMBEDDING_ENDPOINT environment variable is set
+    3. If set: calls HTTP endpoint (for remote embedding services)
+    4. If not set: uses local sentence-transformers model (offline capable)
     
     The function includes shape validation to ensure embeddings are correct
     dimension (384 for all-MiniLM-L6-v2). This prevents downstream errors.
@@ -78,6 +155,23 @@ def get_embedding(text: str) -> np.ndarray:
         # Returns: array([0.123, -0.456, ..., 0.789], dtype=float32)
         # Shape: (384,)
     """
+    # ===== CHECK QUERY EMBEDDING CACHE =====
+    # Repeated questions skip the model entirely (returned array is read-only)
+    cached = get_cached_embedding(text)
+    if cached is not None:
+        return cached
+    
+    embedding, model_id = _compute_embedding(text)
+    cache_embedding(text, embedding, model_id)
+    return embedding
+
+def _compute_embedding(text: str) -> Tuple[np.ndarray, str]:
+    """
+    Compute the embedding for `text` without consulting the cache.
+    
+    Returns (embedding, id of the model that produced it): the endpoint URL,
+    or LOCAL_MODEL_NAME when the local model was used (also as a fallback).
+    """
     # ===== CHECK FOR REMOTE EMBEDDING ENDPOINT =====
     # Read EMBEDDING_ENDPOINT from environment variables
     # If set, use remote service; if None, use local model
@@ -87,39 +181,38 @@ def get_embedding(text: str) -> np.ndarray:
         # ===== USE HTTP ENDPOINT =====
         # Call remote embedding service via HTTP
         try:
-            # Create HTTP client with 30-second timeout
-            # Context manager (with) ensures connection is closed after use
-            with httpx.Client(timeout=30) as client:
-                # POST request to embedding endpoint
-                # Expected payload: {"input": "text to embed"}
-                # Expected response: {"embedding": [0.1, 0.2, ..., 0.9]}
-                response = client.post(
-                    embedding_endpoint,  # URL from environment variable
-                    json={'input': text}  # Request body with text to embed
-                )
-                
-                # Raise exception if HTTP status code indicates error (4xx, 5xx)
-                # This catches 404, 500, etc. and triggers fallback
-                response.raise_for_status()
-                
-                # Parse JSON response
-                data = response.json()
-                
-                # Extract embedding array from response
-                # data.get('embedding', []) returns empty list if 'embedding' key missing
-                # Convert to numpy array with float32 dtype (required for FAISS)
-                embedding = np.array(data.get('embedding', []), dtype=np.float32)
-                
-                # ===== VALIDATE EMBEDDING SHAPE =====
-                # Ensure embedding has correct dimensions
-                # all-MiniLM-L6-v2 produces 384-dimensional vectors
-                # Wrong shape would cause FAISS index errors
-                if embedding.shape != (384,):
-                    raise ValueError(f"Embedding shape mismatch: expected (384,), got {embedding.shape}")
-                
-                # Return validated embedding
-                return embedding
-                
+            # Shared keep-alive client (EMBEDDING_HTTP_TIMEOUT): no new connection per call
+            client = get_sync_client("embedding")
+            # POST request to embedding endpoint
+            # Expected payload: {"input": "text to embed"}
+            # Expected response: {"embedding": [0.1, 0.2, ..., 0.9]}
+            response = client.post(
+                embedding_endpoint,  # URL from environment variable
+                json={'input': text}  # Request body with text to embed
+            )
+            
+            # Raise exception if HTTP status code indicates error (4xx, 5xx)
+            # This catches 404, 500, etc. and triggers fallback
+            response.raise_for_status()
+            
+            # Parse JSON response
+            data = response.json()
+            
+            # Extract embedding array from response
+            # data.get('embedding', []) returns empty list if 'embedding' key missing
+            # Convert to numpy array with float32 dtype (required for FAISS)
+            embedding = np.array(data.get('embedding', []), dtype=np.float32)
+            
+            # ===== VALIDATE EMBEDDING SHAPE =====
+            # Ensure embedding has correct dimensions
+            # all-MiniLM-L6-v2 produces 384-dimensional vectors
+            # Wrong shape would cause FAISS index errors
+            if embedding.shape != (384,):
+                raise ValueError(f"Embedding shape mismatch: expected (384,), got {embedding.shape}")
+            
+            # Return validated embedding
+            return embedding, embedding_endpoint
+            
         except Exception as e:
             # If endpoint call fails (network error, timeout, wrong shape, etc.)
             # Log warning and fall through to local model fallback
@@ -153,5 +246,66 @@ def get_embedding(text: str) -> np.ndarray:
         raise ValueError(f"Embedding shape mismatch: expected (384,), got {embedding.shape}")
     
     # Return validated embedding
-    return embedding
+    return embedding, LOCAL_MODEL_NAME
+
+
+def get_embeddings(texts: List[str]) -> np.ndarray:
+    """
+    Get embedding vectors for several texts at once (synchronous, batched).
+    
+    The local model encodes the whole list in a single forward pass, which is
+    much cheaper per text than calling get_embedding() once per text.
+    When EMBEDDING_ENDPOINT is set, each text is sent to the endpoint on its
+    own (the endpoint contract only accepts a single input).
+    
+    This function does not consult the query cache; callers that want caching
+    use get_cached_embedding() and embed_and_cache().
+    
+    Args:
+        texts: List of input texts to embed
+    
+    Returns:
+        numpy array of shape (len(texts), 384), dtype float32
+    
+    Raises:
+        ValueError: If the embedding matrix does not have 384 columns
+    """
+    return _compute_embeddings(texts)[0]
 
+def embed_and_cache(texts: List[str]) -> np.ndarray:
+    """
+    get_embeddings() that also stores every vector in the query cache.
+    
+    Each vector is cached only if the current model produced it: texts the
+    local model embedded because EMBEDDING_ENDPOINT failed are returned but
+    not cached, so a later lookup asks the endpoint again.
+    """
+    embeddings, model_ids = _compute_embeddings(texts)
+    for text, embedding, model_id in zip(texts, embeddings, model_ids):
+        cache_embedding(text, embedding, model_id)
+    return embeddings
+
+def _compute_embeddings(texts: List[str]) -> Tuple[np.ndarray, List[str]]:
+    """Embedding matrix of `texts` and, per row, the id of the model that produced it."""
+    # Empty input: return an empty (0, 384) matrix so callers can still stack/slice
+    if not texts:
+        return np.zeros((0, 384), dtype=np.float32), []
+    
+    # Remote endpoint takes one text per request, so reuse the single-text path
+    if os.getenv('EMBEDDING_ENDPOINT'):
+        results = [_compute_embedding(text) for text in texts]
+        return np.stack([embedding for embedding, _ in results]), [model_id for _, model_id in results]
+    
+    global _model
+    if _model is None:
+        _model = _load_model()
+    
+    # One encode() call for the whole batch
+    # batch_size=len(texts) keeps it to a single forward pass
+    embeddings = _model.encode(list(texts), batch_size=len(texts), convert_to_numpy=True)
+    embeddings = np.asarray(embeddings, dtype=np.float32).reshape(len(texts), -1)
+    
+    if embeddings.shape[1] != 384:
+        raise ValueError(f"Embedding shape mismatch: expected (N, 384), got {embeddings.shape}")
+    
+    return embeddings, [LOCAL_MODEL_NAME] * len(texts)
@@ -0,0 +1,180 @@
+"""
+Long-lived, pooled HTTP clients for the LLM and embedding endpoints.
+
+Opening an `httpx` client per call pays a new TCP (and TLS) handshake on
+every chat message. Instead one client per endpoint lives for the whole app:
+created on startup (or on first use, e.g. from scripts), closed on shutdown,
+with keep-alive connections, HTTP/2 when the `h2` package is installed, pool
+limits from HTTP_MAX_CONNECTIONS / HTTP_MAX_KEEPALIVE_CONNECTIONS and a
+timeout per endpoint.
+
+    "llm"        async client for FINE_TUNED_LLM_ENDPOINT / LLM_ENDPOINT
+    "embedding"  async client for EMBEDDING_ENDPOINT (app.utils.embeddings)
+    "embedding"  sync client for EMBEDDING_ENDPOINT (embeddings_fallback, runs
+                 on the retrieval pool; httpx.Client is thread-safe)
+
+Request latency is exported as `afroken_http_request_seconds{client}` and the
+pool state at scrape time as `afroken_http_pool_connections{client, state}`
+and `afroken_http_pool_requests{client}`.
+"""
+
+import threading
+import time
+from typing import Dict
+
+import httpx
+from prometheus_client import Histogram
+from prometheus_client.core import REGISTRY, GaugeMetricFamily
+
+from app.config import settings
+
+
+# Wall time of requests sent through the shared clients, by client name.
+HTTP_REQUEST_SECONDS = Histogram(
+    "afroken_http_request_seconds",
+    "Outbound HTTP request latency seconds",
+    ["client"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+
+_async_clients: Dict[str, httpx.AsyncClient] = {}
+_sync_clients: Dict[str, httpx.Client] = {}
+_lock = threading.Lock()
+
+
+def _timeout(name: str) -> httpx.Timeout:
+    """Read/write/pool timeout of the endpoint, with a short connect timeout."""
+    seconds = settings.LLM_HTTP_TIMEOUT if name == "llm" else settings.EMBEDDING_HTTP_TIMEOUT
+    return httpx.Timeout(seconds, connect=min(seconds, settings.HTTP_CONNECT_TIMEOUT))
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+    )
+
+
+def _http2() -> bool:
+    """HTTP/2 if enabled and the optional `h2` package is installed."""
+    if not settings.HTTP2_ENABLED:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _timing_hooks(name: str, is_async: bool) -> Dict[str, list]:
+    """Event hooks observing each request's duration under `name`."""
+    histogram = HTTP_REQUEST_SECONDS.labels(client=name)
+
+    def on_request(request: httpx.Request) -> None:
+        request.extensions["afroken_started"] = time.perf_counter()
+
+    def on_response(response: httpx.Response) -> None:
+        started = response.request.extensions.get("afroken_started")
+        if started is not None:
+            histogram.observe(time.perf_counter() - started)
+
+    if not is_async:
+        return {"request": [on_request], "response": [on_response]}
+
+    async def on_request_async(request: httpx.Request) -> None:
+        on_request(request)
+
+    async def on_response_async(response: httpx.Response) -> None:
+        on_response(response)
+
+    return {"request": [on_request_async], "response": [on_response_async]}
+
+
+def get_async_client(name: str) -> httpx.AsyncClient:
+    """The shared async client `name` ("llm" or "embedding"), created on first use."""
+    client = _async_clients.get(name)
+    if client is None or client.is_closed:
+        with _lock:
+            client = _async_clients.get(name)
+            if client is None or client.is_closed:
+                client = httpx.AsyncClient(
+                    timeout=_timeout(name),
+                    limits=_limits(),
+                    http2=_http2(),
+                    event_hooks=_timing_hooks(name, is_async=True),
+                )
+                _async_clients[name] = client
+    return client
+
+
+def get_sync_client(name: str) -> httpx.Client:
+    """The shared blocking client `name`, for code running on worker threads."""
+    client = _sync_clients.get(name)
+    if client is None or client.is_closed:
+        with _lock:
+            client = _sync_clients.get(name)
+            if client is None or client.is_closed:
+                client = httpx.Client(
+                    timeout=_timeout(name),
+                    limits=_limits(),
+                    http2=_http2(),
+                    event_hooks=_timing_hooks(name, is_async=False),
+                )
+                _sync_clients[name] = client
+    return client
+
+
+def start_http_clients() -> None:
+    """Create the clients of the configured endpoints (called on app startup)."""
+    if settings.FINE_TUNED_LLM_ENDPOINT or settings.LLM_ENDPOINT:
+        get_async_client("llm")
+    if settings.EMBEDDING_ENDPOINT:
+        get_async_client("embedding")
+        get_sync_client("embedding")
+
+
+async def close_http_clients() -> None:
+    """Close every shared client and its pooled connections (called on app shutdown)."""
+    with _lock:
+        async_clients = list(_async_clients.values())
+        sync_clients = list(_sync_clients.values())
+        _async_clients.clear()
+        _sync_clients.clear()
+    for client in async_clients:
+        await client.aclose()
+    for client in sync_clients:
+        client.close()
+
+
+class _PoolCollector:
+    """Reports the connection pool of every shared client at scrape time."""
+
+    def collect(self):
+        connections = GaugeMetricFamily(
+            "afroken_http_pool_connections",
+            "Pooled outbound HTTP connections by state",
+            labels=["client", "state"],
+        )
+        requests = GaugeMetricFamily(
+            "afroken_http_pool_requests",
+            "Outbound HTTP requests in flight or waiting for a pooled connection",
+            labels=["client"],
+        )
+        clients = list(_async_clients.items())
+        clients += [(f"{name}_sync", c) for name, c in _sync_clients.items()]
+        for name, client in clients:
+            # httpcore's pool is not public API; skip the client if it changes shape
+            pool = getattr(getattr(client, "_transport", None), "_pool", None)
+            if pool is None:
+                continue
+            pooled = list(getattr(pool, "connections", []))
+            idle = sum(1 for conn in pooled if conn.is_idle())
+            connections.add_metric([name, "idle"], idle)
+            connections.add_metric([name, "active"], len(pooled) - idle)
+            requests.add_metric([name], len(getattr(pool, "_requests", [])))
+        yield connections
+        yield requests
+
+
+REGISTRY.register(_PoolCollector())
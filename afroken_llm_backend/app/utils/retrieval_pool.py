@@ -0,0 +1,85 @@
+"""
+Bounded thread pool for CPU-bound retrieval work (embedding, vector search).
+
+Chat routes are `async def`, so calling `model.encode` or `index.search`
+directly would block the uvicorn event loop and stall every other request
+(health checks, USSD callbacks, other chats) until it finished. Instead the
+work is submitted to a fixed-size pool sized to the CPU count, and the queue
+depth is exported to Prometheus so saturation is visible.
+"""
+
+import asyncio
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable
+
+from prometheus_client import Gauge
+
+from app.config import settings
+
+
+# Number of worker threads: explicit setting, otherwise one per core.
+RETRIEVAL_WORKERS = settings.RETRIEVAL_WORKERS or os.cpu_count() or 1
+
+# Shared executor. NumPy, FAISS and torch release the GIL in their hot loops,
+# so threads give real parallelism for this workload.
+RETRIEVAL_POOL = ThreadPoolExecutor(
+    max_workers=RETRIEVAL_WORKERS, thread_name_prefix="retrieval"
+)
+
+# Jobs submitted but still waiting for a free worker thread.
+RETRIEVAL_QUEUE_DEPTH = Gauge(
+    "afroken_retrieval_queue_depth", "Retrieval jobs waiting for a worker thread"
+)
+# Jobs currently executing on a worker thread.
+RETRIEVAL_ACTIVE = Gauge(
+    "afroken_retrieval_active_jobs", "Retrieval jobs currently running"
+)
+
+
+def _tracked(fn: Callable[..., Any]) -> Any:
+    """Runs on the worker thread: move the job from 'queued' to 'active'."""
+
+    RETRIEVAL_QUEUE_DEPTH.dec()
+    RETRIEVAL_ACTIVE.inc()
+    try:
+        return fn()
+    finally:
+        RETRIEVAL_ACTIVE.dec()
+
+
+def _release_if_cancelled(future: Future) -> None:
+    """
+    Done callback: a job cancelled while still queued never reaches `_tracked`
+    (awaiting task cancelled, or pool shut down with cancel_futures), so it
+    leaves the queue-depth gauge here instead.
+    """
+
+    if future.cancelled():
+        RETRIEVAL_QUEUE_DEPTH.dec()
+
+
+async def run_in_retrieval_pool(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Run a blocking function on the retrieval pool and await its result.
+
+    The event loop stays free to serve other requests while `fn` runs.
+    Cancelling the awaiting task cancels the job if it has not started yet.
+    """
+
+    RETRIEVAL_QUEUE_DEPTH.inc()
+    try:
+        future = RETRIEVAL_POOL.submit(_tracked, partial(fn, *args, **kwargs))
+    except BaseException:
+        # Pool already shut down: the job was never queued
+        RETRIEVAL_QUEUE_DEPTH.dec()
+        raise
+    future.add_done_callback(_release_if_cancelled)
+    return await asyncio.wrap_future(future)
+
+
+def shutdown_retrieval_pool() -> None:
+    """Stop accepting new jobs and let running ones finish (called on app shutdown)."""
+
+    RETRIEVAL_POOL.shutdown(wait=False, cancel_futures=True)
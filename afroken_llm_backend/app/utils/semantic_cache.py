@@ -0,0 +1,162 @@
+"""
+Semantic answer cache: reuse replies of past queries that mean the same thing.
+
+The exact response cache (`TTLCache` keyed on the normalized message) only
+matches identical wording. `SemanticCache` keeps the unit-length embeddings of
+recently answered queries in one preallocated matrix, next to their replies.
+A lookup is a single matrix-vector product over that matrix: if the most
+similar past query is within `threshold` cosine similarity, and was answered
+under the same context (index version, language, category, ...), its reply is
+returned and retrieval (and any LLM call) is skipped. "KRA PIN steps" and "how
+to register KRA PIN" thereby share one entry.
+
+A brute-force scan over a few thousand rows takes well under a millisecond,
+so no approximate index structure is needed at this size.
+
+Lookups are exported to Prometheus as `afroken_cache_hits_total` /
+`afroken_cache_misses_total` (like every other cache) plus
+`afroken_semantic_cache_similarity`, the distribution of the best similarity
+found per lookup (useful to tune the threshold).
+"""
+
+import threading
+import time
+from typing import Any, Hashable, Optional
+
+import numpy as np
+from prometheus_client import Histogram
+
+from app.utils.cache import CACHE_HITS, CACHE_MISSES
+
+
+# Best cosine similarity between a lookup and any cached query with the same context.
+SEMANTIC_SIMILARITY = Histogram(
+    "afroken_semantic_cache_similarity",
+    "Best cosine similarity to a cached query per semantic cache lookup",
+    ["cache"],
+    buckets=(0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.92, 0.94, 0.96, 0.98, 0.99, 1.0),
+)
+
+
+class SemanticCache:
+    """
+    Thread-safe nearest-neighbour cache of (query embedding -> value).
+
+    Args:
+        name: Label used for the Prometheus metrics.
+        max_entries: Least recently used entries are replaced beyond this size.
+        threshold: Minimum cosine similarity for a hit.
+        ttl_seconds: Entries older than this are treated as missing (None = no expiry).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = 2048,
+        threshold: float = 0.92,
+        ttl_seconds: Optional[float] = None,
+    ) -> None:
+        self.name = name
+        self.max_entries = max(1, int(max_entries))
+        self.threshold = float(threshold)
+        self.ttl_seconds = ttl_seconds
+
+        # Allocated on the first `set`, once the embedding dimension is known.
+        self._vectors: Optional[np.ndarray] = None
+        # Per slot: context id (-1 = free), value, stored_at and last use (LRU).
+        # Contexts are interned to small ints so matching them is one vector compare.
+        self._context_ids: dict = {}
+        self._next_context_id = 0
+        self._slot_contexts = np.full(self.max_entries, -1, dtype=np.int64)
+        self._values: list = [None] * self.max_entries
+        self._stored_at = np.zeros(self.max_entries, dtype=np.float64)
+        self._last_used = np.full(self.max_entries, -np.inf, dtype=np.float64)
+        self._lock = threading.Lock()
+        self._hits = CACHE_HITS.labels(cache=name)
+        self._misses = CACHE_MISSES.labels(cache=name)
+        self._similarity = SEMANTIC_SIMILARITY.labels(cache=name)
+
+    @staticmethod
+    def _unit(embedding: np.ndarray) -> np.ndarray:
+        """Flat float32 copy of `embedding` scaled to unit length."""
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        return vector / (np.linalg.norm(vector) + 1e-8)
+
+    def get(self, embedding: np.ndarray, context: Hashable, default: Any = None) -> Any:
+        """Return the value of the most similar cached query with `context`, or `default`."""
+
+        query = self._unit(embedding)
+        with self._lock:
+            context_id = self._context_ids.get(context)
+            if self._vectors is None or context_id is None or query.shape[0] != self._vectors.shape[1]:
+                self._misses.inc()
+                return default
+
+            now = time.monotonic()
+            similarities = self._vectors @ query
+            usable = self._slot_contexts == context_id
+            if self.ttl_seconds is not None:
+                usable &= now - self._stored_at < self.ttl_seconds
+            if not usable.any():
+                self._misses.inc()
+                return default
+
+            similarities[~usable] = -np.inf
+            slot = int(np.argmax(similarities))
+            best = float(similarities[slot])
+            self._similarity.observe(best)
+            if best < self.threshold:
+                self._misses.inc()
+                return default
+            self._last_used[slot] = now
+            self._hits.inc()
+            return self._values[slot]
+
+    def set(self, embedding: np.ndarray, context: Hashable, value: Any) -> None:
+        """Store `value` for this query, replacing the least recently used slot if full."""
+
+        query = self._unit(embedding)
+        with self._lock:
+            if self._vectors is None or query.shape[0] != self._vectors.shape[1]:
+                # First entry (or a new embedding model): start over at this dimension
+                self._vectors = np.zeros((self.max_entries, query.shape[0]), dtype=np.float32)
+                self._clear_slots()
+            # Free slots have last_used = -inf, so they are filled first
+            slot = int(np.argmin(self._last_used))
+            now = time.monotonic()
+            self._vectors[slot] = query
+            self._slot_contexts[slot] = self._intern(context)
+            self._values[slot] = value
+            self._stored_at[slot] = now
+            self._last_used[slot] = now
+
+    def _intern(self, context: Hashable) -> int:
+        """Small int id of `context` (caller holds the lock)."""
+
+        context_id = self._context_ids.get(context)
+        if context_id is None:
+            if len(self._context_ids) >= self.max_entries:
+                # Forget contexts that no slot uses any more, so the map stays bounded
+                live = set(self._slot_contexts[self._slot_contexts >= 0].tolist())
+                self._context_ids = {c: i for c, i in self._context_ids.items() if i in live}
+            context_id = self._next_context_id
+            self._next_context_id += 1
+            self._context_ids[context] = context_id
+        return context_id
+
+    def clear(self) -> None:
+        """Remove every entry."""
+
+        with self._lock:
+            self._clear_slots()
+
+    def _clear_slots(self) -> None:
+        """Mark every slot free (caller holds the lock)."""
+
+        self._context_ids = {}
+        self._slot_contexts[:] = -1
+        self._values = [None] * self.max_entries
+        self._last_used[:] = -np.inf
+
+    def __len__(self) -> int:
+        return int((self._slot_contexts >= 0).sum())
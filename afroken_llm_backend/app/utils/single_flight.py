@@ -0,0 +1,66 @@
+"""
+Single-flight coalescing of identical concurrent async calls.
+
+When a news item breaks, many users send the same question within seconds
+and each would trigger its own upstream LLM generation. `SingleFlight` runs
+the first call for a key as a task and makes every identical call that
+arrives while it is still running await that same task. Nothing is kept once
+the task finishes, so coalescing never serves a stale result - it only
+merges requests that overlap in time.
+
+Calls are counted in `afroken_single_flight_total{flight, role}`, where role
+is "leader" (started the upstream call) or "follower" (shared one).
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from prometheus_client import Counter
+
+
+# Coalesced calls by flight group and role ("leader" / "follower").
+SINGLE_FLIGHT_CALLS = Counter(
+    "afroken_single_flight_total", "Single-flight coalesced calls", ["flight", "role"]
+)
+
+
+class SingleFlight:
+    """
+    Share one in-flight call among concurrent callers with the same key.
+
+    Args:
+        name: Label used for the Prometheus counter.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._leaders = SINGLE_FLIGHT_CALLS.labels(flight=name, role="leader")
+        self._followers = SINGLE_FLIGHT_CALLS.labels(flight=name, role="follower")
+
+    async def run(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any) -> Any:
+        """
+        Await `fn(*args, **kwargs)`, or the identical call already running under `key`.
+
+        Every caller gets the same result (or exception). A cancelled caller
+        does not cancel the shared call, other callers may still need it.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            self._leaders.inc()
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done, key=key: self._forget(key, done))
+        else:
+            self._followers.inc()
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception retrieved if every caller was cancelled before it arrived
+        if not task.cancelled():
+            task.exception()
+
+    def __len__(self) -> int:
+        return len(self._inflight)
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Recall@k, memory and latency report for the FAISS index types built by index_faiss.py.
+
+Builds the exact flat inner-product index as ground truth, then HNSW,
+IVF-Flat and the product-quantized IVF-PQ / OPQ indexes with the same build
+parameters index_faiss.py uses, and sweeps their search parameters
+(efSearch / nprobe). For every setting it reports index memory per chunk,
+recall@k against the flat baseline and single-query latency (p50 / p99, one
+query at a time as the chat endpoint issues them). Quantized indexes are
+measured both raw and with the backend's exact re-rank of the top
+candidates against the float vectors.
+
+Usage:
+  # synthetic corpus (unit-length random vectors)
+  python scripts/rag/bench_ann.py --chunks 1000000 --queries 1000
+
+  # real corpus embeddings (e.g. an index built with the NumPy fallback)
+  python scripts/rag/bench_ann.py --embeddings faiss_index.npy --out ann_report.md
+
+Queries are corpus vectors with Gaussian noise added, so each has realistic
+near neighbours. Synthetic random vectors are a hard case for ANN indexes;
+recall on real sentence embeddings is usually higher at the same settings.
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import faiss
+
+# Reuse the exact build code and normalization of the indexing script
+from index_faiss import build_faiss_index, normalize_rows
+
+
+class Reranked:
+    """Same re-rank step as RagIndex._search_reranked in the backend."""
+
+    def __init__(self, index, vectors: np.ndarray, candidates: int) -> None:
+        self.index = index
+        self.vectors = vectors
+        self.candidates = candidates
+
+    def search(self, query: np.ndarray, k: int):
+        _, found = self.index.search(query, max(k, self.candidates))
+        found = found[0][found[0] >= 0]
+        similarities = self.vectors[found] @ query[0]
+        order = np.argsort(-similarities)[:k]
+        return (1 - similarities[order])[None, :], found[order][None, :]
+
+
+def bytes_per_chunk(index) -> float:
+    """Serialized index size divided by the number of vectors."""
+    return len(faiss.serialize_index(index)) / index.ntotal
+
+
+def make_corpus(chunks: int, dim: int, seed: int = 0) -> np.ndarray:
+    """Random unit-length float32 vectors."""
+    rng = np.random.default_rng(seed)
+    return normalize_rows(rng.standard_normal((chunks, dim)).astype('float32'))
+
+
+def make_queries(corpus: np.ndarray, count: int, noise: float, seed: int = 1) -> np.ndarray:
+    """Perturbed copies of random corpus rows, normalized."""
+    rng = np.random.default_rng(seed)
+    rows = corpus[rng.integers(0, len(corpus), size=count)]
+    # Noise vector of length ~noise relative to the unit-length corpus row
+    queries = rows + noise / np.sqrt(rows.shape[1]) * rng.standard_normal(rows.shape).astype('float32')
+    return normalize_rows(queries.astype('float32'))
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    """Fraction of the true top-k ids that the index returned (averaged over queries)."""
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def time_queries(index, queries: np.ndarray, k: int):
+    """Search one query at a time; return (ids, p50 ms, p99 ms)."""
+    ids = np.empty((len(queries), k), dtype='int64')
+    latencies = np.empty(len(queries))
+    for i, query in enumerate(queries):
+        started = time.perf_counter()
+        _, found = index.search(query.reshape(1, -1), k)
+        latencies[i] = (time.perf_counter() - started) * 1000
+        ids[i] = found[0]
+    return ids, float(np.percentile(latencies, 50)), float(np.percentile(latencies, 99))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recall@k vs latency for flat / HNSW / IVF indexes')
+    parser.add_argument('--embeddings', type=str, default=None,
+                        help='.npy corpus matrix (default: synthetic vectors)')
+    parser.add_argument('--chunks', type=int, default=1_000_000, help='Synthetic corpus size')
+    parser.add_argument('--dim', type=int, default=384, help='Synthetic embedding dimension')
+    parser.add_argument('--queries', type=int, default=1000, help='Number of queries')
+    parser.add_argument('--noise', type=float, default=0.5, help='Query perturbation length (relative to unit vectors)')
+    parser.add_argument('-k', type=int, default=3, help='k for recall@k (chat uses top-3)')
+    parser.add_argument('--hnsw-m', type=int, default=32)
+    parser.add_argument('--ef-construction', type=int, default=200)
+    parser.add_argument('--ef-search', type=str, default='16,32,64,128,256',
+                        help='Comma-separated efSearch values to sweep')
+    parser.add_argument('--nlist', type=int, default=1024)
+    parser.add_argument('--nprobe', type=str, default='1,4,16,64',
+                        help='Comma-separated nprobe values to sweep')
+    parser.add_argument('--pq-m', type=str, default='24,48,96',
+                        help='Comma-separated PQ code sizes (bytes per chunk) to build')
+    parser.add_argument('--rerank', type=int, default=100,
+                        help='Candidates re-ranked exactly for IVF-PQ / OPQ (0 = skip)')
+    parser.add_argument('--threads', type=int, default=1,
+                        help='FAISS OpenMP threads (1 matches one retrieval worker)')
+    parser.add_argument('--out', type=str, default=None, help='Write the Markdown report here')
+    args = parser.parse_args()
+
+    faiss.omp_set_num_threads(args.threads)
+
+    if args.embeddings:
+        corpus = normalize_rows(np.load(args.embeddings).astype('float32'))
+    else:
+        corpus = make_corpus(args.chunks, args.dim)
+    queries = make_queries(corpus, args.queries, args.noise)
+    print(f"Corpus {corpus.shape[0]} x {corpus.shape[1]}, {len(queries)} queries, k={args.k}")
+
+    rows = []
+
+    # ===== FLAT BASELINE (GROUND TRUTH) =====
+    started = time.perf_counter()
+    flat = build_faiss_index(corpus, 'flat')
+    build_s = time.perf_counter() - started
+    truth, p50, p99 = time_queries(flat, queries, args.k)
+    rows.append(('flat', '-', bytes_per_chunk(flat), build_s, 1.0, p50, p99))
+    print(f"flat built in {build_s:.1f}s")
+
+    # ===== HNSW =====
+    started = time.perf_counter()
+    hnsw = build_faiss_index(corpus, 'hnsw', hnsw_m=args.hnsw_m, ef_construction=args.ef_construction)
+    build_s = time.perf_counter() - started
+    print(f"hnsw built in {build_s:.1f}s")
+    for ef in [int(v) for v in args.ef_search.split(',')]:
+        hnsw.hnsw.efSearch = ef
+        found, p50, p99 = time_queries(hnsw, queries, args.k)
+        rows.append((f'hnsw M={args.hnsw_m}', f'efSearch={ef}', bytes_per_chunk(hnsw), build_s,
+                     recall_at_k(found, truth), p50, p99))
+
+    # ===== IVF-FLAT =====
+    started = time.perf_counter()
+    ivf = build_faiss_index(corpus, 'ivf', nlist=args.nlist)
+    build_s = time.perf_counter() - started
+    print(f"ivf built in {build_s:.1f}s")
+    for nprobe in [int(v) for v in args.nprobe.split(',')]:
+        ivf.nprobe = nprobe
+        found, p50, p99 = time_queries(ivf, queries, args.k)
+        rows.append((f'ivf nlist={ivf.nlist}', f'nprobe={nprobe}', bytes_per_chunk(ivf), build_s,
+                     recall_at_k(found, truth), p50, p99))
+
+    # ===== IVF-PQ / OPQ (+ EXACT RE-RANK) =====
+    for index_type in ('ivfpq', 'opq'):
+        for pq_m in [int(v) for v in args.pq_m.split(',')]:
+            started = time.perf_counter()
+            pq = build_faiss_index(corpus, index_type, nlist=args.nlist, pq_m=pq_m)
+            build_s = time.perf_counter() - started
+            size = bytes_per_chunk(pq)
+            print(f"{index_type} m={pq_m} built in {build_s:.1f}s ({size:.0f} bytes/chunk)")
+            ivf_part = faiss.extract_index_ivf(pq)
+            for nprobe in [int(v) for v in args.nprobe.split(',')]:
+                ivf_part.nprobe = nprobe
+                found, p50, p99 = time_queries(pq, queries, args.k)
+                rows.append((f'{index_type} m={pq_m}', f'nprobe={nprobe}', size, build_s,
+                             recall_at_k(found, truth), p50, p99))
+                if args.rerank:
+                    found, p50, p99 = time_queries(Reranked(pq, corpus, args.rerank), queries, args.k)
+                    rows.append((f'{index_type} m={pq_m}', f'nprobe={nprobe} +rerank {args.rerank}', size,
+                                 build_s, recall_at_k(found, truth), p50, p99))
+
+    # ===== REPORT =====
+    lines = [
+        f"# ANN recall@{args.k} vs latency",
+        "",
+        f"Corpus: {corpus.shape[0]} x {corpus.shape[1]} "
+        f"({'file ' + Path(args.embeddings).name if args.embeddings else 'synthetic'}), "
+        f"{len(queries)} queries, {args.threads} thread(s), baseline: exact flat inner product.",
+        "Memory is the serialized index size per chunk; re-ranked rows additionally read",
+        "the candidate rows of the memory-mapped float matrix (not resident in the index).",
+        "",
+        f"| index | search params | bytes/chunk | build s | recall@{args.k} | p50 ms | p99 ms |",
+        "|---|---|---:|---:|---:|---:|---:|",
+    ]
+    for name, params, size, build_s, recall, p50, p99 in rows:
+        lines.append(f"| {name} | {params} | {size:.0f} | {build_s:.1f} | {recall:.3f} | {p50:.3f} | {p99:.3f} |")
+    report = "\n".join(lines) + "\n"
+
+    print()
+    print(report)
+    if args.out:
+        Path(args.out).write_text(report, encoding='utf-8')
+        print(f"Report written to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Measure RAG index load time and per-worker memory, with and without mmap.
+
+Builds a synthetic corpus of random unit vectors (default 1M x 384 float32,
+~1.5 GB) in a scratch directory, then starts several worker processes that
+each load the vectors the way app/services/rag_index.py does:
+
+  - copy: faiss.read_index() / np.load()                  (RAG_INDEX_MMAP=false)
+  - mmap: faiss IO_FLAG_MMAP / np.load(mmap_mode='r')     (RAG_INDEX_MMAP=true)
+
+Each worker touches every vector once (one brute-force query), so mapped
+pages are really resident, and reports load seconds plus RssAnon (private
+memory) and RssFile (shared page cache) from /proc/self/status.
+
+Usage:
+  python scripts/rag/bench_index_load.py --chunks 1000000 --workers 4
+
+Linux only (reads /proc). Needs as much free disk as the corpus size.
+
+Measured (1M x 384 float32 = 1465 MB, 2 workers, NumPy variant, 1 vCPU /
+5 GB RAM VM, best of two runs; faiss was not installed):
+
+  numpy copy  load    1.37s  private      2965 MB total  shared page cache        7 MB
+  numpy mmap  load    0.01s  private        35 MB total  shared page cache     1472 MB
+
+i.e. copy mode costs one full private copy per worker (~1.5 GB each), while
+mmap workers start at once and share a single page-cache copy.
+"""
+
+import argparse
+import multiprocessing as mp
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# FAISS is optional - without it only the NumPy (.npy) variant is measured
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
+
+def read_rss_mb() -> dict:
+    """Return RssAnon / RssFile of this process in MB (from /proc/self/status)."""
+    rss = {}
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(('RssAnon:', 'RssFile:')):
+                key, value, _unit = line.split()
+                rss[key.rstrip(':')] = int(value) / 1024  # kB -> MB
+    return rss
+
+
+def build_corpus(out_dir: Path, chunks: int, dim: int) -> None:
+    """Write faiss_index.npy (and faiss_index.idx if faiss is installed)."""
+    rng = np.random.default_rng(0)
+    embeddings = np.lib.format.open_memmap(
+        str(out_dir / 'faiss_index.npy'), mode='w+', dtype='float32', shape=(chunks, dim)
+    )
+    # Fill in slices so building 1M vectors does not need 2x the memory
+    step = 100_000
+    for start in range(0, chunks, step):
+        block = rng.standard_normal((min(step, chunks - start), dim)).astype('float32')
+        block /= np.linalg.norm(block, axis=1, keepdims=True)
+        embeddings[start:start + len(block)] = block
+    embeddings.flush()
+
+    if FAISS_AVAILABLE:
+        index = faiss.IndexFlatL2(dim)
+        index.add(np.asarray(embeddings))
+        faiss.write_index(index, str(out_dir / 'faiss_index.idx'))
+    del embeddings
+
+
+def load_worker(out_dir: str, kind: str, mmap: bool, results) -> None:
+    """Load one index variant, run one query and report timings/RSS."""
+    out_dir = Path(out_dir)
+    started = time.perf_counter()
+    if kind == 'faiss':
+        flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if mmap else 0
+        index = faiss.read_index(str(out_dir / 'faiss_index.idx'), flags)
+        load_s = time.perf_counter() - started
+        query = np.zeros((1, index.d), dtype='float32')
+        index.search(query, 3)
+    else:
+        embeddings = np.load(str(out_dir / 'faiss_index.npy'), mmap_mode='r' if mmap else None)
+        load_s = time.perf_counter() - started
+        np.argmax(embeddings @ np.zeros(embeddings.shape[1], dtype='float32'))
+    results.put((load_s, read_rss_mb()))
+
+
+def run(out_dir: Path, kind: str, mmap: bool, workers: int) -> None:
+    """Start `workers` processes at once (like gunicorn -w N) and summarize them."""
+    results = mp.Queue()
+    procs = [mp.Process(target=load_worker, args=(str(out_dir), kind, mmap, results)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    reports = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+
+    load_s = max(r[0] for r in reports)
+    anon = sum(r[1].get('RssAnon', 0) for r in reports)
+    file_backed = max(r[1].get('RssFile', 0) for r in reports)
+    mode = 'mmap' if mmap else 'copy'
+    print(f"{kind:5s} {mode:4s}  load {load_s:7.2f}s  "
+          f"private {anon:9.0f} MB total  shared page cache {file_backed:8.0f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark RAG index loading with and without mmap')
+    parser.add_argument('--chunks', type=int, default=1_000_000, help='Number of synthetic vectors')
+    parser.add_argument('--dim', type=int, default=384, help='Embedding dimension')
+    parser.add_argument('--workers', type=int, default=4, help='Worker processes loading concurrently')
+    parser.add_argument('--dir', type=str, default=None, help='Scratch directory (default: temp dir)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        out_dir = Path(tmp)
+        print(f"Building {args.chunks} x {args.dim} corpus in {out_dir} ...")
+        build_corpus(out_dir, args.chunks, args.dim)
+        print(f"Corpus size: {args.chunks * args.dim * 4 / 2**20:.0f} MB, workers: {args.workers}\n")
+
+        kinds = ['numpy'] + (['faiss'] if FAISS_AVAILABLE else [])
+        for kind in kinds:
+            for mmap in (False, True):
+                run(out_dir, kind, mmap, args.workers)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Compare the NumPy search engines used when faiss-cpu is not installed.
+
+  - exact:  NumpyIndex, full cosine scan of the float32 matrix
+  - binary: BinaryNumpyIndex, sign-bit Hamming prefilter + exact re-rank
+            (RAG_NUMPY_SEARCH=binary), swept over the candidate count
+
+Reports recall@k against the exact scan and single-query latency (p50 / p99).
+
+Usage:
+  python scripts/rag/bench_numpy_search.py --chunks 1000000 --queries 200
+  python scripts/rag/bench_numpy_search.py --embeddings faiss_index.npy
+
+Queries are corpus vectors with Gaussian noise added. Random synthetic
+vectors are a hard case for 1-bit codes; real MiniLM embeddings keep more of
+their neighbourhood structure in the sign bits.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Make the backend's `app` package importable (scripts/rag -> backend root)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+from app.services.numpy_index import BinaryNumpyIndex, NumpyIndex, pack_sign_bits  # noqa: E402
+
+
+def time_queries(index, queries: np.ndarray, k: int):
+    """Search one query at a time; return (ids, p50 ms, p99 ms)."""
+    ids = np.empty((len(queries), k), dtype='int64')
+    latencies = np.empty(len(queries))
+    for i, query in enumerate(queries):
+        started = time.perf_counter()
+        _, found = index.search(query, k)
+        latencies[i] = (time.perf_counter() - started) * 1000
+        ids[i] = found[0]
+    return ids, float(np.percentile(latencies, 50)), float(np.percentile(latencies, 99))
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    """Fraction of the true top-k ids that were returned (averaged over queries)."""
+    return sum(len(set(f) & set(t)) for f, t in zip(found, truth)) / truth.size
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Exact vs binary-prefiltered NumPy search')
+    parser.add_argument('--embeddings', type=str, default=None,
+                        help='.npy corpus matrix (default: synthetic vectors)')
+    parser.add_argument('--chunks', type=int, default=1_000_000, help='Synthetic corpus size')
+    parser.add_argument('--dim', type=int, default=384, help='Synthetic embedding dimension')
+    parser.add_argument('--queries', type=int, default=200, help='Number of queries')
+    parser.add_argument('--noise', type=float, default=0.5, help='Query perturbation length (relative to unit vectors)')
+    parser.add_argument('-k', type=int, default=3, help='k for recall@k (chat uses top-3)')
+    parser.add_argument('--candidates', type=str, default='64,256,1024',
+                        help='Comma-separated prefilter candidate counts to sweep')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.embeddings:
+        corpus = np.load(args.embeddings).astype('float32')
+    else:
+        corpus = rng.standard_normal((args.chunks, args.dim)).astype('float32')
+    exact = NumpyIndex(corpus)
+    queries = exact.vectors[rng.integers(0, exact.ntotal, size=args.queries)]
+    # Noise vector of length ~args.noise relative to the unit-length corpus row
+    queries = queries + args.noise / np.sqrt(exact.d) * rng.standard_normal(queries.shape).astype('float32')
+
+    started = time.perf_counter()
+    codes = pack_sign_bits(exact.vectors)
+    pack_s = time.perf_counter() - started
+    print(f"Corpus {exact.ntotal} x {exact.d}: float32 {exact.vectors.nbytes / 2**20:.0f} MB, "
+          f"codes {codes.nbytes / 2**20:.0f} MB (packed in {pack_s:.1f}s)")
+
+    truth, p50, p99 = time_queries(exact, queries, args.k)
+    rows = [('exact', '-', 1.0, p50, p99)]
+    for candidates in [int(v) for v in args.candidates.split(',')]:
+        binary = BinaryNumpyIndex(exact.vectors, normalized=True, codes=codes, candidates=candidates)
+        found, p50, p99 = time_queries(binary, queries, args.k)
+        rows.append(('binary', str(candidates), recall_at_k(found, truth), p50, p99))
+
+    print()
+    print(f"| engine | candidates | recall@{args.k} | p50 ms | p99 ms |")
+    print("|---|---:|---:|---:|---:|")
+    for engine, candidates, recall, p50, p99 in rows:
+        print(f"| {engine} | {candidates} | {recall:.3f} | {p50:.2f} | {p99:.2f} |")
+
+
+if __name__ == '__main__':
+    main()
@@ -6,16 +6,26 @@ This script:
 1. Reads all .md files from data/docs/ directory
 2. Extracts YAML front-matter and content from each file
 3. Generates embeddings using sentence-transformers (all-MiniLM-L6-v2)
-4. Builds FAISS vector index for fast similarity search
-5. Creates doc_map.json mapping document IDs to metadata
-6. Saves index and map files to afroken_llm_backend/
+4. Builds FAISS vector index for fast similarity search (exact flat, HNSW
+   or IVF-Flat; inner product on unit-length vectors = cosine similarity)
+5. Writes the chunk metadata (including a cleaned display excerpt and
+   citation string per chunk) to a memory-mappable columnar store in
+   chunk_store/, plus doc_map.json as a human-readable debugging export
+6. Builds a BM25 inverted index over the same chunk texts in bm25/ (lexical
+   half of the hybrid search)
+7. Saves index and map files to afroken_llm_backend/
+8. Writes index_manifest.json (build version) last, which tells running
+   backends to hot-reload the new index
 
-Creates faiss_index.idx and doc_map.json in afroken_llm_backend/
+Creates faiss_index.idx, chunk_store/, bm25/, doc_map.json and index_manifest.json in afroken_llm_backend/
 """
 
 # Standard library imports
 import json      # For reading/writing doc_map.json
+import os        # For atomic file replacement (os.replace)
 import re        # For removing Sources section from Markdown
+import sys       # For making the backend's `app` package importable
+import time      # For the build version stamp in index_manifest.json
 from functools import lru_cache  # For caching the embedding model
 from pathlib import Path  # For cross-platform file path handling
 
@@ -24,9 +34,22 @@ import numpy as np  # For array operations and FAISS compatibility
 import yaml  # For parsing YAML front-matter from Markdown files
 from sentence_transformers import SentenceTransformer  # For generating embeddings
 
+# Make the backend's `app` package importable (scripts/rag -> backend root)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+# Excerpt/citation rules shared with the backend (app/services/chunk_text.py)
+from app.services.chunk_text import clean_markdown, make_citation, make_excerpt  # noqa: E402
+# BM25 terms must be split exactly as the backend splits queries
+from app.services.bm25_index import tokenize  # noqa: E402
+# Sign-bit codes must use the bit layout the backend's binary prefilter reads
+from app.services.numpy_index import pack_sign_bits  # noqa: E402
+# Stored vectors are normalized exactly as NumpyIndex normalizes queries
+from app.services.numpy_index import normalize_rows  # noqa: E402
+# Partition keys must match the backend's lookups of a requested category
+from app.services.chunk_store import category_key  # noqa: E402
+
 # ===== FAISS AVAILABILITY CHECK =====
 # Try to import FAISS library (fast vector search)
-# FAISS is optional - if not available, we use pure Python cosine similarity
+# FAISS is optional - if not available, the backend searches the saved embeddings with NumPy
 try:
     import faiss  # Facebook AI Similarity Search library
     FAISS_AVAILABLE = True  # Flag indicating FAISS is installed
@@ -34,7 +57,7 @@ except ImportError:
     # FAISS not available (common on Windows or if not installed)
     FAISS_AVAILABLE = False
     # Print warning but continue - Python fallback will be used
-    print("Warning: faiss-cpu not available. Will use pure Python cosine similarity.")
+    print("Warning: faiss-cpu not available. Will save embeddings for the backend's NumPy search.")
 
 @lru_cache(maxsize=1)
 def load_model():
@@ -136,71 +159,239 @@ def extract_content_from_md(md_file: Path) -> tuple[str, dict]:
     # Return content and metadata
     return md_content, metadata
 
-def py_cosine_search(embeddings: np.ndarray, query_emb: np.ndarray, topk: int = 3) -> tuple[np.ndarray, np.ndarray]:
+def atomic_write(path: Path, write_fn) -> None:
     """
-    Pure Python cosine similarity search (fallback if FAISS unavailable).
+    Write a file so readers never see it half-written.
     
-    This function implements cosine similarity search using only NumPy.
-    Used when FAISS library is not available (e.g., on Windows without proper installation).
+    `write_fn(f)` writes into a temporary file next to `path` (opened in
+    binary mode), which is then moved over `path` with os.replace() - an
+    atomic rename on the same filesystem. Running backends polling the index
+    therefore only ever see the old or the new file.
     
-    Cosine similarity measures the angle between vectors (not magnitude):
-    - 1.0 = identical direction (most similar)
-    - 0.0 = perpendicular (unrelated)
-    - -1.0 = opposite direction (least similar)
+    Args:
+        path: Final destination of the file
+        write_fn: Callable receiving the open temporary file
+    """
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        write_fn(f)
+    os.replace(tmp_path, path)
+
+# ===== CHUNK STORE LAYOUT =====
+# Columns of the binary chunk store read by app/services/chunk_store.py.
+# String columns are packed UTF-8 (one column after another in strings.bin),
+# addressed through an int64 offsets array; integer columns go to ints.npy.
+CHUNK_STR_FIELDS = ['title', 'filename', 'excerpt', 'citation', 'source',
+                    'category', 'last_scraped', 'url_path', 'text']
+CHUNK_INT_FIELDS = ['chunk_index', 'word_count']
+
+def write_chunk_store(store_dir: Path, doc_map: dict) -> None:
+    """
+    Write chunk metadata as a compact, memory-mappable columnar store.
+    
+    Layout (see app/services/chunk_store.py for the reader):
+    - meta.json:   {"count": N, "str_fields": [...], "int_fields": [...]}
+    - offsets.npy: int64 array (len(str_fields), N + 1); field f of chunk i is
+                   strings.bin[offsets[f, i]:offsets[f, i + 1]]
+    - strings.bin: UTF-8 bytes of all string columns, concatenated
+    - ints.npy:    int64 array (len(int_fields), N)
+    - category_offsets.npy / category_ids.npy: chunk ids grouped per category
+                   (meta["categories"][c] owns category_ids[offsets[c]:offsets[c + 1]]),
+                   used by the backend to search one category only
+    
+    The backend opens these files with mmap and decodes only the chunks a
+    query actually returns, instead of parsing every chunk at startup.
     
     Args:
-        embeddings: 2D numpy array of shape (N, 384) where N is number of documents
-                    Each row is an embedding vector for one document
-        query_emb: 1D numpy array of shape (384,) - the query embedding
-        topk: Number of top results to return (default 3)
+        store_dir: Output directory (created if missing)
+        doc_map: Integer chunk id (0..N-1) -> metadata dict
+    """
+    store_dir.mkdir(parents=True, exist_ok=True)
+    count = len(doc_map)
+    
+    # Encode every string column back to back, recording absolute offsets
+    offsets = np.zeros((len(CHUNK_STR_FIELDS), count + 1), dtype=np.int64)
+    blob = bytearray()
+    for f, name in enumerate(CHUNK_STR_FIELDS):
+        offsets[f, 0] = len(blob)
+        for i in range(count):
+            value = doc_map[i].get(name, '')
+            blob += str(value if value is not None else '').encode('utf-8')
+            offsets[f, i + 1] = len(blob)
+    
+    ints = np.array(
+        [[int(doc_map[i].get(name) or 0) for i in range(count)] for name in CHUNK_INT_FIELDS],
+        dtype=np.int64,
+    ).reshape(len(CHUNK_INT_FIELDS), count)
+    
+    # Category partitions: chunk ids of each category, stored back to back,
+    # keyed by the same category_key the backend applies to requested categories
+    groups = {}
+    for i in range(count):
+        category = category_key(str(doc_map[i].get('category') or ''))
+        groups.setdefault(category, []).append(i)
+    categories = sorted(groups)
+    category_offsets = np.zeros(len(categories) + 1, dtype=np.int64)
+    category_ids = np.zeros(count, dtype=np.int64)
+    for c, category in enumerate(categories):
+        ids = groups[category]
+        category_offsets[c + 1] = category_offsets[c] + len(ids)
+        category_ids[category_offsets[c]:category_offsets[c + 1]] = ids
+    
+    meta = {'count': count, 'str_fields': CHUNK_STR_FIELDS, 'int_fields': CHUNK_INT_FIELDS,
+            'categories': categories}
+    
+    # Data files first, meta.json last (it is what the backend checks for)
+    atomic_write(store_dir / 'strings.bin', lambda f: f.write(bytes(blob)))
+    atomic_write(store_dir / 'offsets.npy', lambda f: np.save(f, offsets))
+    atomic_write(store_dir / 'ints.npy', lambda f: np.save(f, ints))
+    atomic_write(store_dir / 'category_offsets.npy', lambda f: np.save(f, category_offsets))
+    atomic_write(store_dir / 'category_ids.npy', lambda f: np.save(f, category_ids))
+    atomic_write(store_dir / 'meta.json', lambda f: f.write(json.dumps(meta, indent=2).encode('utf-8')))
+
+# ===== BM25 INDEX =====
+# Terms come from app.services.bm25_index.tokenize (NFKC, case folded, word
+# characters; numbers are kept so form / act numbers match exactly)
+def write_bm25_index(bm25_dir: Path, texts: list, k1: float = 1.2, b: float = 0.75) -> None:
+    """
+    Write a BM25 inverted index as compact CSR postings arrays.
     
-    Returns:
-        Tuple of (distances, indices) where:
-        - distances: 1D array of shape (topk,) - cosine distances (lower = more similar)
-        - indices: 1D array of shape (topk,) - indices of top-k documents in embeddings array
+    Layout (see app/services/bm25_index.py for the reader):
+    - meta.json:    {"count": N, "k1": ..., "b": ..., "avgdl": ..., "tokenizer": ...}
+    - terms.json:   sorted vocabulary; term t owns postings offsets[t]:offsets[t + 1]
+    - offsets.npy:  int64 (V + 1)
+    - doc_ids.npy:  int32 chunk id of every posting
+    - weights.npy:  float32 full BM25 contribution of every posting:
+                    idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl))
     
-    Example:
-        embeddings = np.array([[0.1, 0.2, ...], [0.3, 0.4, ...]])  # 2 docs, 384 dims each
-        query = np.array([0.1, 0.2, ...])  # 1 query, 384 dims
-        distances, indices = py_cosine_search(embeddings, query, topk=2)
-        # Returns: (array([0.05, 0.12]), array([0, 1]))
-        # Document 0 is most similar (distance 0.05), document 1 is second (distance 0.12)
+    Storing the final weight means a query is only a gather + sum over the
+    postings of its terms, with no document-length lookups at query time.
+    
+    Args:
+        bm25_dir: Output directory (created if missing)
+        texts: Chunk texts, index i = chunk id i (same order as the embeddings)
+        k1: Term frequency saturation
+        b: Document length normalization
+    """
+    bm25_dir.mkdir(parents=True, exist_ok=True)
+    count = len(texts)
+    
+    # Term frequencies per chunk
+    term_freqs = []
+    doc_lengths = np.zeros(count, dtype=np.float64)
+    for i, text in enumerate(texts):
+        tokens = tokenize(text)
+        doc_lengths[i] = len(tokens)
+        freqs = {}
+        for token in tokens:
+            freqs[token] = freqs.get(token, 0) + 1
+        term_freqs.append(freqs)
+    avgdl = float(doc_lengths.mean()) if count and doc_lengths.sum() else 1.0
+    
+    # Postings per term, in chunk id order
+    postings = {}
+    for i, freqs in enumerate(term_freqs):
+        for term, tf in freqs.items():
+            postings.setdefault(term, []).append((i, tf))
+    terms = sorted(postings)
+    
+    offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    doc_ids = []
+    weights = []
+    for t, term in enumerate(terms):
+        plist = postings[term]
+        df = len(plist)
+        # Lucene idf variant: always positive, so very common terms never subtract
+        idf = np.log(1.0 + (count - df + 0.5) / (df + 0.5))
+        for i, tf in plist:
+            norm = k1 * (1.0 - b + b * doc_lengths[i] / avgdl)
+            doc_ids.append(i)
+            weights.append(idf * tf * (k1 + 1.0) / (tf + norm))
+        offsets[t + 1] = len(doc_ids)
+    
+    meta = {'count': count, 'k1': k1, 'b': b, 'avgdl': avgdl, 'terms': len(terms),
+            'postings': len(doc_ids), 'tokenizer': 'nfkc-casefold-word'}
+    
+    # Data files first, meta.json last (it is what the backend checks for)
+    atomic_write(bm25_dir / 'terms.json', lambda f: f.write(json.dumps(terms, ensure_ascii=False).encode('utf-8')))
+    atomic_write(bm25_dir / 'offsets.npy', lambda f: np.save(f, offsets))
+    atomic_write(bm25_dir / 'doc_ids.npy', lambda f: np.save(f, np.array(doc_ids, dtype=np.int32)))
+    atomic_write(bm25_dir / 'weights.npy', lambda f: np.save(f, np.array(weights, dtype=np.float32)))
+    atomic_write(bm25_dir / 'meta.json', lambda f: f.write(json.dumps(meta, indent=2).encode('utf-8')))
+
+# ===== INDEX TYPES =====
+# flat: exact brute-force scan (best recall, O(N) per query)
+# hnsw: graph-based approximate search (sub-millisecond at millions of chunks)
+# ivf:  inverted lists over k-means clusters (approximate, smaller memory overhead)
+# ivfpq: IVF with product-quantized codes (pq_m bytes per chunk instead of 1536)
+# opq:   ivfpq with a learned rotation first (better recall at the same code size)
+# The quantized types keep float vectors in faiss_index.npy; the backend re-ranks
+# their top candidates exactly against that file through mmap.
+INDEX_TYPES = ['flat', 'hnsw', 'ivf', 'ivfpq', 'opq']
+QUANTIZED_INDEX_TYPES = ['ivfpq', 'opq']
+
+def effective_index_type(index_type: str, n_vectors: int, pq_nbits: int = 8) -> str:
+    """
+    Return the index type that can actually be trained on `n_vectors` vectors.
+    
+    Product quantizers train 2**pq_nbits centroids per sub-space and need
+    roughly 39 points per centroid; smaller corpora get an exact flat index
+    (which is small anyway at that size).
+    """
+    if index_type in QUANTIZED_INDEX_TYPES and n_vectors < 39 * 2 ** pq_nbits:
+        print(f"Warning: {n_vectors} vectors are too few to train {index_type}; building flat instead")
+        return 'flat'
+    return index_type
+
+def build_faiss_index(embeddings: np.ndarray, index_type: str = 'flat', hnsw_m: int = 32,
+                      ef_construction: int = 200, nlist: int = 1024,
+                      pq_m: int = 48, pq_nbits: int = 8):
     """
-    # ===== NORMALIZE EMBEDDINGS =====
-    # Normalize query embedding to unit length
-    # np.linalg.norm() computes Euclidean norm (vector length)
-    # + 1e-8 prevents division by zero (tiny epsilon)
-    # Result: query_norm has length 1.0
-    query_norm = query_emb / (np.linalg.norm(query_emb) + 1e-8)
-    
-    # Normalize all document embeddings to unit length
-    # axis=1 means normalize each row (each document) independently
-    # keepdims=True preserves 2D shape for broadcasting
-    # Result: each row in emb_norms has length 1.0
-    emb_norms = embeddings / (np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-8)
-    
-    # ===== COMPUTE COSINE SIMILARITY =====
-    # Cosine similarity = dot product of normalized vectors
-    # np.dot() computes matrix-vector product: emb_norms (N x 384) @ query_norm (384,)
-    # Result: similarities is 1D array of shape (N,) with similarity scores
-    # Higher value = more similar (closer angle between vectors)
-    similarities = np.dot(emb_norms, query_norm)
-    
-    # ===== GET TOP-K RESULTS =====
-    # np.argsort(-similarities) sorts indices by similarity (descending, highest first)
-    # Negative sign because argsort sorts ascending, we want descending
-    # [:topk] takes only the top k indices
-    # Result: top_indices contains indices of most similar documents
-    top_indices = np.argsort(-similarities)[:topk]
-    
-    # Convert similarity to distance (for consistency with FAISS)
-    # Distance = 1 - similarity
-    # Lower distance = more similar (matches FAISS convention)
-    # similarities[top_indices] gets similarity scores for top-k documents
-    top_distances = 1 - similarities[top_indices]  # Convert to distance
-    
-    # Return distances and indices
-    return top_distances, top_indices
+    Build a FAISS inner-product index over unit-length embeddings.
+    
+    With normalized vectors, inner product equals cosine similarity, which is
+    what the sentence-transformers embeddings are meant to be compared with.
+    
+    Args:
+        embeddings: 2D float32 array of shape (N, 384), rows already unit length
+        index_type: 'flat' (exact), 'hnsw', 'ivf', 'ivfpq' or 'opq' (approximate)
+        hnsw_m: HNSW graph degree (more = better recall, more memory)
+        ef_construction: HNSW build-time candidate list size
+        nlist: Number of IVF clusters (capped so each has ~39 training points)
+        pq_m: PQ sub-quantizers = code bytes per chunk at 8 bits (must divide 384)
+        pq_nbits: Bits per PQ sub-quantizer code
+    
+    Returns:
+        Trained FAISS index with all embeddings added
+    """
+    # Get embedding dimension (should be 384)
+    dimension = embeddings.shape[1]
+    index_type = effective_index_type(index_type, len(embeddings), pq_nbits)
+    
+    if index_type in QUANTIZED_INDEX_TYPES:
+        # Compressed codes: pq_m * pq_nbits / 8 bytes per chunk (+ 8-byte id)
+        nlist = max(1, min(nlist, len(embeddings) // 39))
+        prefix = f"OPQ{pq_m}," if index_type == 'opq' else ''
+        index = faiss.index_factory(dimension, f"{prefix}IVF{nlist},PQ{pq_m}x{pq_nbits}",
+                                    faiss.METRIC_INNER_PRODUCT)
+        index.train(embeddings)
+    elif index_type == 'hnsw':
+        # Graph index: each vector linked to ~M neighbours
+        index = faiss.IndexHNSWFlat(dimension, hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = ef_construction
+    elif index_type == 'ivf':
+        # k-means needs enough points per cluster; FAISS warns below 39 per centroid
+        nlist = max(1, min(nlist, len(embeddings) // 39))
+        quantizer = faiss.IndexFlatIP(dimension)
+        index = faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+        index.train(embeddings)
+    else:
+        # Exact search, no approximation
+        index = faiss.IndexFlatIP(dimension)
+    
+    # Add all embeddings to the index
+    index.add(embeddings)
+    return index
 
 def main():
     """
@@ -211,7 +402,7 @@ def main():
     2. Extracts content and metadata from each file
     3. Generates embeddings using sentence-transformers
     4. Builds FAISS index (or saves NumPy array for Python fallback)
-    5. Creates doc_map.json with document metadata
+    5. Creates chunk_store/, bm25/ and doc_map.json with document metadata
     6. Saves index and map files for use by chat endpoint
     """
     # Import argparse here (only used in main)
@@ -224,6 +415,32 @@ def main():
     # Useful for debugging if some documents produce wrong-sized embeddings
     parser.add_argument('--validate-shapes', action='store_true',
                        help='Validate embedding shapes are consistent')
+    
+    # Optional flag: Skip the doc_map.json debugging export (large corpora)
+    # The backend reads chunk_store/; doc_map.json is only for humans/debugging
+    parser.add_argument('--skip-json-export', action='store_true',
+                       help='Do not write doc_map.json (chunk_store/ is always written)')
+    
+    # Index type and build parameters (defaults come from the same environment
+    # variables the backend's Settings read, e.g. RAG_INDEX_TYPE=hnsw)
+    parser.add_argument('--index-type', choices=INDEX_TYPES,
+                       default=os.getenv('RAG_INDEX_TYPE', 'flat'),
+                       help='FAISS index type: flat (exact), hnsw or ivf (approximate)')
+    parser.add_argument('--hnsw-m', type=int, default=int(os.getenv('RAG_HNSW_M', 32)),
+                       help='HNSW: neighbours per node (M)')
+    parser.add_argument('--ef-construction', type=int,
+                       default=int(os.getenv('RAG_HNSW_EF_CONSTRUCTION', 200)),
+                       help='HNSW: candidate list size while building (efConstruction)')
+    parser.add_argument('--ef-search', type=int, default=int(os.getenv('RAG_HNSW_EF_SEARCH', 64)),
+                       help='HNSW: default candidate list size while searching (efSearch)')
+    parser.add_argument('--nlist', type=int, default=int(os.getenv('RAG_IVF_NLIST', 1024)),
+                       help='IVF: number of clusters')
+    parser.add_argument('--nprobe', type=int, default=int(os.getenv('RAG_IVF_NPROBE', 16)),
+                       help='IVF: default clusters visited per query')
+    parser.add_argument('--pq-m', type=int, default=int(os.getenv('RAG_PQ_M', 48)),
+                       help='IVF-PQ/OPQ: sub-quantizers (code bytes per chunk); must divide 384')
+    parser.add_argument('--pq-nbits', type=int, default=int(os.getenv('RAG_PQ_NBITS', 8)),
+                       help='IVF-PQ/OPQ: bits per sub-quantizer code')
     args = parser.parse_args()
     
     # ===== PATH SETUP =====
@@ -281,12 +498,16 @@ def main():
         # metadata: Dictionary of YAML front-matter fields
         content, metadata = extract_content_from_md(md_file)
         
+        # Title and source URL (used for both display and citation)
+        title = metadata.get('title', md_file.stem)
+        source = metadata.get('source', '')
+        
         # ===== BUILD DOCUMENT MAP ENTRY =====
         # Store metadata for this document in doc_map
         # This will be saved as doc_map.json and used by chat endpoint
         doc_map[idx] = {
             # Title from YAML, or use filename stem if not found
-            'title': metadata.get('title', md_file.stem),
+            'title': title,
             
             # Filename for reference (e.g., "001_kra_pin_registration.md")
             'filename': md_file.name,
@@ -295,8 +516,15 @@ def main():
             # Full content is in the .md file, this is just for quick reference
             'text': content[:1000],  # Store first 1000 chars for reference
             
+            # Markdown-free excerpt shown in chat answers (precomputed so the
+            # chat endpoint does no regex work per request)
+            'excerpt': make_excerpt(clean_markdown(content[:1000])),
+            
+            # Citation string for this chunk (source URL, title or filename)
+            'citation': make_citation(title, source, md_file.name),
+            
             # Source URL from YAML metadata
-            'source': metadata.get('source', ''),
+            'source': source,
             
             # Category from YAML (service_workflow, ministry_faq, etc.)
             'category': metadata.get('category', 'service_workflow'),
@@ -355,58 +583,107 @@ def main():
     index_file = backend_dir / 'faiss_index.idx'  # FAISS index file
     doc_map_file = backend_dir / 'doc_map.json'  # Document metadata map
     
+    # Store unit-length rows: cosine similarity becomes a plain inner product,
+    # and the backend can search (and mmap) the vectors without re-normalizing
+    normalize_rows(embeddings)
+    
+    # Quantized types need enough vectors to train; may fall back to flat
+    index_type = effective_index_type(args.index_type, len(embeddings), args.pq_nbits) if FAISS_AVAILABLE else 'numpy'
+    
     if FAISS_AVAILABLE:
         # ===== BUILD FAISS INDEX =====
         # FAISS is available, use it for fast vector search
-        print("Building FAISS index...")
-        
-        # Get embedding dimension (should be 384)
-        dimension = embeddings.shape[1]
-        
-        # Create FAISS index using L2 (Euclidean) distance
-        # IndexFlatL2 is simplest index type (exact search, no approximation)
-        # Good for small-medium datasets (< 1M vectors)
-        index = faiss.IndexFlatL2(dimension)
-        
-        # Add all embeddings to the index
-        # embeddings.astype('float32') ensures correct dtype (FAISS requirement)
-        index.add(embeddings.astype('float32'))
+        print(f"Building FAISS index ({index_type}, inner product)...")
+        index = build_faiss_index(embeddings, index_type, hnsw_m=args.hnsw_m,
+                                  ef_construction=args.ef_construction, nlist=args.nlist,
+                                  pq_m=args.pq_m, pq_nbits=args.pq_nbits)
         
         # Save index to disk
-        # faiss.write_index() saves the index structure for later loading
-        faiss.write_index(index, str(index_file))
-        print(f"FAISS index saved to {index_file}")
+        # faiss.serialize_index() produces the same bytes faiss.write_index() would,
+        # which lets us write them atomically (temp file + rename)
+        index_bytes = faiss.serialize_index(index).tobytes()
+        atomic_write(index_file, lambda f: f.write(index_bytes))
+        print(f"FAISS index saved to {index_file} ({len(index_bytes) / len(embeddings):.0f} bytes per chunk)")
+        
+        if index_type in QUANTIZED_INDEX_TYPES:
+            # Keep the exact vectors on disk for re-ranking: the backend memory-maps
+            # this file and only touches the rows of each query's candidates
+            atomic_write(index_file.with_suffix('.npy'), lambda f: np.save(f, embeddings))
+            print(f"Re-rank vectors saved to {index_file.with_suffix('.npy')}")
         
     else:
         # ===== SAVE NUMPY ARRAY (PYTHON FALLBACK) =====
         # FAISS not available, save embeddings as NumPy array
-        # chat.py will use py_cosine_search() for similarity search
+        # the backend searches it with NumpyIndex (app/services/numpy_index.py)
         print("FAISS not available. Saving embeddings as numpy array for Python fallback...")
         
         # Save embeddings array to .npy file
         # np.save() saves numpy array in binary format (efficient, fast loading)
         # .with_suffix('.npy') changes .idx to .npy extension
-        np.save(str(index_file.with_suffix('.npy')), embeddings)
+        atomic_write(index_file.with_suffix('.npy'), lambda f: np.save(f, embeddings))
         print(f"Embeddings saved to {index_file.with_suffix('.npy')}")
-    
-    # ===== SAVE DOCUMENT MAP =====
-    # Save doc_map as JSON file
-    # This file maps document indices to metadata (used by chat endpoint)
-    with open(doc_map_file, 'w', encoding='utf-8') as f:
-        # json.dump() writes Python dict to JSON file
+        
+        # Sign-bit codes for the binary prefilter (48 bytes per chunk)
+        codes_file = backend_dir / 'faiss_index_codes.npy'
+        atomic_write(codes_file, lambda f: np.save(f, pack_sign_bits(embeddings)))
+        print(f"Binary codes saved to {codes_file}")
+    
+    # ===== SAVE CHUNK STORE =====
+    # Columnar, memory-mappable chunk metadata (used by chat endpoint)
+    store_dir = backend_dir / 'chunk_store'
+    write_chunk_store(store_dir, doc_map)
+    print(f"Chunk store saved to {store_dir}")
+    
+    # ===== SAVE BM25 INDEX =====
+    # Lexical postings over the same chunk texts, fused with the FAISS results
+    # by reciprocal rank fusion in the backend (exact tokens like "KRA PIN")
+    bm25_dir = backend_dir / 'bm25'
+    write_bm25_index(bm25_dir, texts)
+    print(f"BM25 index saved to {bm25_dir}")
+    
+    # ===== SAVE DOCUMENT MAP (DEBUG EXPORT) =====
+    # Save doc_map as JSON file for inspecting the index by hand
+    # (the backend only falls back to it when chunk_store/ is missing)
+    if not args.skip_json_export:
+        # json.dumps() serializes the Python dict to a JSON string
         # indent=2: Pretty-print with 2-space indentation (readable)
         # ensure_ascii=False: Allow Unicode characters (important for international content)
-        json.dump(doc_map, f, indent=2, ensure_ascii=False)
-    
-    # Log completion
-    print(f"Document map saved to {doc_map_file}")
+        doc_map_json = json.dumps(doc_map, indent=2, ensure_ascii=False, default=str)
+        atomic_write(doc_map_file, lambda f: f.write(doc_map_json.encode('utf-8')))
+        
+        # Log completion
+        print(f"Document map saved to {doc_map_file}")
+    
+    # ===== SAVE MANIFEST (LAST) =====
+    # The manifest is written only after every other file is in place.
+    # Running backends poll it and hot-reload the index when `version` changes
+    # (see app/services/rag_index.py), so no worker restart is needed.
+    # Version = build time with microseconds, unique across back-to-back rebuilds
+    built_at = time.time()
+    manifest = {
+        'version': time.strftime('%Y%m%dT%H%M%S', time.gmtime(built_at)) + f".{int(built_at * 1e6) % 1000000:06d}Z",
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(built_at)),
+        'documents': len(doc_map),
+        'dimension': int(embeddings.shape[1]),
+        'index_type': index_type,
+        # Stored vectors are unit length (see normalize_rows); FAISS scores are inner products
+        'normalized': True,
+        'metric': 'ip',
+        # Search defaults; the backend's RAG_HNSW_EF_SEARCH / RAG_IVF_NPROBE override them
+        'search_params': {'ef_search': args.ef_search, 'nprobe': args.nprobe},
+        # Quantized indexes return approximate scores: re-rank candidates with faiss_index.npy
+        'rerank': index_type in QUANTIZED_INDEX_TYPES,
+    }
+    manifest_file = backend_dir / 'index_manifest.json'
+    atomic_write(manifest_file, lambda f: f.write(json.dumps(manifest, indent=2).encode('utf-8')))
+    print(f"Index manifest saved to {manifest_file} (version {manifest['version']})")
     
     # ===== SUMMARY =====
     # Print final statistics
-    print(f"\nIndex complete:")
+    print("\nIndex complete:")
     print(f"  - Documents: {len(doc_map)}")  # Number of documents indexed
     print(f"  - Embedding dimension: {embeddings.shape[1]}")  # Should be 384
-    print(f"  - Index type: {'FAISS' if FAISS_AVAILABLE else 'NumPy (Python fallback)'}")  # Which index type was used
+    print(f"  - Index type: {'FAISS ' + index_type if FAISS_AVAILABLE else 'NumPy (Python fallback)'}")  # Which index type was used
 
 if __name__ == '__main__':
     main()
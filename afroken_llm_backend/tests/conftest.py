@@ -0,0 +1,69 @@
+"""Shared helpers: small RAG indexes built in memory (no model, no FAISS)."""
+
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.services.bm25_index import BM25Index, tokenize
+from app.services.chunk_store import DocMapChunks
+from app.services.numpy_index import NumpyIndex
+from app.services.rag_index import CategoryPartition, RagIndex
+
+
+def write_bm25_dir(directory: Path, texts: Sequence[str]) -> Path:
+    """Write the bm25/ layout for `texts` (weight of a posting = term frequency)."""
+    directory.mkdir(parents=True, exist_ok=True)
+    postings: Dict[str, List[tuple]] = {}
+    for doc_id, text in enumerate(texts):
+        freqs: Dict[str, int] = {}
+        for token in tokenize(text):
+            freqs[token] = freqs.get(token, 0) + 1
+        for term, tf in freqs.items():
+            postings.setdefault(term, []).append((doc_id, tf))
+    terms = sorted(postings)
+    offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    doc_ids, weights = [], []
+    for t, term in enumerate(terms):
+        for doc_id, tf in postings[term]:
+            doc_ids.append(doc_id)
+            weights.append(float(tf))
+        offsets[t + 1] = len(doc_ids)
+
+    (directory / 'terms.json').write_text(json.dumps(terms), encoding='utf-8')
+    np.save(directory / 'offsets.npy', offsets)
+    np.save(directory / 'doc_ids.npy', np.array(doc_ids, dtype=np.int32))
+    np.save(directory / 'weights.npy', np.array(weights, dtype=np.float32))
+    (directory / 'meta.json').write_text(json.dumps({'count': len(texts)}), encoding='utf-8')
+    return directory
+
+
+def make_rag_index(
+    vectors: Optional[np.ndarray],
+    docs: Sequence[dict],
+    bm25_dir: Optional[Path] = None,
+    hybrid_candidates: int = 0,
+    numpy_index: Optional[NumpyIndex] = None,
+) -> RagIndex:
+    """
+    RagIndex over `docs` (chunk i = docs[i]) the way IndexManager assembles one:
+    NumPy search over `vectors` (None = no dense index), optional BM25 and
+    category partitions from the docs' "category" fields.
+    """
+    chunks = DocMapChunks({str(i): dict(doc) for i, doc in enumerate(docs)})
+    if numpy_index is None and vectors is not None:
+        numpy_index = NumpyIndex(vectors)
+    partitions = {
+        name: CategoryPartition.build(ids, len(chunks))
+        for name, ids in chunks.category_ids().items()
+    }
+    return RagIndex(
+        version='test',
+        chunks=chunks,
+        numpy_index=numpy_index,
+        metric='ip',
+        bm25=BM25Index(bm25_dir) if bm25_dir is not None else None,
+        hybrid_candidates=hybrid_candidates,
+        partitions=partitions,
+    )
@@ -0,0 +1,42 @@
+"""adaptive_k: cut retrieved candidates at a score gap or minimum similarity."""
+
+from app.services.adaptive_k import adaptive_k
+
+
+def test_cuts_at_the_largest_gap():
+    # One clearly relevant chunk, then a flat tail
+    assert adaptive_k([0.8, 0.45, 0.44, 0.43], max_k=3) == 1
+    # Two relevant chunks
+    assert adaptive_k([0.6, 0.58, 0.3, 0.29], max_k=3, min_score=0.2) == 2
+
+
+def test_scores_in_any_order():
+    assert adaptive_k([0.44, 0.8, 0.43, 0.45], max_k=3) == 1
+
+
+def test_small_gap_is_not_a_cut_point():
+    assert adaptive_k([0.62, 0.6, 0.58], max_k=3, min_gap=0.08) == 3
+    assert adaptive_k([0.7, 0.6, 0.58], max_k=3, min_gap=0.08) == 1
+
+
+def test_drops_candidates_below_min_score():
+    assert adaptive_k([0.5, 0.49, 0.1], max_k=3, min_score=0.3, min_gap=0.5) == 2
+
+
+def test_keeps_at_least_min_k():
+    # Everything is below min_score, min_k still holds
+    assert adaptive_k([0.1, 0.05, 0.01], min_k=2, max_k=3, min_score=0.3) == 2
+    # The largest gap is inside the first min_k candidates: only later gaps count
+    assert adaptive_k([0.9, 0.3, 0.29, 0.1], min_k=2, max_k=4) == 3
+
+
+def test_never_more_than_max_k():
+    assert adaptive_k([0.9, 0.89, 0.88, 0.87, 0.86], max_k=3) <= 3
+    assert adaptive_k([0.9], min_k=3, max_k=3) == 3
+
+
+def test_without_scores_keeps_max_k():
+    assert adaptive_k([None, None], max_k=3) == 3
+    assert adaptive_k([], max_k=4) == 4
+    # None entries are ignored
+    assert adaptive_k([0.8, None, 0.4, 0.39], max_k=3) == 1
@@ -0,0 +1,105 @@
+"""AdmissionController: concurrency limit, bounded wait queue and load shedding."""
+
+import asyncio
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.utils.admission import AdmissionController, Overloaded
+
+
+def sample(metric: str, name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(metric, {"name": name, **labels}) or 0.0
+
+
+def test_unlimited_controller_admits_everything():
+    async def scenario():
+        controller = AdmissionController("test_unlimited", max_concurrent=0)
+        entered = 0
+
+        async def call():
+            nonlocal entered
+            async with controller.slot():
+                entered += 1
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(call() for _ in range(20)))
+        return entered
+
+    assert asyncio.run(scenario()) == 20
+
+
+def test_full_queue_sheds_immediately():
+    async def scenario():
+        controller = AdmissionController("test_queue_full", max_concurrent=1, max_queue=0, max_wait_ms=5000)
+        async with controller.slot():
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            with pytest.raises(Overloaded):
+                async with controller.slot():
+                    pass
+            return loop.time() - started
+
+    waited = asyncio.run(scenario())
+
+    assert waited < 0.5
+    assert sample("afroken_admission_shed_total", "test_queue_full", reason="queue_full") == 1
+    assert sample("afroken_admission_shed_total", "test_queue_full", reason="timeout") == 0
+
+
+def test_queued_call_is_shed_after_max_wait():
+    async def scenario():
+        controller = AdmissionController("test_timeout", max_concurrent=1, max_queue=1, max_wait_ms=20)
+        async with controller.slot():
+            with pytest.raises(Overloaded):
+                async with controller.slot():
+                    pass
+            return controller
+
+    controller = asyncio.run(scenario())
+
+    assert sample("afroken_admission_shed_total", "test_timeout", reason="timeout") == 1
+    assert sample("afroken_admission_shed_total", "test_timeout", reason="queue_full") == 0
+    assert sample("afroken_admission_queued", "test_timeout") == 0
+    assert controller._waiting == 0
+
+
+def test_queued_call_runs_once_a_slot_frees_up():
+    async def scenario():
+        controller = AdmissionController("test_handoff", max_concurrent=1, max_queue=1, max_wait_ms=1000)
+        order = []
+
+        async def first():
+            async with controller.slot():
+                order.append("first")
+                await asyncio.sleep(0.02)
+
+        async def second():
+            async with controller.slot():
+                order.append("second")
+
+        task = asyncio.create_task(first())
+        await asyncio.sleep(0)
+        await asyncio.gather(second(), task)
+        return order
+
+    assert asyncio.run(scenario()) == ["first", "second"]
+
+
+def test_slot_and_gauges_released_when_the_call_fails():
+    async def scenario():
+        controller = AdmissionController("test_release", max_concurrent=1, max_queue=0)
+        with pytest.raises(RuntimeError):
+            async with controller.slot():
+                assert sample("afroken_admission_in_flight", "test_release") == 1
+                raise RuntimeError("upstream failed")
+        # The only slot is free again
+        assert not controller._semaphore.locked()
+        async with controller.slot():
+            pass
+
+    asyncio.run(scenario())
+
+    assert sample("afroken_admission_in_flight", "test_release") == 0
+    assert sample("afroken_admission_queued", "test_release") == 0
+    assert sample("afroken_admission_shed_total", "test_release", reason="queue_full") == 0
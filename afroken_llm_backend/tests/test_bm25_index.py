@@ -0,0 +1,79 @@
+"""BM25Index over the bm25/ postings layout, and reciprocal rank fusion."""
+
+import json
+
+import numpy as np
+import pytest
+
+from app.services.bm25_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+# term -> [(doc id, BM25 weight)], in the layout written by index_faiss.write_bm25_index
+POSTINGS = {
+    "form": [(3, 0.7)],
+    "kra": [(0, 1.0), (2, 0.5)],
+    "nssf": [(1, 2.0)],
+    "p9": [(3, 1.5)],
+    "pin": [(0, 0.8), (2, 0.4), (3, 0.1)],
+}
+
+
+@pytest.fixture(params=[False, True], ids=["read", "mmap"])
+def bm25(request, tmp_path):
+    terms = sorted(POSTINGS)
+    offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    doc_ids, weights = [], []
+    for t, term in enumerate(terms):
+        for doc_id, weight in POSTINGS[term]:
+            doc_ids.append(doc_id)
+            weights.append(weight)
+        offsets[t + 1] = len(doc_ids)
+
+    (tmp_path / "terms.json").write_text(json.dumps(terms), encoding="utf-8")
+    np.save(tmp_path / "offsets.npy", offsets)
+    np.save(tmp_path / "doc_ids.npy", np.array(doc_ids, dtype=np.int32))
+    np.save(tmp_path / "weights.npy", np.array(weights, dtype=np.float32))
+    (tmp_path / "meta.json").write_text(json.dumps({"count": 4, "k1": 1.2, "b": 0.75}), encoding="utf-8")
+    return BM25Index(tmp_path, mmap=request.param)
+
+
+def test_tokenize_folds_case_and_keeps_numbers():
+    assert tokenize("KRA PIN, Form P9!") == ["kra", "pin", "form", "p9"]
+    # NFKC: full-width letters match their ASCII form
+    assert tokenize("ＫＲＡ") == ["kra"]
+
+
+def test_scores_sum_term_weights(bm25):
+    scores, doc_ids = bm25.search("How do I get a KRA PIN?", k=10)
+    assert doc_ids.tolist() == [0, 2, 3]
+    np.testing.assert_allclose(scores, [1.8, 0.9, 0.1], rtol=1e-6)
+
+
+def test_repeated_query_terms_count_once(bm25):
+    scores, doc_ids = bm25.search("kra kra KRA", k=10)
+    assert doc_ids.tolist() == [0, 2]
+    np.testing.assert_allclose(scores, [1.0, 0.5], rtol=1e-6)
+
+
+def test_k_keeps_the_best(bm25):
+    scores, doc_ids = bm25.search("kra pin p9 form", k=2)
+    assert doc_ids.tolist() == [3, 0]
+    np.testing.assert_allclose(scores, [2.3, 1.8], rtol=1e-6)
+
+
+def test_unknown_terms_return_nothing(bm25):
+    scores, doc_ids = bm25.search("huduma namba", k=5)
+    assert len(scores) == 0 and len(doc_ids) == 0
+
+
+def test_allowed_mask_filters_postings(bm25):
+    _, doc_ids = bm25.search("kra pin", k=5, allowed=lambda ids: ids >= 2)
+    assert doc_ids.tolist() == [2, 3]
+    _, empty_ids = bm25.search("nssf", k=5, allowed=lambda ids: ids != 1)
+    assert len(empty_ids) == 0
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([[5, 7, -1], [7, 9]], k=60)
+    assert [doc_id for doc_id, _ in fused] == [7, 5, 9]
+    assert fused[0][1] == pytest.approx(1 / 62 + 1 / 61)
+    assert fused[1][1] == pytest.approx(1 / 61)
@@ -0,0 +1,118 @@
+"""TTLCache and normalize_query."""
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.utils import cache as cache_module
+from app.utils.cache import TTLCache, normalize_query
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.monotonic for TTL tests."""
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_normalize_query():
+    assert normalize_query("How do I get a KRA PIN?") == normalize_query("how do i get a kra pin")
+    assert normalize_query("  NSSF\tbalance!!  ") == "nssf balance"
+    assert normalize_query("ＫＲＡ") == "kra"
+    assert normalize_query(None) == ""
+
+
+def test_get_and_default():
+    cache = TTLCache("test_basic", max_entries=4)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert cache.get("missing") is None
+    assert cache.get("missing", "default") == "default"
+
+
+def test_least_recently_used_is_evicted():
+    cache = TTLCache("test_lru", max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # "b" is now least recently used
+    cache.set("c", 3)
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_overwrite_does_not_grow_the_cache():
+    cache = TTLCache("test_overwrite", max_entries=2)
+    cache.set("a", 1)
+    cache.set("a", 2)
+    assert len(cache) == 1
+    assert cache.get("a") == 2
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = TTLCache("test_ttl", max_entries=4, ttl_seconds=60)
+    cache.set("a", 1)
+    clock[0] += 59
+    assert cache.get("a") == 1
+    clock[0] += 2
+    assert cache.get("a") is None
+    # Expired entries are dropped on lookup
+    assert len(cache) == 0
+
+
+def test_without_ttl_entries_do_not_expire(clock):
+    cache = TTLCache("test_no_ttl", max_entries=4)
+    cache.set("a", 1)
+    clock[0] += 10 ** 6
+    assert cache.get("a") == 1
+
+
+def test_clear():
+    cache = TTLCache("test_clear", max_entries=4)
+    cache.set("a", 1)
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.get("a") is None
+
+
+def test_hits_and_misses_are_counted():
+    cache = TTLCache("test_metrics", max_entries=4)
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("a")
+    cache.get("b")
+    assert REGISTRY.get_sample_value("afroken_cache_hits_total", {"cache": "test_metrics"}) == 2
+    assert REGISTRY.get_sample_value("afroken_cache_misses_total", {"cache": "test_metrics"}) == 1
+
+
+def test_byte_budget_evicts_least_recently_used():
+    cache = TTLCache("test_bytes", max_entries=100, max_bytes=10, sizeof=len)
+    cache.set("a", "xxxx")
+    cache.set("b", "yyyy")
+    assert cache.total_bytes == 8
+    cache.set("c", "zzzz")  # 12 bytes > 10: "a" goes
+    assert cache.get("a") is None
+    assert cache.get("b") == "yyyy" and cache.get("c") == "zzzz"
+    assert cache.total_bytes == 8
+
+
+def test_value_larger_than_byte_budget_is_not_stored():
+    cache = TTLCache("test_oversized", max_entries=100, max_bytes=10, sizeof=len)
+    cache.set("a", "xxxx")
+    cache.set("big", "x" * 11)
+    assert cache.get("big") is None
+    assert cache.get("a") == "xxxx"
+    assert cache.total_bytes == 4
+
+
+def test_bytes_released_on_overwrite_expiry_and_clear(clock):
+    cache = TTLCache("test_bytes_release", max_entries=100, ttl_seconds=60, max_bytes=100, sizeof=len)
+    cache.set("a", "xxxx")
+    cache.set("a", "xx")
+    assert cache.total_bytes == 2
+    clock[0] += 61
+    cache.get("a")
+    assert cache.total_bytes == 0
+    cache.set("b", "yyy")
+    cache.clear()
+    assert cache.total_bytes == 0
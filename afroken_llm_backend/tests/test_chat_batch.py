@@ -0,0 +1,121 @@
+"""
+POST /api/v1/chat/messages:batch in retrieval-only mode, against an
+in-memory RagIndex: every result equals the /messages reply for that message.
+"""
+
+import asyncio
+
+import httpx
+import numpy as np
+import pytest
+from fastapi import FastAPI
+
+from app.api.routes import chat
+from app.config import settings
+from app.services.retrieval_pipeline import retrieval_pipeline
+from conftest import make_rag_index, write_bm25_dir
+
+DOCS = [
+    {"title": "KRA PIN", "excerpt": "Register for a KRA PIN on the iTax portal.", "citation": "kra.go.ke/pin",
+     "category": "KRA"},
+    {"title": "NSSF", "excerpt": "Pay NSSF contributions every month.", "citation": "nssf.or.ke",
+     "category": "NSSF"},
+    {"title": "P9 form", "excerpt": "Download the KRA P9 form from your employer.", "citation": "kra.go.ke/p9",
+     "category": "KRA"},
+    {"title": "NHIF", "excerpt": "Replace a lost NHIF card at any branch.", "citation": "nhif.or.ke",
+     "category": "NHIF"},
+]
+
+MESSAGES = [
+    {"message": "How do I get a KRA PIN?"},
+    {"message": "NSSF monthly contributions", "category": "nssf"},
+    {"message": "P9 form download", "category": "KRA"},
+    {"message": "lost NHIF card"},
+    {"message": "Huduma namba", "category": "huduma"},
+]
+
+
+def embedding_of(text: str) -> np.ndarray:
+    """Deterministic per-text query vector (no model needed)."""
+    seed = sum(map(ord, text))
+    return np.random.default_rng(seed).standard_normal(8).astype(np.float32)
+
+
+@pytest.fixture
+def serve_index(monkeypatch, tmp_path):
+    """Retrieval-only chat over the given RagIndex; returns a function installing it."""
+    monkeypatch.setattr(settings, "LLM_ENDPOINT", None)
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setattr(settings, "RAG_CROSS_ENCODER_MODEL", None)
+
+    async def embed(text):
+        return embedding_of(text)
+
+    async def embed_batch(texts):
+        return np.stack([embedding_of(t) for t in texts])
+
+    monkeypatch.setattr(retrieval_pipeline, "embed", embed)
+    monkeypatch.setattr(retrieval_pipeline, "embed_batch", embed_batch)
+
+    def install(index):
+        async def load_index():
+            return index
+
+        monkeypatch.setattr(retrieval_pipeline, "load_index", load_index)
+        chat._response_cache.clear()
+        chat._semantic_cache.clear()
+
+    yield install
+    chat._response_cache.clear()
+    chat._semantic_cache.clear()
+
+
+async def post_all(messages):
+    """(batch results, one /messages reply per message, each from a cold cache)."""
+    app = FastAPI()
+    app.include_router(chat.router, prefix="/api/v1/chat")
+    transport = httpx.ASGITransport(app=app)
+    payloads = [{"conversation_id": None, **m} for m in messages]
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        batch = await client.post("/api/v1/chat/messages:batch", json={"messages": payloads})
+        singles = []
+        for payload in payloads:
+            chat._response_cache.clear()
+            chat._semantic_cache.clear()
+            singles.append((await client.post("/api/v1/chat/messages", json=payload)).json())
+    assert batch.status_code == 200
+    return batch.json()["results"], singles
+
+
+@pytest.mark.parametrize("hybrid_candidates", [0, 10], ids=["dense", "hybrid"])
+def test_batch_results_equal_single_replies(serve_index, tmp_path, hybrid_candidates):
+    vectors = np.stack([embedding_of(d["title"]) for d in DOCS])
+    bm25_dir = write_bm25_dir(tmp_path / "bm25", [d["excerpt"] for d in DOCS])
+    serve_index(make_rag_index(vectors, DOCS, bm25_dir=bm25_dir, hybrid_candidates=hybrid_candidates))
+
+    batch, singles = asyncio.run(post_all(MESSAGES))
+
+    assert batch == singles
+    # Category-scoped messages only cite their category; an unknown one finds nothing
+    assert set(batch[1]["citations"]) <= {"nssf.or.ke"}
+    assert set(batch[2]["citations"]) <= {"kra.go.ke/pin", "kra.go.ke/p9"}
+    assert batch[4]["citations"] == []
+
+
+def test_batch_without_vectors_keeps_bm25_answers(serve_index, tmp_path):
+    bm25_dir = write_bm25_dir(tmp_path / "bm25", [d["excerpt"] for d in DOCS])
+    serve_index(make_rag_index(None, DOCS, bm25_dir=bm25_dir, hybrid_candidates=10))
+
+    batch, singles = asyncio.run(post_all(MESSAGES))
+
+    assert batch == singles
+    assert "kra.go.ke/p9" in batch[2]["citations"]
+
+
+def test_batch_without_any_index_answers_each_message(serve_index):
+    serve_index(make_rag_index(None, DOCS))
+
+    batch, singles = asyncio.run(post_all(MESSAGES[:2]))
+
+    assert batch == singles
+    assert all(r["reply"].startswith("RAG index not found") for r in batch)
@@ -0,0 +1,254 @@
+"""
+POST /api/v1/chat/messages:stream (and the load-shedding path of /messages)
+against a mock OpenAI-style LLM server.
+
+The LLM client is an httpx client on a MockTransport that answers chat
+completions as server-sent events; retrieval (embeddings, document search)
+is replaced with fixed results so no model or database is needed.
+"""
+
+import asyncio
+import json
+
+import httpx
+import numpy as np
+import pytest
+from fastapi import FastAPI
+
+from app.api.routes import chat
+from app.config import settings
+from app.services import llm_service
+from app.services.retrieval_pipeline import retrieval_pipeline
+from app.utils import http_clients
+from app.utils.admission import AdmissionController, Overloaded
+
+LLM_URL = "http://llm.test/v1/chat/completions"
+
+DOCS = [
+    {
+        "title": "KRA PIN",
+        "content": "Register on iTax. Enter your ID number.",
+        "source_url": "https://kra.go.ke/pin",
+        "score": 0.9,
+    },
+    {
+        "title": "eCitizen",
+        "content": "Create an eCitizen account first.",
+        "source_url": "https://ecitizen.go.ke",
+        "score": 0.8,
+    },
+]
+
+
+def sse_chunk(payload) -> bytes:
+    """One OpenAI-style stream line."""
+    data = payload if isinstance(payload, str) else json.dumps(payload)
+    return f"data: {data}\n\n".encode()
+
+
+def delta(text: str) -> bytes:
+    return sse_chunk({"choices": [{"delta": {"content": text}}]})
+
+
+class MockLLM:
+    """Handler for httpx.MockTransport that streams `chunks`, then fails if `fail_after` is set."""
+
+    def __init__(self, chunks, fail_after: bool = False):
+        self.chunks = chunks
+        self.fail_after = fail_after
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(json.loads(request.content))
+
+        async def body():
+            for chunk in self.chunks:
+                yield chunk
+            if self.fail_after:
+                raise httpx.ReadError("connection reset by peer", request=request)
+
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=body())
+
+
+@pytest.fixture
+def llm_mode(monkeypatch):
+    """LLM flow with fixed retrieval results; returns a function installing a MockLLM."""
+    monkeypatch.setattr(settings, "LLM_ENDPOINT", LLM_URL)
+    monkeypatch.setenv("FINE_TUNED_LLM_ENDPOINT", LLM_URL)
+
+    async def embed(text):
+        return np.ones(384, dtype=np.float32)
+
+    async def embed_for_documents(text):
+        return [1.0] * 384
+
+    async def search_documents(embedding):
+        return [dict(d) for d in DOCS]
+
+    async def load_index():
+        return None
+
+    monkeypatch.setattr(retrieval_pipeline, "embed", embed)
+    monkeypatch.setattr(retrieval_pipeline, "embed_for_documents", embed_for_documents)
+    monkeypatch.setattr(retrieval_pipeline, "search_documents", search_documents)
+    monkeypatch.setattr(retrieval_pipeline, "load_index", load_index)
+    # Fresh admission controller per test (its semaphore belongs to one event loop):
+    # one slot and no wait queue
+    monkeypatch.setattr(llm_service, "llm_admission", AdmissionController("test_llm", max_concurrent=1))
+    chat._semantic_cache.clear()
+
+    def install(handler):
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        monkeypatch.setitem(http_clients._async_clients, "llm", client)
+        return handler
+
+    yield install
+    chat._semantic_cache.clear()
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(chat.router, prefix="/api/v1/chat")
+    return app
+
+
+async def _stream_events(message: str = "How do I get a KRA PIN?"):
+    """POST to /messages:stream and return the (event, data) pairs in order."""
+    transport = httpx.ASGITransport(app=_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post(
+            "/api/v1/chat/messages:stream", json={"conversation_id": None, "message": message}
+        )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = []
+    for block in response.text.split("\n\n"):
+        if not block.strip():
+            continue
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_tokens_are_streamed_then_citations_last(llm_mode):
+    llm = llm_mode(MockLLM([delta("Register "), delta("on "), delta("iTax."), sse_chunk("[DONE]")]))
+
+    events = asyncio.run(_stream_events())
+
+    assert [e for e, _ in events] == ["token", "token", "token", "citations"]
+    assert "".join(d["text"] for e, d in events if e == "token") == "Register on iTax."
+    assert events[-1][1] == {"citations": ["https://kra.go.ke/pin", "https://ecitizen.go.ke"]}
+    # Streaming request carrying the packed documents as context
+    assert llm.requests[0]["stream"] is True
+    assert "Register on iTax." in json.dumps(llm.requests[0]["messages"])
+
+
+def test_nothing_after_done_is_streamed(llm_mode):
+    llm_mode(MockLLM([delta("Habari"), sse_chunk("[DONE]"), delta(" ignored")]))
+
+    events = asyncio.run(_stream_events())
+
+    assert events == [
+        ("token", {"text": "Habari"}),
+        ("citations", {"citations": ["https://kra.go.ke/pin", "https://ecitizen.go.ke"]}),
+    ]
+
+
+def test_mid_stream_failure_ends_with_error_event(llm_mode):
+    llm_mode(MockLLM([delta("Register "), delta("on")], fail_after=True))
+
+    events = asyncio.run(_stream_events())
+
+    assert [e for e, _ in events] == ["token", "token", "error"]
+    assert "connection reset" in events[-1][1]["message"]
+
+
+def test_streamed_reply_fills_semantic_cache(llm_mode):
+    llm = llm_mode(MockLLM([delta("Register on iTax."), sse_chunk("[DONE]")]))
+
+    first = asyncio.run(_stream_events())
+    second = asyncio.run(_stream_events())
+
+    assert len(llm.requests) == 1
+    assert second == [("token", {"text": "Register on iTax."}), first[-1]]
+
+
+def test_overloaded_llm_sheds_to_document_excerpts(llm_mode):
+    llm = llm_mode(MockLLM([delta("never sent"), sse_chunk("[DONE]")]))
+
+    async def while_llm_busy():
+        # Another request holds the only slot and nobody may queue
+        async with llm_service.llm_admission.slot():
+            return await _stream_events()
+
+    events = asyncio.run(while_llm_busy())
+
+    assert [e for e, _ in events] == ["token", "citations"]
+    assert events[0][1]["text"].startswith("KRA PIN\nRegister on iTax.")
+    assert events[1][1] == {"citations": ["https://kra.go.ke/pin", "https://ecitizen.go.ke"]}
+    assert llm.requests == []
+
+
+def test_semantic_cache_is_keyed_on_the_query_embedding(llm_mode, monkeypatch):
+    llm = llm_mode(MockLLM([delta("Reply."), sse_chunk("[DONE]")]))
+
+    # Documents embedding identical for every question (like the character-code
+    # pseudo-embedding for similar strings); query embeddings differ
+    async def embed(text):
+        vector = np.zeros(384, dtype=np.float32)
+        vector[len(text) % 384] = 1.0
+        return vector
+
+    monkeypatch.setattr(retrieval_pipeline, "embed", embed)
+
+    asyncio.run(_stream_events("NHIF card replacement"))
+    asyncio.run(_stream_events("NSSF statement request"))
+
+    assert len(llm.requests) == 2
+
+
+def _broken_index(monkeypatch):
+    """Make the RAG index path fail (e.g. sentence-transformers not installed)."""
+    async def load_index():
+        raise RuntimeError("No module named 'sentence_transformers'")
+
+    monkeypatch.setattr(retrieval_pipeline, "load_index", load_index)
+
+
+def test_shed_message_falls_back_to_documents_when_index_fails(llm_mode, monkeypatch):
+    llm = llm_mode(MockLLM([delta("never sent"), sse_chunk("[DONE]")]))
+    _broken_index(monkeypatch)
+
+    async def overloaded(**kwargs):
+        raise Overloaded("llm: 32 calls already waiting")
+
+    monkeypatch.setattr(llm_service, "generate_response", overloaded)
+
+    async def post():
+        transport = httpx.ASGITransport(app=_app())
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/api/v1/chat/messages", json={"conversation_id": None, "message": "KRA PIN"})
+
+    response = asyncio.run(post())
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["reply"].startswith("KRA PIN\nRegister on iTax.")
+    assert body["citations"] == ["https://kra.go.ke/pin", "https://ecitizen.go.ke"]
+    assert llm.requests == []
+
+
+def test_shed_stream_falls_back_to_documents_when_index_fails(llm_mode, monkeypatch):
+    llm_mode(MockLLM([delta("never sent"), sse_chunk("[DONE]")]))
+    _broken_index(monkeypatch)
+
+    async def while_llm_busy():
+        async with llm_service.llm_admission.slot():
+            return await _stream_events()
+
+    events = asyncio.run(while_llm_busy())
+
+    assert [e for e, _ in events] == ["token", "citations"]
+    assert events[0][1]["text"].startswith("KRA PIN\nRegister on iTax.")
+    assert events[1][1] == {"citations": ["https://kra.go.ke/pin", "https://ecitizen.go.ke"]}
@@ -0,0 +1,101 @@
+"""ChunkStore over the chunk_store/ columnar layout, and category_key lookups."""
+
+import json
+
+import numpy as np
+import pytest
+
+from app.services.chunk_store import ChunkStore, DocMapChunks, category_key
+
+STR_FIELDS = ["title", "excerpt", "category"]
+INT_FIELDS = ["chunk_index", "word_count"]
+
+DOCS = [
+    {"title": "KRA PIN", "excerpt": "Register on iTax.", "category": "KRA", "chunk_index": 0, "word_count": 3},
+    {"title": "NSSF", "excerpt": "Lipa kila mwezi — ñ ü ✓", "category": "nssf ", "chunk_index": 0, "word_count": 6},
+    {"title": "P9 form", "excerpt": "", "category": "kra", "chunk_index": 1, "word_count": 0},
+    {"title": "Huduma", "excerpt": "Visit a centre.", "category": "", "chunk_index": 0, "word_count": 3},
+]
+
+
+def write_store(directory, docs, partitions: bool = True):
+    """Write `docs` in the layout of index_faiss.write_chunk_store."""
+    directory.mkdir(parents=True, exist_ok=True)
+    offsets = np.zeros((len(STR_FIELDS), len(docs) + 1), dtype=np.int64)
+    blob = bytearray()
+    for f, name in enumerate(STR_FIELDS):
+        offsets[f, 0] = len(blob)
+        for i, doc in enumerate(docs):
+            blob += doc[name].encode("utf-8")
+            offsets[f, i + 1] = len(blob)
+    ints = np.array([[doc[name] for doc in docs] for name in INT_FIELDS], dtype=np.int64)
+    meta = {"count": len(docs), "str_fields": STR_FIELDS, "int_fields": INT_FIELDS}
+
+    if partitions:
+        groups = {}
+        for i, doc in enumerate(docs):
+            groups.setdefault(category_key(doc["category"]), []).append(i)
+        meta["categories"] = sorted(groups)
+        sizes = [len(groups[name]) for name in meta["categories"]]
+        np.save(directory / "category_offsets.npy", np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64))
+        np.save(directory / "category_ids.npy",
+                np.array([i for name in meta["categories"] for i in groups[name]], dtype=np.int64))
+
+    (directory / "strings.bin").write_bytes(bytes(blob))
+    np.save(directory / "offsets.npy", offsets)
+    np.save(directory / "ints.npy", ints)
+    (directory / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+    return directory
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ChunkStore(write_store(tmp_path / "chunk_store", DOCS))
+
+
+def test_round_trip(store):
+    assert len(store) == len(DOCS)
+    for i, doc in enumerate(DOCS):
+        assert store.get(i) == doc
+        assert store.field(i, "excerpt") == doc["excerpt"]
+        assert store.field(i, "word_count") == doc["word_count"]
+
+
+def test_out_of_range_chunk_is_none(store):
+    assert store.get(-1) is None
+    assert store.get(len(DOCS)) is None
+
+
+def test_columns_are_memory_mapped(store):
+    assert isinstance(store._blob, np.memmap)
+    assert isinstance(store._offsets, np.memmap)
+    assert isinstance(store._ints, np.memmap)
+
+
+def test_empty_string_columns(tmp_path):
+    docs = [{"title": "", "excerpt": "", "category": "", "chunk_index": 0, "word_count": 0}]
+    store = ChunkStore(write_store(tmp_path / "chunk_store", docs))
+    assert store.get(0) == docs[0]
+
+
+def test_category_key():
+    assert category_key(" KRA ") == "kra"
+    assert category_key("Straße") == category_key("STRASSE")
+    assert category_key(None) == category_key("") == ""
+
+
+def test_category_ids_are_keyed_by_category_key(store):
+    ids = store.category_ids()
+    assert sorted(ids) == ["", "kra", "nssf"]
+    assert ids[category_key(" Kra")].tolist() == [0, 2]
+    assert ids["nssf"].tolist() == [1]
+    assert ids[""].tolist() == [3]
+
+
+@pytest.mark.parametrize("partitions", [True, False], ids=["partitioned", "legacy"])
+def test_category_ids_match_doc_map(tmp_path, partitions):
+    # A store without the partition arrays groups its category column instead
+    store = ChunkStore(write_store(tmp_path / "chunk_store", DOCS, partitions=partitions))
+    legacy = DocMapChunks({str(i): doc for i, doc in enumerate(DOCS)})
+    expected = {name: ids.tolist() for name, ids in legacy.category_ids().items()}
+    assert {name: ids.tolist() for name, ids in store.category_ids().items()} == expected
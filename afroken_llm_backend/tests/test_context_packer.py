@@ -0,0 +1,67 @@
+"""Token-budgeted context packing (estimated tokens: ~4 characters each)."""
+
+import pytest
+
+from app.config import settings
+from app.services.context_packer import count_tokens, pack_context, split_sentences, truncate_to_tokens
+
+
+@pytest.fixture(autouse=True)
+def estimated_tokens(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_TOKENIZER", None)
+
+
+def test_split_sentences():
+    assert split_sentences("Register on iTax. Enter your ID!\nDone?  Yes") == [
+        "Register on iTax.", "Enter your ID!", "Done?", "Yes"
+    ]
+
+
+def test_whole_documents_fit():
+    packed = pack_context([("KRA", "Register on iTax. Enter your ID."), ("NSSF", "Pay monthly.")], 1000)
+    assert packed.documents == ["KRA\nRegister on iTax. Enter your ID.", "NSSF\nPay monthly."]
+    assert packed.kept == [0, 1]
+    assert packed.tokens == sum(count_tokens(t) + 1 for t in ["KRA", "NSSF"]) + sum(
+        count_tokens(s) + 1 for s in ["Register on iTax.", "Enter your ID.", "Pay monthly."]
+    )
+
+
+def test_document_trimmed_at_last_fitting_sentence():
+    content = "Short one. " + "This sentence is far too long to fit into the remaining budget at all."
+    packed = pack_context([("T", content)], budget_tokens=8)
+    assert packed.documents == ["T\nShort one."]
+
+
+def test_repeated_sentences_are_dropped():
+    packed = pack_context([("A", "Bring your ID. Pay KES 1000."), ("B", "Bring your ID! Visit Huduma.")], 1000)
+    assert packed.documents == ["A\nBring your ID. Pay KES 1000.", "B\nVisit Huduma."]
+
+
+def test_long_first_sentence_is_truncated_not_dropped():
+    long_sentence = " ".join(["word"] * 200) + "."
+    packed = pack_context([("KRA PIN", long_sentence), ("NSSF", "Pay monthly.")], budget_tokens=1000,
+                          max_tokens_per_document=40)
+    assert packed.kept == [0, 1]
+    title, body = packed.documents[0].split("\n")
+    assert title == "KRA PIN"
+    assert long_sentence.startswith(body) and body.endswith("word")
+    assert count_tokens("KRA PIN") + 1 + count_tokens(body) + 1 <= 40
+
+
+def test_truncated_document_respects_the_total_budget():
+    packed = pack_context([("A", "Pay monthly."), ("B", "x" * 400)], budget_tokens=20)
+    assert packed.kept == [0, 1]
+    assert packed.tokens <= 20
+
+
+def test_document_skipped_when_only_its_title_fits():
+    packed = pack_context([("A title", "Some content here.")], budget_tokens=3)
+    assert packed.documents == [] and packed.kept == []
+
+
+def test_truncate_to_tokens():
+    assert truncate_to_tokens("short", 10) == "short"
+    assert truncate_to_tokens("anything", 0) == ""
+    cut = truncate_to_tokens("alpha beta gamma delta epsilon", 4)
+    assert cut == "alpha beta gamma"
+    assert count_tokens(cut) <= 4
@@ -0,0 +1,125 @@
+"""MMR selection and the per-source cap."""
+
+import asyncio
+
+import numpy as np
+
+from app.config import settings
+from app.services.diversify import diversify, mmr_order, rank_relevance
+from app.services.retrieval_pipeline import RetrievalPipeline
+from conftest import make_rag_index, write_bm25_dir
+
+QUERY = np.array([1.0, 0.0, 0.4], dtype=np.float32)
+VECTORS = np.array(
+    [
+        [1.0, 0.0, 0.0],    # 0: best match
+        [0.99, 0.14, 0.0],  # 1: near-duplicate of 0
+        [0.6, 0.0, 0.8],    # 2: relevant, different content
+        [0.0, 1.0, 0.0],    # 3: unrelated
+    ],
+    dtype=np.float32,
+)
+
+
+def test_pure_relevance_is_similarity_order():
+    assert mmr_order(QUERY, VECTORS, k=4, lambda_=1.0) == [0, 1, 2, 3]
+
+
+def test_near_duplicate_is_passed_over():
+    assert mmr_order(QUERY, VECTORS, k=2, lambda_=0.5) == [0, 2]
+
+
+def test_relevance_overrides_query_similarity():
+    relevance = np.array([0.1, 0.2, 0.9, 0.0], dtype=np.float32)
+    assert mmr_order(QUERY, VECTORS, k=2, lambda_=1.0, relevance=relevance) == [2, 1]
+
+
+def test_per_group_cap():
+    groups = ["kra.go.ke", "kra.go.ke", "kra.go.ke", "nssf.or.ke"]
+    order = mmr_order(QUERY, VECTORS, k=4, lambda_=1.0, groups=groups, max_per_group=1)
+    assert order == [0, 3]
+
+
+def test_k_larger_than_candidates():
+    assert sorted(mmr_order(QUERY, VECTORS[:2], k=5)) == [0, 1]
+
+
+def test_input_vectors_are_not_modified():
+    vectors = VECTORS * 2
+    mmr_order(QUERY, vectors, k=2)
+    np.testing.assert_array_equal(vectors, VECTORS * 2)
+
+
+class FakeChunks:
+    def __init__(self, sources):
+        self.sources = sources
+
+    def field(self, chunk_id, name):
+        return self.sources[chunk_id] if name == 'source' else None
+
+
+class FakeIndex:
+    def __init__(self, sources, vectors=None):
+        self.chunks = FakeChunks(sources)
+        self.vectors = vectors
+
+    def vectors_for(self, chunk_ids):
+        return None if self.vectors is None else self.vectors[chunk_ids]
+
+
+def test_diversify_maps_positions_back_to_chunk_ids():
+    index = FakeIndex(["a", "a", "b", "c"], VECTORS)
+    distances, ids = diversify(index, QUERY, [0.0, 0.1, 0.2, 0.3, None], [0, 1, 2, 3, -1], k=2, lambda_=0.5)
+    assert ids == [0, 2]
+    assert distances == [0.0, 0.2]
+
+
+def test_diversify_without_vectors_applies_only_the_source_cap():
+    index = FakeIndex(["a", "a", "b", "c"])
+    _, ids = diversify(index, QUERY, [0.0, 0.1, 0.2, 0.3], [0, 1, 2, 3], k=3, max_per_source=1)
+    assert ids == [0, 2, 3]
+
+
+def _hybrid_index(tmp_path):
+    """Five dense neighbours of e0, plus chunk 5 that only BM25 finds ("P9")."""
+    rng = np.random.default_rng(0)
+    vectors = np.zeros((6, 8), dtype=np.float32)
+    vectors[:5, 0] = 1.0
+    vectors[:5, 1:4] = rng.normal(scale=0.05, size=(5, 3))
+    vectors[5, 7] = 1.0
+    texts = [f"Tax returns guide part {i}" for i in range(5)] + ["Download the P9 form from your employer"]
+    docs = [{"title": f"doc {i}", "text": t, "source": f"https://example.go.ke/{i}"} for i, t in enumerate(texts)]
+    return make_rag_index(vectors, docs, bm25_dir=write_bm25_dir(tmp_path / "bm25", texts), hybrid_candidates=5)
+
+
+def test_lexical_only_hit_survives_mmr(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "RAG_ADAPTIVE_TOP_K", False)
+    monkeypatch.setattr(settings, "RAG_MMR_CANDIDATES", 5)
+    monkeypatch.setattr(settings, "RAG_CROSS_ENCODER_MODEL", None)
+    index = _hybrid_index(tmp_path)
+    pipeline = RetrievalPipeline(manager=None, top_k=3)
+    query = np.zeros(8, dtype=np.float32)
+    query[0] = 1.0
+
+    async def scenario():
+        distances, indices = await pipeline.search(index, query, "P9 form")
+        # BM25-only hit: fused in at the top, without a dense distance
+        assert 5 in list(indices[:2]) and distances[list(indices).index(5)] is None
+        by_cosine = await pipeline.filter(index, query, distances, indices)
+        by_fused_rank = await pipeline.filter(index, query, distances, indices, fused=True)
+        retrieved = await pipeline.retrieve(index, query, "P9 form")
+        return by_cosine[1], by_fused_rank[1], retrieved[1]
+
+    by_cosine, by_fused_rank, retrieved = asyncio.run(scenario())
+
+    # Ranked by cosine to the query the P9 chunk is dropped ...
+    assert 5 not in by_cosine
+    # ... ranked by the fused order it is kept, also through retrieve()
+    assert 5 in by_fused_rank
+    assert 5 in retrieved
+    assert len(retrieved) == 3
+
+
+def test_rank_relevance():
+    np.testing.assert_allclose(rank_relevance(4), [1.0, 0.75, 0.5, 0.25])
+    assert len(rank_relevance(0)) == 0
@@ -0,0 +1,123 @@
+"""EmbeddingBatcher: concurrent query embeddings coalesced into one encode call."""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.utils import embedding_batcher, embeddings_fallback
+from app.utils.embedding_batcher import EmbeddingBatcher, embed_query
+from app.utils.embeddings_fallback import clear_embedding_cache, embed_and_cache
+
+TEXTS = ["KRA PIN", "NSSF statement", "NHIF card", "Huduma namba", "P9 form"]
+
+
+class RecordingEncoder:
+    """encode_fn returning one distinct vector per text; records every batch it gets."""
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        if self.fail:
+            raise RuntimeError("model crashed")
+        return np.stack([vector_for(text) for text in texts])
+
+
+def vector_for(text: str) -> np.ndarray:
+    vector = np.zeros(384, dtype=np.float32)
+    vector[0] = len(text)
+    vector[1] = sum(map(ord, text))
+    return vector
+
+
+async def embed_all(batcher, texts):
+    return await asyncio.gather(*(batcher.embed(text) for text in texts))
+
+
+def test_concurrent_calls_share_one_encode_call():
+    encoder = RecordingEncoder()
+    batcher = EmbeddingBatcher(encoder, max_batch_size=32, max_wait_ms=50)
+
+    vectors = asyncio.run(embed_all(batcher, TEXTS))
+
+    assert len(encoder.calls) == 1
+    assert sorted(encoder.calls[0]) == sorted(TEXTS)
+    # Every caller gets the vector of its own text
+    for text, vector in zip(TEXTS, vectors):
+        np.testing.assert_array_equal(vector, vector_for(text))
+
+
+def test_batches_are_capped_at_max_batch_size():
+    encoder = RecordingEncoder()
+    batcher = EmbeddingBatcher(encoder, max_batch_size=2, max_wait_ms=50)
+
+    vectors = asyncio.run(embed_all(batcher, TEXTS))
+
+    assert [len(call) for call in encoder.calls] == [2, 2, 1]
+    for text, vector in zip(TEXTS, vectors):
+        np.testing.assert_array_equal(vector, vector_for(text))
+
+
+def test_model_error_reaches_every_waiter():
+    encoder = RecordingEncoder(fail=True)
+    batcher = EmbeddingBatcher(encoder, max_batch_size=32, max_wait_ms=50)
+
+    async def scenario():
+        results = await asyncio.gather(*(batcher.embed(text) for text in TEXTS), return_exceptions=True)
+        # The worker survives a failed batch
+        encoder.fail = False
+        return results, await batcher.embed("after the crash")
+
+    results, after = asyncio.run(scenario())
+
+    assert len(encoder.calls[0]) == len(TEXTS)
+    assert all(isinstance(r, RuntimeError) and str(r) == "model crashed" for r in results)
+    np.testing.assert_array_equal(after, vector_for("after the crash"))
+
+
+def test_batcher_follows_a_new_event_loop():
+    encoder = RecordingEncoder()
+    batcher = EmbeddingBatcher(encoder, max_wait_ms=1)
+
+    first = asyncio.run(batcher.embed("KRA PIN"))
+    second = asyncio.run(batcher.embed("NSSF statement"))
+
+    np.testing.assert_array_equal(first, vector_for("KRA PIN"))
+    np.testing.assert_array_equal(second, vector_for("NSSF statement"))
+
+
+class LocalModel:
+    """Stands in for the loaded SentenceTransformer, encoding with a RecordingEncoder."""
+
+    def __init__(self, encoder):
+        self.encode = lambda texts, **kwargs: encoder(texts)
+
+
+@pytest.fixture
+def query_batcher(monkeypatch):
+    """The production batcher setup (embed_and_cache) over a recording local model."""
+    monkeypatch.delenv("EMBEDDING_ENDPOINT", raising=False)
+    encoder = RecordingEncoder()
+    monkeypatch.setattr(embeddings_fallback, "_model", LocalModel(encoder))
+    monkeypatch.setattr(embedding_batcher, "query_batcher", EmbeddingBatcher(embed_and_cache, max_wait_ms=50))
+    clear_embedding_cache()
+    yield encoder
+    clear_embedding_cache()
+
+
+def test_embed_query_batches_misses_and_caches_them(query_batcher):
+    async def scenario():
+        first = await asyncio.gather(*(embed_query(text) for text in TEXTS))
+        # Same questions again (normalized): answered from the embedding cache
+        again = await asyncio.gather(*(embed_query(f"  {text.lower()}?") for text in TEXTS))
+        return first, again
+
+    first, again = asyncio.run(scenario())
+
+    assert len(query_batcher.calls) == 1
+    for text, vector, cached in zip(TEXTS, first, again):
+        np.testing.assert_array_equal(vector, vector_for(text))
+        np.testing.assert_array_equal(cached, vector)
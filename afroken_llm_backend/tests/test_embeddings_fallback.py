@@ -0,0 +1,86 @@
+"""Query embedding cache when EMBEDDING_ENDPOINT fails over to the local model."""
+
+import httpx
+import numpy as np
+import pytest
+
+from app.utils import embeddings_fallback, http_clients
+from app.utils.embeddings_fallback import (
+    LOCAL_MODEL_NAME,
+    clear_embedding_cache,
+    embed_and_cache,
+    get_cached_embedding,
+    get_embedding,
+)
+
+ENDPOINT = "http://embeddings.test/embed"
+REMOTE = np.full(384, 0.5, dtype=np.float32)
+LOCAL = np.full(384, -0.5, dtype=np.float32)
+
+
+class LocalModel:
+    """Stands in for the loaded SentenceTransformer; counts encode calls."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, texts, **kwargs):
+        self.calls += 1
+        if isinstance(texts, str):
+            return LOCAL.copy()
+        return np.stack([LOCAL] * len(texts))
+
+
+@pytest.fixture
+def endpoint(monkeypatch):
+    """EMBEDDING_ENDPOINT set; returns a switch making the endpoint fail or answer."""
+    state = {"up": False, "requests": 0}
+
+    def handler(request):
+        state["requests"] += 1
+        if not state["up"]:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"embedding": REMOTE.tolist()})
+
+    monkeypatch.setenv("EMBEDDING_ENDPOINT", ENDPOINT)
+    monkeypatch.setitem(http_clients._sync_clients, "embedding", httpx.Client(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(embeddings_fallback, "_model", LocalModel())
+    clear_embedding_cache()
+    yield state
+    clear_embedding_cache()
+
+
+def test_fallback_vector_is_not_cached_under_the_endpoint(endpoint):
+    np.testing.assert_array_equal(get_embedding("KRA PIN"), LOCAL)
+    assert get_cached_embedding("KRA PIN") is None
+
+    # Endpoint back: the query is embedded remotely, then served from the cache
+    endpoint["up"] = True
+    np.testing.assert_array_equal(get_embedding("KRA PIN"), REMOTE)
+    np.testing.assert_array_equal(get_embedding("kra pin?"), REMOTE)
+    assert endpoint["requests"] == 2
+
+
+def test_batch_caches_only_rows_of_the_current_model(endpoint, monkeypatch):
+    # The endpoint fails for the first text only
+    answers = iter([httpx.Response(503), httpx.Response(200, json={"embedding": REMOTE.tolist()})])
+    client = httpx.Client(transport=httpx.MockTransport(lambda request: next(answers)))
+    monkeypatch.setitem(http_clients._sync_clients, "embedding", client)
+
+    embeddings = embed_and_cache(["KRA PIN", "NSSF statement"])
+
+    np.testing.assert_array_equal(embeddings, np.stack([LOCAL, REMOTE]))
+    assert get_cached_embedding("KRA PIN") is None
+    np.testing.assert_array_equal(get_cached_embedding("NSSF statement"), REMOTE)
+
+
+def test_local_model_vectors_are_cached_without_an_endpoint(endpoint, monkeypatch):
+    monkeypatch.delenv("EMBEDDING_ENDPOINT")
+    model = embeddings_fallback._model
+
+    embed_and_cache(["KRA PIN"])
+    np.testing.assert_array_equal(get_cached_embedding("KRA PIN"), LOCAL)
+    get_embedding("NSSF statement")
+    get_embedding("NSSF statement")
+    assert model.calls == 2
+    assert embeddings_fallback._current_model_id() == LOCAL_MODEL_NAME
@@ -0,0 +1,100 @@
+"""NumpyIndex exact top-k (checked against a brute-force full sort) and BinaryNumpyIndex."""
+
+import numpy as np
+import pytest
+
+from app.services.numpy_index import BinaryNumpyIndex, NumpyIndex, normalize_rows, pack_sign_bits
+
+
+def brute_force(corpus: np.ndarray, queries: np.ndarray, k: int, ids=None):
+    """(distances, indices) by scoring every row in float64 and sorting them all."""
+    rows = np.arange(len(corpus)) if ids is None else np.asarray(ids)
+    vectors = corpus[rows].astype(np.float64)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = np.atleast_2d(queries).astype(np.float64)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    similarities = queries @ vectors.T
+    order = np.argsort(-similarities, axis=1, kind="stable")[:, :k]
+    return 1 - np.take_along_axis(similarities, order, axis=1), rows[order]
+
+
+@pytest.fixture
+def corpus():
+    rng = np.random.default_rng(7)
+    # Not unit length: the index normalizes its own copy
+    return (rng.standard_normal((200, 16)) * rng.uniform(0.5, 3.0, (200, 1))).astype(np.float32)
+
+
+@pytest.fixture
+def queries():
+    return np.random.default_rng(8).standard_normal((5, 16)).astype(np.float32)
+
+
+@pytest.mark.parametrize("k", [1, 3, 10, 199])
+def test_top_k_matches_brute_force(corpus, queries, k):
+    distances, indices = NumpyIndex(corpus).search(queries, k=k)
+    expected_distances, expected_indices = brute_force(corpus, queries, k)
+    assert indices.shape == distances.shape == (len(queries), k)
+    np.testing.assert_array_equal(indices, expected_indices)
+    np.testing.assert_allclose(distances, expected_distances, atol=1e-5)
+
+
+def test_prenormalized_corpus_is_used_as_is(corpus, queries):
+    vectors = normalize_rows(corpus.copy())
+    index = NumpyIndex(vectors, normalized=True)
+    assert index.vectors is vectors
+    _, indices = index.search(queries, k=5)
+    np.testing.assert_array_equal(indices, brute_force(corpus, queries, 5)[1])
+
+
+def test_single_query_vector(corpus, queries):
+    distances, indices = NumpyIndex(corpus).search(queries[0], k=4)
+    assert indices.shape == (1, 4)
+    np.testing.assert_array_equal(indices, brute_force(corpus, queries[0], 4)[1])
+
+
+def test_k_larger_than_corpus_returns_every_row_sorted(corpus, queries):
+    small = corpus[:6]
+    distances, indices = NumpyIndex(small).search(queries, k=50)
+    assert indices.shape == (len(queries), 6)
+    assert sorted(indices[0].tolist()) == list(range(6))
+    np.testing.assert_array_equal(indices, brute_force(small, queries, 6)[1])
+    assert np.all(np.diff(distances, axis=1) >= 0)
+
+
+@pytest.mark.parametrize("k", [1, 4, 30])
+def test_partition_search_returns_corpus_ids(corpus, queries, k):
+    ids = np.array([3, 17, 42, 43, 99, 150, 151, 152, 198, 0], dtype=np.int64)
+    distances, indices = NumpyIndex(corpus).search(queries, k=k, ids=ids)
+    expected_distances, expected_indices = brute_force(corpus, queries, k, ids=ids)
+    assert indices.shape == (len(queries), min(k, len(ids)))
+    assert set(indices.ravel().tolist()) <= set(ids.tolist())
+    np.testing.assert_array_equal(indices, expected_indices)
+    np.testing.assert_allclose(distances, expected_distances, atol=1e-5)
+
+
+def test_empty_partition_returns_no_rows(corpus, queries):
+    distances, indices = NumpyIndex(corpus).search(queries, k=3, ids=np.array([], dtype=np.int64))
+    assert distances.shape == indices.shape == (len(queries), 0)
+
+
+def test_binary_prefilter_with_exact_rerank_matches_float_scan(corpus, queries):
+    # Enough Hamming candidates that the exact re-rank sees every true top-5 row
+    binary = BinaryNumpyIndex(corpus, candidates=120)
+    float_distances, float_indices = NumpyIndex(corpus).search(queries, k=5)
+    distances, indices = binary.search(queries, k=5)
+    np.testing.assert_array_equal(indices, float_indices)
+    np.testing.assert_allclose(distances, float_distances, atol=1e-6)
+
+    ids = np.arange(0, 200, 3, dtype=np.int64)
+    np.testing.assert_array_equal(
+        binary.search(queries, k=5, ids=ids)[1], NumpyIndex(corpus).search(queries, k=5, ids=ids)[1]
+    )
+
+
+def test_binary_codes_pack_the_sign_of_each_dimension(corpus):
+    binary = BinaryNumpyIndex(corpus)
+    assert binary.codes.shape == (len(corpus), 1)
+    np.testing.assert_array_equal(binary.codes, pack_sign_bits(normalize_rows(corpus.copy())))
+    # Precomputed codes (faiss_index_codes.npy) are used as given
+    assert BinaryNumpyIndex(corpus, codes=binary.codes).codes is binary.codes
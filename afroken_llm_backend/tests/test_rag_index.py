@@ -0,0 +1,88 @@
+"""RagIndex search over an in-memory corpus: category partitions and batched search."""
+
+import numpy as np
+import pytest
+
+from conftest import make_rag_index, write_bm25_dir
+
+DOCS = [
+    {"title": "KRA PIN", "content": "Register for a KRA PIN on iTax", "category": "KRA"},
+    {"title": "NSSF", "content": "Pay NSSF contributions monthly", "category": "nssf"},
+    {"title": "P9 form", "content": "Download the KRA P9 form", "category": "kra "},
+    {"title": "NHIF", "content": "Replace a lost NHIF card", "category": "NHIF"},
+    {"title": "iTax login", "content": "Reset your iTax password for KRA", "category": "Kra"},
+    {"title": "NSSF statement", "content": "Request an NSSF statement", "category": "NSSF"},
+]
+KRA = {0, 2, 4}
+
+
+@pytest.fixture
+def vectors():
+    return np.random.default_rng(3).standard_normal((len(DOCS), 8)).astype(np.float32)
+
+
+@pytest.fixture(params=[0, 10], ids=["dense", "hybrid"])
+def index(request, tmp_path, vectors):
+    bm25_dir = write_bm25_dir(tmp_path / "bm25", [d["content"] for d in DOCS])
+    return make_rag_index(vectors, DOCS, bm25_dir=bm25_dir, hybrid_candidates=request.param)
+
+
+@pytest.mark.parametrize("category", ["KRA", " kra", "Kra"])
+def test_scoped_search_returns_only_partition_ids(index, vectors, category):
+    for q in range(len(DOCS)):
+        _, indices = index.search(vectors[q], k=10, query_text="KRA NSSF form", category=category)
+        assert set(indices.tolist()) == KRA
+
+
+def test_scoped_search_keeps_the_best_in_partition(index, vectors):
+    # The query is chunk 1 (NSSF) itself: within KRA it can only rank KRA chunks
+    distances, indices = index.search(vectors[1], k=2, category="kra")
+    assert len(indices) == 2 and set(indices.tolist()) <= KRA
+    _, all_indices = index.search(vectors[1], k=len(DOCS))
+    assert indices.tolist() == [i for i in all_indices.tolist() if i in KRA][:2]
+
+
+def test_unknown_category_returns_an_empty_result(index, vectors):
+    distances, indices = index.search(vectors[0], k=3, query_text="KRA PIN", category="huduma")
+    assert len(distances) == 0 and len(indices) == 0
+
+
+def test_no_category_searches_everything(index, vectors):
+    _, indices = index.search(vectors[0], k=len(DOCS), query_text="KRA PIN")
+    assert sorted(indices.tolist()) == list(range(len(DOCS)))
+
+
+def assert_same_result(batched, single):
+    assert batched[1].tolist() == single[1].tolist()
+    np.testing.assert_allclose(
+        np.array(batched[0], dtype=float), np.array(single[0], dtype=float), atol=1e-6
+    )
+
+
+QUERIES = ["KRA PIN", None, "NSSF statement", "P9 form", "", "NHIF card"]
+CATEGORIES = [None, "kra", None, "KRA", "nhif", "huduma"]
+
+
+def test_search_batch_equals_search_per_query(index, vectors):
+    queries = vectors + 0.1
+    results = index.search_batch(queries, k=3, query_texts=QUERIES, categories=CATEGORIES)
+    assert len(results) == len(QUERIES)
+    for q, result in enumerate(results):
+        assert_same_result(result, index.search(queries[q], 3, QUERIES[q], CATEGORIES[q]))
+
+
+def test_search_batch_without_vectors_degrades_like_search(tmp_path, vectors):
+    bm25_dir = write_bm25_dir(tmp_path / "bm25", [d["content"] for d in DOCS])
+    index = make_rag_index(None, DOCS, bm25_dir=bm25_dir, hybrid_candidates=10)
+
+    results = index.search_batch(vectors, k=3, query_texts=QUERIES, categories=CATEGORIES)
+
+    for q, result in enumerate(results):
+        single = index.search(vectors[q], 3, QUERIES[q], CATEGORIES[q])
+        if single is None:
+            # No text to match lexically, and no vectors
+            assert result is None and not QUERIES[q]
+        else:
+            assert_same_result(result, single)
+    # Hybrid queries still get their BM25 hits (distance None: no dense score)
+    assert results[0][1].tolist() and results[0][0] == [None] * len(results[0][1])
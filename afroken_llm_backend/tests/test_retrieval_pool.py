@@ -0,0 +1,105 @@
+"""run_in_retrieval_pool: results, errors and the queue-depth / active gauges."""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.utils import retrieval_pool
+from app.utils.retrieval_pool import run_in_retrieval_pool
+
+
+def queued() -> float:
+    return REGISTRY.get_sample_value("afroken_retrieval_queue_depth")
+
+
+def active() -> float:
+    return REGISTRY.get_sample_value("afroken_retrieval_active_jobs")
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    """A one-thread retrieval pool, so a single blocking job holds every worker."""
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="test-retrieval")
+    monkeypatch.setattr(retrieval_pool, "RETRIEVAL_POOL", executor)
+    yield executor
+    executor.shutdown(wait=True, cancel_futures=True)
+
+
+def test_result_and_exception_pass_through(pool):
+    def fail():
+        raise ValueError("bad query")
+
+    async def scenario():
+        result = await run_in_retrieval_pool(lambda a, b=0: a + b, 2, b=3)
+        with pytest.raises(ValueError):
+            await run_in_retrieval_pool(fail)
+        return result
+
+    before = (queued(), active())
+    assert asyncio.run(scenario()) == 5
+    assert (queued(), active()) == before
+
+
+def test_job_cancelled_before_it_starts_leaves_the_queue_gauge(pool):
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocker():
+        started.set()
+        release.wait(5)
+
+    async def scenario():
+        before = queued()
+        running = asyncio.create_task(run_in_retrieval_pool(blocker))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        waiting = asyncio.create_task(run_in_retrieval_pool(lambda: "never runs"))
+        await asyncio.sleep(0.01)
+        assert queued() == before + 1
+        assert active() >= 1
+
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert queued() == before
+
+        release.set()
+        await running
+        return before
+
+    before = asyncio.run(scenario())
+    assert queued() == before
+
+
+def test_shutdown_with_cancel_futures_leaves_the_queue_gauge(pool):
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocker():
+        started.set()
+        release.wait(5)
+
+    async def scenario():
+        before = queued()
+        running = asyncio.create_task(run_in_retrieval_pool(blocker))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        pending = [asyncio.create_task(run_in_retrieval_pool(lambda: None)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        assert queued() == before + 3
+
+        pool.shutdown(wait=False, cancel_futures=True)
+        results = await asyncio.gather(*pending, return_exceptions=True)
+        assert all(isinstance(r, asyncio.CancelledError) for r in results)
+        assert queued() == before
+
+        # A submit after shutdown fails without touching the gauge
+        with pytest.raises(RuntimeError):
+            await run_in_retrieval_pool(lambda: None)
+        assert queued() == before
+
+        release.set()
+        await running
+
+    asyncio.run(scenario())
@@ -0,0 +1,113 @@
+"""SemanticCache: similarity threshold, context isolation, TTL and LRU slots."""
+
+import numpy as np
+import pytest
+from prometheus_client import REGISTRY
+
+from app.utils import semantic_cache as semantic_cache_module
+from app.utils.semantic_cache import SemanticCache
+
+# Context the chat route uses: (language, category, top_k, index version)
+CONTEXT = ("en", "kra", 3, "v1")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.monotonic for TTL tests."""
+    now = [1000.0]
+    monkeypatch.setattr(semantic_cache_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def at_similarity(base: np.ndarray, similarity: float) -> np.ndarray:
+    """A vector with exactly `similarity` cosine to the unit vector `base` (scaled, not unit)."""
+    other = np.zeros_like(base)
+    other[np.argmin(np.abs(base))] = 1.0
+    other -= base * (other @ base)
+    other /= np.linalg.norm(other)
+    return 5.0 * (similarity * base + np.sqrt(1 - similarity ** 2) * other)
+
+
+BASE = np.eye(8, dtype=np.float32)[0]
+
+
+def test_paraphrase_within_threshold_hits():
+    cache = SemanticCache("test_semantic_threshold", max_entries=4, threshold=0.9)
+    cache.set(BASE, CONTEXT, "reply")
+    assert cache.get(at_similarity(BASE, 0.95), CONTEXT) == "reply"
+    assert cache.get(at_similarity(BASE, 0.85), CONTEXT) is None
+    assert cache.get(at_similarity(BASE, 0.85), CONTEXT, "default") == "default"
+
+
+def test_best_match_wins():
+    cache = SemanticCache("test_semantic_best", max_entries=4, threshold=0.5)
+    cache.set(at_similarity(BASE, 0.7), CONTEXT, "far")
+    cache.set(at_similarity(BASE, 0.99), CONTEXT, "near")
+    assert cache.get(BASE, CONTEXT) == "near"
+
+
+def test_contexts_are_isolated():
+    cache = SemanticCache("test_semantic_context", max_entries=4, threshold=0.9)
+    cache.set(BASE, CONTEXT, "v1 reply")
+    # Same question answered against another index version, language or category
+    assert cache.get(BASE, ("en", "kra", 3, "v2")) is None
+    assert cache.get(BASE, ("sw", "kra", 3, "v1")) is None
+    assert cache.get(BASE, ("en", "", 3, "v1")) is None
+
+    cache.set(BASE, ("en", "kra", 3, "v2"), "v2 reply")
+    assert cache.get(BASE, CONTEXT) == "v1 reply"
+    assert cache.get(BASE, ("en", "kra", 3, "v2")) == "v2 reply"
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = SemanticCache("test_semantic_ttl", max_entries=4, threshold=0.9, ttl_seconds=60)
+    cache.set(BASE, CONTEXT, "reply")
+    clock[0] += 59
+    assert cache.get(BASE, CONTEXT) == "reply"
+    clock[0] += 2
+    assert cache.get(BASE, CONTEXT) is None
+
+
+def test_least_recently_used_slot_is_replaced(clock):
+    cache = SemanticCache("test_semantic_lru", max_entries=2, threshold=0.99)
+    first, second, third = np.eye(8, dtype=np.float32)[:3]
+    cache.set(first, CONTEXT, "first")
+    clock[0] += 1
+    cache.set(second, CONTEXT, "second")
+    clock[0] += 1
+    cache.get(first, CONTEXT)  # "second" is now least recently used
+    clock[0] += 1
+    cache.set(third, CONTEXT, "third")
+    assert len(cache) == 2
+    assert cache.get(second, CONTEXT) is None
+    assert cache.get(first, CONTEXT) == "first" and cache.get(third, CONTEXT) == "third"
+
+
+def test_new_embedding_dimension_starts_over():
+    cache = SemanticCache("test_semantic_dim", max_entries=4, threshold=0.9)
+    cache.set(BASE, CONTEXT, "reply")
+    assert cache.get(np.ones(16, dtype=np.float32), CONTEXT) is None
+    cache.set(np.ones(16, dtype=np.float32), CONTEXT, "wide")
+    assert len(cache) == 1
+    assert cache.get(np.ones(16, dtype=np.float32), CONTEXT) == "wide"
+
+
+def test_clear():
+    cache = SemanticCache("test_semantic_clear", max_entries=4, threshold=0.9)
+    cache.set(BASE, CONTEXT, "reply")
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.get(BASE, CONTEXT) is None
+
+
+def test_hits_and_misses_are_counted():
+    cache = SemanticCache("test_semantic_metrics", max_entries=4, threshold=0.9)
+    cache.get(BASE, CONTEXT)  # empty cache
+    cache.set(BASE, CONTEXT, "reply")
+    cache.get(at_similarity(BASE, 0.95), CONTEXT)
+    cache.get(at_similarity(BASE, 0.5), CONTEXT)
+    labels = {"cache": "test_semantic_metrics"}
+    assert REGISTRY.get_sample_value("afroken_cache_hits_total", labels) == 1
+    assert REGISTRY.get_sample_value("afroken_cache_misses_total", labels) == 2
+    # Best similarity recorded only for lookups that had a candidate
+    assert REGISTRY.get_sample_value("afroken_semantic_cache_similarity_count", labels) == 2
@@ -0,0 +1,109 @@
+"""SingleFlight: identical concurrent calls share one upstream call."""
+
+import asyncio
+
+import pytest
+
+from app.utils.single_flight import SingleFlight
+
+
+class Upstream:
+    """Async callable counting its calls; each call waits until `release` is set."""
+
+    def __init__(self, result="answer", error=None):
+        self.result = result
+        self.error = error
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self, *args):
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return (self.result,) + args
+
+
+def test_concurrent_callers_share_one_call():
+    async def scenario():
+        flight = SingleFlight("test_share")
+        upstream = Upstream()
+        callers = [asyncio.create_task(flight.run("q", upstream, 1)) for _ in range(5)]
+        await asyncio.sleep(0)
+        assert len(flight) == 1
+        upstream.release.set()
+        results = await asyncio.gather(*callers)
+        return flight, upstream, results
+
+    flight, upstream, results = asyncio.run(scenario())
+
+    assert upstream.calls == 1
+    assert results == [("answer", 1)] * 5
+    # Nothing is kept once the call finished
+    assert len(flight) == 0
+
+
+def test_different_keys_are_not_coalesced():
+    async def scenario():
+        flight = SingleFlight("test_keys")
+        upstream = Upstream()
+        upstream.release.set()
+        return upstream, await asyncio.gather(flight.run("a", upstream, 1), flight.run("b", upstream, 2))
+
+    upstream, results = asyncio.run(scenario())
+
+    assert upstream.calls == 2
+    assert results == [("answer", 1), ("answer", 2)]
+
+
+def test_finished_call_is_not_reused():
+    async def scenario():
+        flight = SingleFlight("test_sequential")
+        upstream = Upstream()
+        upstream.release.set()
+        await flight.run("q", upstream)
+        await flight.run("q", upstream)
+        return upstream
+
+    assert asyncio.run(scenario()).calls == 2
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    async def scenario():
+        flight = SingleFlight("test_cancel")
+        upstream = Upstream()
+        leader = asyncio.create_task(flight.run("q", upstream))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.run("q", upstream))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        await asyncio.sleep(0)
+        upstream.release.set()
+        result = await follower
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return upstream, result
+
+    upstream, result = asyncio.run(scenario())
+
+    assert upstream.calls == 1
+    assert result == ("answer",)
+
+
+def test_exception_reaches_every_caller():
+    async def scenario():
+        flight = SingleFlight("test_error")
+        upstream = Upstream(error=ValueError("upstream down"))
+        callers = [asyncio.create_task(flight.run("q", upstream)) for _ in range(3)]
+        await asyncio.sleep(0)
+        upstream.release.set()
+        results = await asyncio.gather(*callers, return_exceptions=True)
+        return flight, upstream, results
+
+    flight, upstream, results = asyncio.run(scenario())
+
+    assert upstream.calls == 1
+    assert all(isinstance(r, ValueError) and str(r) == "upstream down" for r in results)
+    # A failed call is forgotten, so the next caller retries upstream
+    assert len(flight) == 0